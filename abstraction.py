@@ -0,0 +1,238 @@
+"""
+Card abstraction: (hole cards, board) states grouped into a few buckets per street.
+
+A state's feature is its equity histogram over the next card. For every card that can
+come, its hand strength (percentile among all holdings, handstrength.board_table) goes
+into one of HIST_BINS bins, and the cumulative histogram is the feature, so Euclidean
+distance between features behaves like the earth mover's distance between histograms.
+On the river there is no next card and the feature is the hand strength itself. Preflop
+needs no clustering: the 169 classes (handclass.py) are the buckets.
+
+Features are computed for every canonical board of the street (suit isomorphism, see
+handstrength.canonical_board) on all cores. scikit-learn's MiniBatchKMeans is fitted on
+a sample of them, and every (board, combo) is assigned to its nearest centre. The result
+is one strategyfile per street, memory-mapped on load:
+
+    board_keys  i8 (B,)        sorted keys of the canonical boards (see board_key)
+    buckets     u1 (B, 1326)   bucket of every combo on each board, 255 where it collides
+    centers     f4 (K, F)      cluster centres, for boards left out of a sampled build
+
+    python abstraction.py --street flop --buckets 50
+    python abstraction.py --street turn --boards 2000 --workers 8
+"""
+import argparse
+import os
+import time
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from handclass import COMBOS, NUM_COMBOS, PAIR_COMBO
+from handstrength import SUIT_MAPS, board_table, canonical_board
+from logger import get_logger
+from randomness import stream
+from ranges import strength_percentiles
+from strategyfile import open_file, write_sections
+
+_log = get_logger("abstraction")
+
+STREET_CARDS = {"flop": 3, "turn": 4, "river": 5}
+DEFAULT_BUCKETS = 50
+HIST_BINS = 10
+FIT_SAMPLE = 200_000
+NO_BUCKET = 255
+
+
+def abstraction_path(street: str) -> str:
+    return f"abstraction_{street}.bin"
+
+
+# ==== Canonical boards ====
+def board_key(boards: np.ndarray) -> np.ndarray:
+    """Integer key of each sorted board row; keys sort like the boards do."""
+    boards = np.asarray(boards, dtype=np.int64)
+    return boards @ (52 ** np.arange(boards.shape[-1] - 1, -1, -1, dtype=np.int64))
+
+
+def key_board(key: int, size: int) -> Tuple[int, ...]:
+    cards = []
+    for _ in range(size):
+        key, card = divmod(int(key), 52)
+        cards.append(card)
+    return tuple(reversed(cards))
+
+
+def canonical_keys(size: int, chunk: int = 250_000, counts: bool = False):
+    """
+    Sorted keys of every suit-canonical board of `size` cards (1755 flops, 16432 turns, ...).
+    With `counts`, also how many boards map to each of them.
+    """
+    boards = np.array(list(combinations(range(52), size)), dtype=np.int8)
+    keys = []
+    for start in range(0, len(boards), chunk):
+        part = boards[start:start + chunk].astype(np.int64)
+        best = np.full(len(part), np.iinfo(np.int64).max)
+        for suit_map in SUIT_MAPS:
+            best = np.minimum(best, board_key(np.sort(suit_map[part], axis=1)))
+        keys.append(best)
+    return np.unique(np.concatenate(keys), return_counts=counts)
+
+
+# ==== Features ====
+def board_features(board: Tuple[int, ...], bins: int = HIST_BINS) -> np.ndarray:
+    """(1326, F) feature of every combo on a sorted canonical board; NaN where a combo collides."""
+    current, after = board_table(board)
+    valid = current >= 0
+    if len(board) == 5:
+        features = strength_percentiles(current, valid)[:, None]
+    else:
+        cards = np.setdiff1d(np.arange(52), board)
+        live = after[cards] >= 0
+        strength = np.stack([strength_percentiles(row, ok) for row, ok in zip(after[cards], live)])
+        index = np.minimum((strength * bins).astype(np.int64), bins - 1)
+        histogram = np.zeros((NUM_COMBOS, bins))
+        np.add.at(histogram, (np.broadcast_to(np.arange(NUM_COMBOS), index.shape)[live], index[live]), 1.0)
+        histogram /= np.maximum(histogram.sum(axis=1, keepdims=True), 1.0)
+        features = np.cumsum(histogram, axis=1)
+    features = features.astype(np.float32)
+    features[~valid] = np.nan
+    return features
+
+
+def nearest(features: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """Bucket of each feature row, NO_BUCKET for NaN rows."""
+    ok = ~np.isnan(features).any(axis=1)
+    buckets = np.full(len(features), NO_BUCKET, dtype=np.uint8)
+    if ok.any():
+        distance = ((features[ok, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        buckets[ok] = distance.argmin(axis=1)
+    return buckets
+
+
+# Worker state for the assignment pass, set by the pool initializer
+_CENTERS: Optional[np.ndarray] = None
+
+
+def _init_worker(centers: np.ndarray) -> None:
+    global _CENTERS
+    _CENTERS = centers
+
+
+def _features_job(args) -> np.ndarray:
+    key, size = args
+    return board_features(key_board(key, size))
+
+
+def _buckets_job(args) -> np.ndarray:
+    key, size = args
+    return nearest(board_features(key_board(key, size)), _CENTERS)
+
+
+# ==== Build ====
+def build(street: str, buckets: int = DEFAULT_BUCKETS, boards: Optional[int] = None,
+          workers: Optional[int] = None, fit_sample: int = FIT_SAMPLE, seed: int = 0,
+          out_path: Optional[str] = None) -> str:
+    """
+    Cluster every canonical board of `street` (or a random `boards` of them) into `buckets`
+    buckets and write the lookup file. Returns its path.
+    """
+    from sklearn.cluster import MiniBatchKMeans
+
+    size = STREET_CARDS[street]
+    workers = workers or os.cpu_count() or 1
+    rng = stream("abstraction", seed=seed)
+    keys = canonical_keys(size)
+    if boards is not None and boards < len(keys):
+        keys = np.sort(rng.choice(keys, boards, replace=False))
+    start = time.perf_counter()
+
+    pool = None
+    if workers > 1:
+        from multiprocessing import Pool
+        pool = Pool(workers)
+    try:
+        # Fit on the features of enough sampled boards to cover fit_sample combos
+        fit_keys = rng.permutation(keys)[:max(1, fit_sample // NUM_COMBOS)]
+        jobs = [(int(k), size) for k in fit_keys]
+        parts = pool.map(_features_job, jobs) if pool else [_features_job(job) for job in jobs]
+        sample = np.concatenate(parts)
+        sample = sample[~np.isnan(sample).any(axis=1)]
+        kmeans = MiniBatchKMeans(n_clusters=buckets, batch_size=4096, n_init=3, random_state=seed)
+        kmeans.fit(sample)
+        # Order buckets from weakest to strongest by mean feature, so IDs are comparable
+        order = np.argsort(-kmeans.cluster_centers_.sum(axis=1) if size < 5 else kmeans.cluster_centers_[:, 0])
+        centers = kmeans.cluster_centers_[order].astype(np.float32)
+        _log.info("Fitted %d %s buckets on %d states in %.1fs", buckets, street, len(sample),
+                  time.perf_counter() - start)
+
+        jobs = [(int(k), size) for k in keys]
+        if pool:
+            pool.close()
+            pool.join()
+            pool = Pool(workers, initializer=_init_worker, initargs=(centers,))
+            table = np.stack(pool.map(_buckets_job, jobs, chunksize=16))
+        else:
+            _init_worker(centers)
+            table = np.stack([_buckets_job(job) for job in jobs])
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    out_path = out_path or abstraction_path(street)
+    write_sections(out_path, {"board_keys": keys.astype(np.int64), "buckets": table, "centers": centers})
+    _log.info("Wrote %s: %d boards, %d buckets in %.1fs", out_path, len(keys), buckets, time.perf_counter() - start)
+    return out_path
+
+
+# ==== Lookup ====
+class BucketTable:
+    """Bucket lookup for one street; boards missing from a sampled build are assigned on the fly."""
+
+    def __init__(self, path: str):
+        f = open_file(path)
+        self.path = path
+        self.keys = f["board_keys"]
+        self.table = f["buckets"]
+        self.centers = np.asarray(f["centers"], dtype=np.float32)
+        self.num_buckets = len(self.centers)
+        self._canonical = lru_cache(maxsize=256)(self._canonical_buckets)
+
+    def _canonical_buckets(self, board: Tuple[int, ...]) -> np.ndarray:
+        key = int(board_key(np.array(board)))
+        row = int(np.searchsorted(self.keys, key))
+        if row < len(self.keys) and self.keys[row] == key:
+            return self.table[row]
+        return nearest(board_features(board), self.centers)
+
+    def board_buckets(self, board: Sequence[int]) -> np.ndarray:
+        """Bucket of every combo (ranges/handclass combo order) on a board of card codes."""
+        canonical, suit_map = canonical_board([int(c) for c in board])
+        return self._canonical(canonical)[PAIR_COMBO[suit_map[COMBOS[:, 0]], suit_map[COMBOS[:, 1]]]]
+
+    def bucket(self, hand: Sequence[int], board: Sequence[int]) -> int:
+        canonical, suit_map = canonical_board([int(c) for c in board])
+        a, b = (int(suit_map[int(c)]) for c in hand)
+        return int(self._canonical(canonical)[PAIR_COMBO[a, b]])
+
+
+def load(street: str, path: Optional[str] = None) -> Optional[BucketTable]:
+    path = path or abstraction_path(street)
+    return BucketTable(path) if os.path.exists(path) else None
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Build equity-histogram card abstractions")
+    parser.add_argument("--street", choices=sorted(STREET_CARDS), default="flop")
+    parser.add_argument("--buckets", type=int, default=DEFAULT_BUCKETS)
+    parser.add_argument("--boards", type=int, help="only this many random canonical boards")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--fit-sample", type=int, default=FIT_SAMPLE, help="states used to fit the clusters")
+    parser.add_argument("--out", help=f"output file (default {abstraction_path('<street>')})")
+    args = parser.parse_args(argv)
+    build(args.street, args.buckets, args.boards, args.workers, args.fit_sample, out_path=args.out)
+
+
+if __name__ == "__main__":
+    main()
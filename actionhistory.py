@@ -0,0 +1,122 @@
+"""
+Compact betting-history encoding.
+
+Each street is a byte string with one byte per action:
+
+    f  fold     k  check     c  call     a  all-in
+    0-7        bet/raise, bucketed by size relative to the pot (see BET_BUCKETS)
+
+Streets are joined with "/", e.g. b"c3f/k2c/" is preflop call, pot-sized raise, fold,
+then flop check, three-quarter-pot bet, call, with the turn just dealt. Keys are plain bytes, so
+they hash cheaply and can index strategy tables, caches and the hand store directly.
+"""
+from bisect import bisect_left
+from typing import List, Tuple
+
+import numpy as np
+
+FOLD, CHECK, CALL, ALL_IN = b"f"[0], b"k"[0], b"c"[0], b"a"[0]
+STREET_SEPARATOR = b"/"
+# Bet/raise size as a fraction of the pot before the action; bucket i is BET_BUCKETS[i]
+BET_BUCKETS = (0.33, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0)
+_MIDPOINTS = [(a + b) / 2 for a, b in zip(BET_BUCKETS, BET_BUCKETS[1:])]
+ACTION_NAMES = {FOLD: "fold", CHECK: "check", CALL: "call", ALL_IN: "all-in"}
+
+
+def bet_bucket(amount: int, pot: int) -> int:
+    """Index into BET_BUCKETS closest to amount / pot."""
+    if pot <= 0:
+        return len(BET_BUCKETS) - 1
+    return bisect_left(_MIDPOINTS, amount / pot)
+
+
+def bet_bucket_codes(amounts, pots):
+    """Vectorized bet_bucket for arrays of amounts and pots, returned as action codes."""
+    amounts, pots = np.asarray(amounts, dtype=np.float64), np.asarray(pots, dtype=np.float64)
+    fraction = np.where(pots > 0, amounts / np.where(pots > 0, pots, 1), np.inf)
+    buckets = np.minimum(np.searchsorted(_MIDPOINTS, fraction, side="left"), len(BET_BUCKETS) - 1)
+    return (b"0"[0] + buckets).astype(np.uint8)
+
+
+def encode_action(action: str, amount: int = 0, pot: int = 0, all_in: bool = False) -> int:
+    if all_in and action in ("raise", "bet", "call"):
+        return ALL_IN
+    if action == "fold":
+        return FOLD
+    if action == "check" or (action == "call" and amount == 0):
+        return CHECK
+    if action == "call":
+        return CALL
+    if action in ("raise", "bet"):
+        return b"0"[0] + bet_bucket(amount, pot)
+    raise ValueError(f"Unknown action: {action}")
+
+
+def decode_action(code: int) -> Tuple[str, float]:
+    """Return (action name, pot fraction); the fraction is 0 for non-bets."""
+    if code in ACTION_NAMES:
+        return ACTION_NAMES[code], 0.0
+    return "raise", BET_BUCKETS[code - b"0"[0]]
+
+
+class ActionHistory:
+    __slots__ = ("streets", "_key")
+
+    def __init__(self):
+        self.streets: List[bytearray] = [bytearray()]
+        self._key = None
+
+    def add(self, action: str, amount: int = 0, pot: int = 0, all_in: bool = False) -> int:
+        code = encode_action(action, amount, pot, all_in)
+        self.streets[-1].append(code)
+        self._key = None
+        return code
+
+    def next_street(self) -> None:
+        self.streets.append(bytearray())
+        self._key = None
+
+    def clear(self) -> None:
+        self.streets = [bytearray()]
+        self._key = None
+
+    @property
+    def street(self) -> int:
+        return len(self.streets) - 1
+
+    def key(self) -> bytes:
+        if self._key is None:
+            self._key = STREET_SEPARATOR.join(bytes(s) for s in self.streets)
+        return self._key
+
+    def street_key(self, street: int = -1) -> bytes:
+        return bytes(self.streets[street])
+
+    def copy(self) -> "ActionHistory":
+        other = ActionHistory.__new__(ActionHistory)
+        other.streets = [bytearray(s) for s in self.streets]
+        other._key = self._key
+        return other
+
+    @classmethod
+    def from_key(cls, key: bytes) -> "ActionHistory":
+        history = cls.__new__(cls)
+        history.streets = [bytearray(s) for s in key.split(STREET_SEPARATOR)]
+        history._key = bytes(key)
+        return history
+
+    def decode(self) -> List[Tuple[int, str, float]]:
+        """(street, action name, pot fraction) for every action so far."""
+        return [(street, *decode_action(code)) for street, codes in enumerate(self.streets) for code in codes]
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ActionHistory) and self.key() == other.key()
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in self.streets)
+
+    def __repr__(self) -> str:
+        return f"ActionHistory({self.key()!r})"
@@ -1,15 +1,43 @@
 # ai.py
-from typing import List, Tuple, Dict
-from cards import Card
+from typing import List, Tuple, Dict, Optional
+from cards import Card, card_to_int, flatten_cards
 from montecarlo import MonteCarloSimulator
 from handrecord import HandRecord
-from ml.features import extract_features
-from ml.trainer import load_model
-import random
+from ml.features import BUCKET_FEATURE, POTENTIAL_FEATURES, extract_features, model_columns
+from logger import get_logger
+from profiler import PROFILER
+from resources import RESOURCES
+from ranges import RangeTracker
+from handstrength import HandPotential, potential_of
+from handclass import PAIR_COMBO, hand_class
+from betsizing import choose_size, fold_rate, min_raise_to
+from pushfold import seat_order
+from randomness import resolve, split
+import cfr
+import os
+
+_log = get_logger("ai")
+
+EQUITY_SERVICE_ENV = "ACE_EQUITY_SERVICE"
+
+
+def make_simulator(rng=None) -> MonteCarloSimulator:
+    """
+    A local simulator in the stratified, control-variate mode, or a client of the shared
+    equity service when ACE_EQUITY_SERVICE is set.
+    """
+    address = os.environ.get(EQUITY_SERVICE_ENV)
+    if not address:
+        return MonteCarloSimulator(sampling="stratified", control_variate=True, rng=rng)
+    from equityservice import EquityClient
+    return EquityClient(address, rng=rng)
 
 class PokerAI:
-    def __init__(self, memory_size: int = 1000):
-        self.simulator = MonteCarloSimulator()
+    def __init__(self, memory_size: int = 1000, rng=None):
+        # Separate children of `rng` for the AI's own draws (bluffs, sampled strategies) and the
+        # simulator, so the number of simulations never changes the decisions' random numbers
+        self.rng, simulator_rng = split(rng, 2)
+        self.simulator = make_simulator(simulator_rng)
         self.memory_size = memory_size
         self.hand_history: List[HandRecord] = []
         self.strategy: Dict[str, Dict[str, float]] = {
@@ -18,12 +46,27 @@ class PokerAI:
         }
         self.policy: Dict[int, str] = {} 
         self.learning_rate = 0.1
-        try:
-            self.ml_model = load_model()
-            self.use_ml = True
-        except:
-            self.use_ml = False
-            print("ML model not found, using rule-based strategy")
+        # Model and strategy are shared through the registry; assigning ml_model overrides it for this AI only
+        self.resources = RESOURCES
+        self._ml_model = None
+        self.use_ml = True
+        self.strategy_table = self.resources.strategy()
+        # Opponent ranges for the current hand, narrowed by PokerGame.record_action
+        self.ranges = RangeTracker()
+        # Call draws whose positive potential beats the pot odds instead of folding them
+        self.use_potential = True
+        # Pick raise sizes from the EV-scored grid in betsizing.py instead of always raising 2x
+        self.use_sizing = True
+        # Play short stacks preflop from the push/fold charts (pushfold.py) when they are built
+        self.use_pushfold = True
+
+    @property
+    def ml_model(self):
+        return self._ml_model if self._ml_model is not None else self.resources.model()
+
+    @ml_model.setter
+    def ml_model(self, model) -> None:
+        self._ml_model = model
 
     def record_hand(self, record: HandRecord) -> None:
         
@@ -53,17 +96,159 @@ class PokerAI:
             return 0
         return (pot + bet) * win_prob - bet * (1 - win_prob)
 
-    def make_decision(self, game, player, position) -> Tuple[str, int]:
+    def make_decision(self, game, player, position, win_prob: Optional[float] = None) -> Tuple[str, int]:
         
-        win_prob = self.simulator.calculate_win_rate(player.hand, game.community_cards)
-        ev = self.calculate_implied_odds(game.pot, game.current_bet, win_prob)
+        with PROFILER.stage("decision"):
+            if self.use_pushfold:
+                with PROFILER.stage("pushfold"):
+                    decision = self._pushfold_decision(game, player)
+                if decision is not None:
+                    return decision
+            if win_prob is None:
+                with PROFILER.stage("equity"):
+                    win_prob = self.simulator.calculate_win_rate(player.hand, game.community_cards,
+                                                                 opponent_range=game.opponent_range(player))
+            ev = self.calculate_implied_odds(game.pot, game.current_bet, win_prob)
+
+            model = self.ml_model if self.use_ml else None
+            if model is not None:
+                with PROFILER.stage("features"):
+                    # The model's own column list decides which optional features to compute
+                    columns = model_columns(model)
+                    potential = self.hand_potential(game, player) if POTENTIAL_FEATURES[0] in columns else None
+                    bucket = self.card_bucket(game, player) if BUCKET_FEATURE in columns else None
+                    features = None
+                    if bucket is not None or BUCKET_FEATURE not in columns:
+                        features = extract_features(player.hand, game.community_cards, position, game.pot,
+                                                    game.current_bet, potential, bucket, columns)
+                if features is not None:
+                    with PROFILER.stage("model_predict"):
+                        action = model.predict([features])[0]
+                    # The trained labels are the game's own actions; anything else falls through
+                    if action in ("fold", "call", "raise"):
+                        return action, self._bet_amount(game, player, action, win_prob)
+            if self.strategy_table is not None:
+                with PROFILER.stage("cfr"):
+                    decision = self._cfr_decision(game, player)
+                if decision is not None:
+                    return decision
+            with PROFILER.stage("thresholds"):
+                return self.threshold_decision(game, player, position, win_prob)
 
-        if self.use_ml:
-            features = extract_features(player.hand, game.community_cards, 
-                                     position, game.pot, game.current_bet)
-            action = self.ml_model.predict([features])[0]
+    def _cfr_decision(self, game, player) -> Optional[Tuple[str, int]]:
+        """Sample an action from the solved heads-up strategy, or None if the spot is off-tree."""
+        history = self.strategy_table.project(game.action_history.key())
+        if history is None:
+            return None
+        # project() only returns points on the real street, so the node's street picks the bucket kind
+        if self.strategy_table.street(history) == 0:
+            bucket = cfr.preflop_bucket(player.hand)
+        elif game.community_cards:
+            bucket = cfr.postflop_bucket(player.hand, game.community_cards)
         else:
-            late_positions = ["BTN", "CO", "HJ"]
+            return None
+        probs = self.strategy_table.lookup(history, bucket, player.position)
+        if not probs:
+            return None
+
+        roll, code = resolve(self.rng).random(), None
+        for code, p in probs.items():
+            roll -= p
+            if roll < 0:
+                break
+        if code == cfr.FOLD:
+            return "fold", 0
+        if code in (cfr.CHECK, cfr.CALL):
+            return "call", game.current_bet
+        return "raise", self.raise_amount(game, player)
+
+    def raise_amount(self, game, player, win_prob: Optional[float] = None) -> int:
+        """
+        Raise-to amount with the highest EV against the opponents still in (betsizing.py).
+        Games without seats or cards (e.g. replay analysis) are scored with `win_prob` and
+        population fold rates; with sizing off the raise is the minimum, twice the bet.
+        """
+        big_blind = getattr(game, "big_blind", 0)
+        if not self.use_sizing:
+            return min(min_raise_to(game.current_bet, big_blind), player.chips)
+        equity = 0.5 if win_prob is None else win_prob
+        with PROFILER.stage("sizing"):
+            hand = getattr(player, "hand", None)
+            players = getattr(game, "players", None)
+            if not hand or players is None:
+                street = 0 if game.current_stage == "preflop" else 1
+                return choose_size(game.pot, game.current_bet, player.chips, self.simulator,
+                                   [fold_rate(None, "", street)], equity, big_blind=big_blind).best
+            board = [card_to_int(c) for c in flatten_cards(game.community_cards)]
+            street = 0 if len(board) < 3 else len(board) - 2
+            opponents = [p.name for p in players if p is not player and p.is_active]
+            strongest = self.ranges.strongest(opponents, board)
+            opponents.sort(key=lambda name: name != strongest)
+            rates = [fold_rate(game.opponent_stats, name, street) for name in opponents]
+            sizing = choose_size(game.pot, game.current_bet, player.chips, self.simulator, rates, equity,
+                                 [card_to_int(c) for c in flatten_cards(hand)], board,
+                                 game.opponent_range(player), big_blind, rng=self.simulator.batch_rng())
+            return sizing.best
+
+    def _pushfold_decision(self, game, player) -> Optional[Tuple[str, int]]:
+        """
+        Jam or fold when folded to, call or fold against a single jam, from the push/fold
+        charts. None when the spot is not a short-stack preflop spot the charts cover.
+        """
+        charts = self.resources.pushfold()
+        if charts is None or game.community_cards:
+            return None
+        order = seat_order([p for p in game.players if p.hand])
+        if player not in order:
+            return None
+        seat, n = order.index(player), len(order)
+        start = lambda p: p.chips + p.contributed
+        opponents = [p for p in order if p is not player and p.is_active]
+        if not opponents:
+            return None
+        stack = min(start(player), max(start(p) for p in opponents)) / game.big_blind
+        if stack > charts.max_stack:
+            return None
+        a, b = (card_to_int(c) for c in flatten_cards(player.hand))
+        combo = int(PAIR_COMBO[a, b])
+
+        raisers = [p for p in opponents if p.contributed > game.big_blind]
+        if not raisers:
+            chance = charts.jam_probability(n, stack, seat, combo)
+            if chance is None:
+                return None
+            return ("raise", player.chips) if resolve(self.rng).random() < chance else ("fold", 0)
+        # A single jam from a seat ahead; anything else is off the charts
+        jammer = raisers[0]
+        if len(raisers) > 1 or not (jammer.is_all_in or game.current_bet >= player.chips):
+            return None
+        chance = charts.call_probability(n, stack, order.index(jammer), seat, combo)
+        if chance is None:
+            return None
+        return ("call", game.current_bet) if resolve(self.rng).random() < chance else ("fold", 0)
+
+    def hand_potential(self, game, player) -> HandPotential:
+        """Hand strength and potential against the strongest opponent's range (handstrength.py)."""
+        with PROFILER.stage("potential"):
+            return potential_of(player.hand, game.community_cards, game.opponent_range(player))
+
+    def card_bucket(self, game, player) -> Optional[int]:
+        """
+        Compact ID of the hand on the current street: the 169 preflop classes, then the
+        abstraction bucket (abstraction.py) on the flop, turn and river, or None if the
+        street's abstraction has not been built.
+        """
+        board = [card_to_int(c) for c in flatten_cards(game.community_cards)]
+        if len(board) < 3:
+            return hand_class(player.hand)
+        table = self.resources.abstraction(("flop", "turn", "river")[len(board) - 3])
+        if table is None:
+            return None
+        return table.bucket([card_to_int(c) for c in flatten_cards(player.hand)], board)
+
+    def threshold_decision(self, game, player, position, win_prob: float) -> Tuple[str, int]:
+        """The rule-based action for `win_prob`; `game` needs only pot, current_bet and current_stage."""
+        late_positions = ["BTN", "CO", "HJ"]
         if position in late_positions:
             raise_threshold = 0.48
             call_threshold = 0.28
@@ -89,9 +274,8 @@ class PokerAI:
         adjusted_call_threshold = call_threshold * stage_multiplier
         
         pot_ratio = game.current_bet / game.pot if game.pot > 0 else 1.0
-        print("adjusted_raise_threshold: ", adjusted_raise_threshold)
-        print("adjusted_call_threshold: ", adjusted_call_threshold)
-        print("pot_ratio: ", pot_ratio)
+        _log.debug("adjusted_raise_threshold=%.3f adjusted_call_threshold=%.3f pot_ratio=%.3f",
+                   adjusted_raise_threshold, adjusted_call_threshold, pot_ratio)
 
         if pot_ratio > 0.7:
             
@@ -105,6 +289,13 @@ class PokerAI:
         else:
             action = "fold"
 
+        # A draw that improves often enough to pay for the call is not a fold
+        board = getattr(game, "community_cards", None)
+        if action == "fold" and self.use_potential and game.current_bet > 0 and board and len(board) < 5:
+            pot_odds = game.current_bet / (game.pot + game.current_bet)
+            if self.hand_potential(game, player).ppot > pot_odds:
+                action = "call"
+
         
         bluff_chance = 0.08  
         small_pot = game.pot < 100  
@@ -116,22 +307,22 @@ class PokerAI:
             bluff_chance = 0.05  
             
         
-        if action == "fold" and random.random() < bluff_chance:
+        rng = resolve(self.rng)
+        if action == "fold" and rng.random() < bluff_chance:
         
-            if random.random() < 0.8:
+            if rng.random() < 0.8:
                 action = "call"
             else:
                 action = "raise"
 
-        # Determine bet amount
-        if action == "raise":
-            bet_amount = min(game.current_bet * 2, player.chips)
-        elif action == "call":
-            bet_amount = game.current_bet
-        else:
-            bet_amount = 0
+        return action, self._bet_amount(game, player, action, win_prob)
 
-        return action, bet_amount
+    def _bet_amount(self, game, player, action: str, win_prob: float) -> int:
+        if action == "raise":
+            return self.raise_amount(game, player, win_prob)
+        if action == "call":
+            return game.current_bet
+        return 0
 
     def generate_hand_summary(self, record: HandRecord) -> str:
         
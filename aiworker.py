@@ -0,0 +1,121 @@
+import queue
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from cards import flatten_cards
+from game import AIAction
+from logger import get_logger
+
+_log = get_logger("aiworker")
+
+
+def _cards_key(cards) -> Tuple:
+    return tuple((c.rank, c.suit) for c in flatten_cards(cards))
+
+
+class AIWorker:
+    """
+    Computes AI decisions off the Tk event loop.
+
+    Equity (the expensive Monte Carlo part) runs on `equity_pool` and is keyed by
+    (hole cards, board), so seats that are about to act can be pre-computed while the
+    current seat's action is still being animated. The cheap decision step (thresholds,
+    ML predict) runs on a single worker thread so decisions stay in seat order.
+    Finished decisions are pushed onto `results`; the GUI drains it with `poll()` from
+    an `after()` callback and applies them to the game on the main thread.
+    """
+
+    def __init__(self, game, equity_pool: Optional[Executor] = None, lookahead: int = 2):
+        self.game = game
+        self.lookahead = lookahead
+        self.equity_pool = equity_pool or ThreadPoolExecutor(max_workers=2, thread_name_prefix="ai-equity")
+        self.decision_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-decision")
+        self.results: "queue.Queue[Tuple[int, Callable, Tuple]]" = queue.Queue()
+        self._equity: Dict[Tuple, Future] = {}
+        self._hand_id = 0
+        self.pending = 0
+
+    def new_hand(self) -> None:
+        # Results that arrive for an abandoned hand are dropped in poll().
+        self._hand_id += 1
+        for future in list(self._equity.values()):
+            future.cancel()
+        self._equity.clear()
+
+    def equity(self, player) -> Future:
+        key = (_cards_key(player.hand), _cards_key(self.game.community_cards))
+        future = self._equity.get(key)
+        if future is None:
+            simulator = self.game.ai_agent.simulator
+            # The opponent range is copied when the request is made, so a prefetched value may
+            # miss the last few actions; it is still the best estimate available that early
+            future = self.equity_pool.submit(
+                simulator.calculate_win_rate, flatten_cards(player.hand), flatten_cards(self.game.community_cards),
+                opponent_range=self.game.opponent_range(player)
+            )
+            self._equity[key] = future
+        return future
+
+    def prefetch(self, players: List, lookahead: Optional[int] = None) -> None:
+        for player in players[:lookahead or self.lookahead]:
+            if player.is_active and player.hand:
+                self.equity(player)
+
+    def request_decision(self, player, callback: Callable[[str, int], None], upcoming: Optional[List] = None) -> None:
+        equity = self.equity(player)
+        if upcoming:
+            self.prefetch(upcoming)
+        hand_id = self._hand_id
+        self.pending += 1
+
+        def decide():
+            try:
+                decision = self.game.decide_ai_action(player, win_prob=equity.result())
+            except Exception:
+                _log.exception("AI decision failed for %s", player.position)
+                decision = ("fold", 0)
+            self.results.put((hand_id, callback, decision))
+
+        self.decision_pool.submit(decide)
+
+    def request_round(self, players: List, callback: Callable[[List], None]) -> None:
+        """
+        Batch mode: every active player in `players` acts once, in order, and `callback` gets
+        all the AIActions at once. Each decision runs on the worker like request_decision and
+        is applied to the game on the main thread, in poll(), before the next seat decides.
+        """
+        self.prefetch(players, lookahead=len(players))
+        remaining, actions = list(players), []
+
+        def next_seat():
+            while remaining and not remaining[0].is_active:
+                remaining.pop(0)
+            if not remaining:
+                callback(actions)
+                return
+            player = remaining.pop(0)
+
+            def apply(action, amount):
+                self.game.apply_ai_action(player, action, amount)
+                actions.append(AIAction(position=player.position, action=action, amount=amount))
+                next_seat()
+
+            self.request_decision(player, apply)
+
+        next_seat()
+
+    def poll(self) -> int:
+        """Run callbacks for every finished request; returns how many are still pending."""
+        while True:
+            try:
+                hand_id, callback, args = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if hand_id == self._hand_id:
+                callback(*args)
+        return self.pending
+
+    def shutdown(self) -> None:
+        self.new_hand()
+        self.decision_pool.shutdown(wait=False, cancel_futures=True)
+        self.equity_pool.shutdown(wait=False, cancel_futures=True)
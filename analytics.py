@@ -0,0 +1,350 @@
+"""
+Session analytics and leak detection over the hand-history store (handrecord.HandStore).
+
+Everything is computed column-wise: per-seat and per-action arrays are derived once and
+each report is a group-by done with np.bincount, so millions of hands take seconds.
+
+annotate() adds each decision's equity (batched montecarlo.batch_win_rates calls), the
+EV lost versus the best of fold/call/raise and that best action to the action columns;
+the equity-bucket, EV-loss and leak reports use those columns. Raises are scored over
+the betsizing.py size grid with its fold-equity model, calls by the chips actually owed.
+
+    python analytics.py hand_history.bin --player You --annotate
+"""
+import argparse
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from actionhistory import CALL, CHECK, FOLD, bet_bucket_codes
+from betsizing import SIZE_FRACTIONS, fold_probability, fold_rate
+from handrecord import HAND_STORE_PATH, NO_CARD, HandStore
+from montecarlo import batch_win_rates
+from tablestate import STREETS
+
+EQUITY_BUCKETS = 10
+LEAK_MIN_DECISIONS = 30
+LEAK_EV_LOSS_BB = 0.5      # average EV given up per decision, in big blinds
+
+
+# ==== Annotation ====
+def annotate(store: HandStore, num_simulations: int = 200, chunk: int = 1024,
+             rng: Optional[np.random.Generator] = None) -> int:
+    """Compute equity, EV loss and best action for every decision not annotated yet."""
+    actions = store.actions
+    seat_rows = _seat_rows(store)
+    holes = store.seats["hole"][seat_rows]
+    pending = np.flatnonzero(np.isnan(actions["equity"]) & (holes != NO_CARD).all(axis=1))
+    if not len(pending):
+        return 0
+    boards = store.hands["board"][actions["hand"]]
+    sizes = np.array([0, 3, 4, 5, 5])[np.minimum(actions["street"], 4)]
+    equity = actions["equity"]
+    for start in range(0, len(pending), chunk):
+        rows = pending[start:start + chunk]
+        queries = [[int(c) for c in boards[r, :sizes[r]] if c != NO_CARD] for r in rows]
+        equity[rows] = batch_win_rates(holes[rows], queries, num_simulations, rng=rng)
+
+    ev = decision_evs(store)
+    choice = _choice(actions["code"])
+    known = ~np.isnan(equity)
+    loss = ev.max(axis=1) - ev[np.arange(len(ev)), choice]
+    # A seat with nothing behind is all-in and has no decision left to get wrong
+    loss[_stack_before(store) <= 0] = 0.0
+    actions["ev_loss"][known] = loss[known]
+    best = ev.argmax(axis=1)
+    raise_codes = bet_bucket_codes(_raise_options(store)[0], actions["pot"])
+    codes = np.select([best == 0, _owed(store) == 0], [FOLD, CHECK], CALL)
+    codes = np.where(best == 2, raise_codes, codes)
+    actions["best"][known] = codes[known]
+    return len(pending)
+
+
+def decision_evs(store: HandStore, raise_to: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    (actions, 3) EV of fold, call/check and the best-sized raise (or a raise to `raise_to`),
+    from the stored heads-up equity, scaled to the opponents still in (_multiway).
+    """
+    actions = store.actions
+    opponents = _opponents(store)
+    eq = _multiway(actions["equity"].astype(np.float64), opponents)
+    pot = actions["pot"].astype(np.float64)
+    # Same formula as MonteCarloSimulator.calculate_expected_value, for the chips actually owed
+    ev_call = eq * pot - (1 - eq) * _owed(store)
+    return np.stack([np.zeros_like(eq), ev_call, _raise_options(store, opponents, raise_to)[1]], axis=1)
+
+
+def _multiway(equity: np.ndarray, opponents: np.ndarray) -> np.ndarray:
+    """Showdown equity against k opponents from heads-up equity: equity ** log2(k + 1), so an average hand gets 1 / (k + 1)."""
+    return equity ** np.log2(opponents + 1.0)
+
+
+def _raise_options(store: HandStore, opponents: Optional[np.ndarray] = None,
+                   raise_to: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Raise-to amount and EV of the best raise for every decision, over the betsizing.py grid
+    (pot fractions and all-in), or of raising to `raise_to` (capped at all-in), with the
+    grid's fold-equity model and population fold rates. The
+    hand wins the pot when every opponent folds; each opponent folds the hands it is beaten
+    by, so the equity against a caller is the stored equity less the folded share.
+    """
+    actions = store.actions
+    opponents = (_opponents(store) if opponents is None else opponents)[:, None]
+    eq = actions["equity"].astype(np.float64)[:, None]
+    pot = actions["pot"].astype(np.float64)[:, None]
+    to_call = actions["to_call"].astype(np.float64)[:, None]
+    paid = _street_paid(store).astype(np.float64)[:, None]
+    all_in = paid + _stack_before(store).astype(np.float64)[:, None]
+    bb = store.hands["big_blind"][actions["hand"]].astype(np.float64)[:, None]
+
+    if raise_to is None:
+        raise_to = to_call + np.asarray(SIZE_FRACTIONS)[None, :] * (pot + np.maximum(to_call - paid, 0))
+        raise_to = np.hstack([np.maximum(raise_to, np.maximum(2 * to_call, bb)), all_in])
+    raise_to = np.minimum(np.asarray(raise_to, dtype=np.float64).reshape(len(pot), -1), all_in)
+    bets = np.maximum(raise_to - paid, 0)
+    base = np.where(actions["street"][:, None] == 0, fold_rate(None, "", 0), fold_rate(None, "", 1))
+    each = fold_probability(base, pot, bets)
+    called = _multiway(np.clip((eq - each) / (1 - each), 0.0, 1.0), opponents)
+    fold = each ** opponents
+    ev = fold * pot + (1 - fold) * (called * (pot + bets) - (1 - called) * bets)
+    rows, best = np.arange(len(ev)), ev.argmax(axis=1)
+    return raise_to[rows, best], ev[rows, best]
+
+
+def _choice(codes: np.ndarray) -> np.ndarray:
+    """0 fold, 1 check/call, 2 bet/raise/all-in."""
+    return np.select([codes == FOLD, (codes == CHECK) | (codes == CALL)], [0, 1], 2)
+
+
+# ==== Derived columns ====
+def hand_view(store: HandStore, hand: int, equity: Optional[np.ndarray] = None) -> SimpleNamespace:
+    """
+    `store` restricted to one hand's actions, for the per-action functions here
+    (decision_evs and the derived columns), optionally with `equity` in place of the
+    stored equity column. A hand's actions are contiguous, so nothing outside it is needed.
+    """
+    rows = store.hand_actions(hand)
+    actions = {name: column[rows] for name, column in store.actions.columns().items()}
+    if equity is not None:
+        actions["equity"] = np.asarray(equity, dtype=actions["equity"].dtype)
+    return SimpleNamespace(hands=store.hands, seats=store.seats, actions=actions)
+
+
+def _seat_rows(store: HandStore) -> np.ndarray:
+    """Row in the seats table of the seat that took each action."""
+    return store.hands["seat_start"][store.actions["hand"]] + store.actions["seat"]
+
+
+def _paid_before(keys: np.ndarray, chips: np.ndarray) -> np.ndarray:
+    """Chips put in by earlier actions with the same key, for every action (actions are in order)."""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    paid = np.cumsum(chips[order]) - chips[order]
+    first = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+    group_start = np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))
+    before = np.empty_like(paid)
+    before[order] = paid - paid[group_start]
+    return before
+
+
+def _stack_before(store: HandStore) -> np.ndarray:
+    """Chips behind for the acting seat just before each action."""
+    seat_rows = _seat_rows(store)
+    before = _paid_before(seat_rows, store.actions["chips"].astype(np.int64))
+    seats = store.seats
+    return seats["stack"][seat_rows] - seats["blind"][seat_rows] - before
+
+
+def _street_paid(store: HandStore) -> np.ndarray:
+    """Chips the acting seat already has in on this street, blinds included, before each action."""
+    actions = store.actions
+    seat_rows = _seat_rows(store)
+    street = actions["street"].astype(np.int64)
+    paid = _paid_before(seat_rows * len(STREETS) + street, actions["chips"].astype(np.int64))
+    return paid + np.where(street == 0, store.seats["blind"][seat_rows], 0)
+
+
+def _owed(store: HandStore) -> np.ndarray:
+    """Chips a call costs: the bet faced less what the seat has in on this street, at most its stack."""
+    owed = np.maximum(store.actions["to_call"] - _street_paid(store), 0)
+    return np.minimum(owed, np.maximum(_stack_before(store), 0)).astype(np.float64)
+
+
+def _opponents(store: HandStore) -> np.ndarray:
+    """Opponents still in the hand at each action."""
+    actions = store.actions
+    folds = (actions["code"] == FOLD).astype(np.int64)
+    folded_before = _paid_before(actions["hand"], folds)
+    seats = store.hands["seat_count"][actions["hand"]].astype(np.int64)
+    return np.maximum(seats - 1 - folded_before, 1)
+
+
+@dataclass
+class SeatFrame:
+    """One entry per dealt-in seat."""
+    player: np.ndarray
+    position: np.ndarray
+    net_bb: np.ndarray
+    showdown: np.ndarray
+    last_street: np.ndarray
+
+
+def seat_frame(store: HandStore) -> SeatFrame:
+    seats, hands, actions = store.seats, store.hands, store.actions
+    n = len(seats)
+    hand = seats["hand"]
+    seat_rows = _seat_rows(store)
+    folded = np.zeros(n, dtype=bool)
+    folded[seat_rows[actions["code"] == FOLD]] = True
+
+    live = np.bincount(hand, weights=~folded, minlength=len(hands))
+    final_street = np.zeros(len(hands), dtype=np.int64)
+    np.maximum.at(final_street, actions["hand"], actions["street"])
+    seat_street = np.zeros(n, dtype=np.int64)
+    np.maximum.at(seat_street, seat_rows, actions["street"])
+
+    net = (seats["won"].astype(np.int64) - seats["contributed"]) / hands["big_blind"][hand]
+    return SeatFrame(
+        player=seats["player"],
+        position=seats["position"],
+        net_bb=net,
+        showdown=~folded & (live[hand] >= 2),
+        last_street=np.where(folded, seat_street, final_street[hand]),
+    )
+
+
+def _group(keys: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    return np.bincount(keys, weights=values, minlength=size)
+
+
+# ==== Reports ====
+def _player_mask(store: HandStore, player: Optional[str], rows: np.ndarray) -> np.ndarray:
+    if player is None:
+        return np.ones(len(rows), dtype=bool)
+    if player not in store.strings:
+        return np.zeros(len(rows), dtype=bool)
+    return store.seats["player"][rows] == store.strings.index(player)
+
+
+def win_rate_by(store: HandStore, key: str, player: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Hands, net big blinds and bb/100 grouped by "position", "street" or "player"."""
+    frame = seat_frame(store)
+    mask = _player_mask(store, player, np.arange(len(store.seats)))
+    if key == "street":
+        keys, labels = frame.last_street, STREETS
+    elif key in ("position", "player"):
+        keys, labels = getattr(frame, key), store.strings
+    else:
+        raise ValueError(f"Unknown grouping: {key}")
+    size = max(len(labels), int(keys.max(initial=0)) + 1)
+    hands = _group(keys[mask], np.ones(mask.sum()), size)
+    net = _group(keys[mask], frame.net_bb[mask], size)
+    return {labels[i]: {"hands": int(hands[i]), "net_bb": float(net[i]), "bb_per_100": float(100 * net[i] / hands[i])}
+            for i in np.flatnonzero(hands)}
+
+
+def showdown_split(store: HandStore, player: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Net big blinds won at showdown and without showdown, per player."""
+    frame = seat_frame(store)
+    mask = _player_mask(store, player, np.arange(len(store.seats)))
+    size = len(store.strings)
+    result = {}
+    for label, part in (("showdown", frame.showdown), ("non_showdown", ~frame.showdown)):
+        keep = mask & part
+        net = _group(frame.player[keep], frame.net_bb[keep], size)
+        for i in np.flatnonzero(_group(frame.player[mask], np.ones(mask.sum()), size)):
+            result.setdefault(store.strings[i], {})[label] = float(net[i])
+    return result
+
+
+def by_equity_bucket(store: HandStore, player: Optional[str] = None,
+                     buckets: int = EQUITY_BUCKETS) -> List[Dict[str, float]]:
+    """Decision count, action mix and EV loss per equity bucket (needs annotate())."""
+    actions = store.actions
+    mask = _player_mask(store, player, _seat_rows(store)) & ~np.isnan(actions["equity"])
+    bucket = np.minimum((actions["equity"][mask] * buckets).astype(np.int64), buckets - 1)
+    choice = _choice(actions["code"][mask])
+    bb = store.hands["big_blind"][actions["hand"][mask]]
+    count = _group(bucket, np.ones(len(bucket)), buckets)
+    loss = _group(bucket, actions["ev_loss"][mask] / bb, buckets)
+    mix = [_group(bucket, (choice == c).astype(np.float64), buckets) for c in range(3)]
+    return [{"equity": (i + 0.5) / buckets, "decisions": int(count[i]),
+             "fold": float(mix[0][i] / count[i]), "call": float(mix[1][i] / count[i]),
+             "raise": float(mix[2][i] / count[i]), "ev_loss_bb": float(loss[i] / count[i])}
+            for i in np.flatnonzero(count)]
+
+
+def ev_loss_by(store: HandStore, player: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Total and average EV lost versus the best action, per (position, street) (needs annotate())."""
+    actions = store.actions
+    seat_rows = _seat_rows(store)
+    mask = _player_mask(store, player, seat_rows) & ~np.isnan(actions["ev_loss"])
+    streets = np.minimum(actions["street"][mask], len(STREETS) - 1).astype(np.int64)
+    keys = store.seats["position"][seat_rows[mask]].astype(np.int64) * len(STREETS) + streets
+    size = len(store.strings) * len(STREETS)
+    bb = store.hands["big_blind"][actions["hand"][mask]]
+    count = _group(keys, np.ones(len(keys)), size)
+    loss = _group(keys, actions["ev_loss"][mask] / bb, size)
+    return {f"{store.strings[k // len(STREETS)]} {STREETS[k % len(STREETS)]}":
+            {"decisions": int(count[k]), "ev_loss_bb": float(loss[k]), "per_decision_bb": float(loss[k] / count[k])}
+            for k in np.flatnonzero(count)}
+
+
+def leaks(store: HandStore, player: Optional[str] = None, min_decisions: int = LEAK_MIN_DECISIONS) -> List[str]:
+    """Spots where the player gives up EV consistently, worst first."""
+    found = []
+    for spot, row in ev_loss_by(store, player).items():
+        if row["decisions"] >= min_decisions and row["per_decision_bb"] > LEAK_EV_LOSS_BB:
+            found.append((row["ev_loss_bb"], f"{spot}: loses {row['per_decision_bb']:.2f} bb per decision "
+                                             f"over {row['decisions']} decisions"))
+    for row in by_equity_bucket(store, player):
+        if row["decisions"] < min_decisions:
+            continue
+        if row["equity"] >= 0.6 and row["fold"] > 0.2:
+            found.append((row["ev_loss_bb"] * row["decisions"],
+                          f"folds {row['fold']:.0%} of hands with ~{row['equity']:.0%} equity"))
+        if row["equity"] <= 0.3 and row["raise"] > 0.3:
+            found.append((row["ev_loss_bb"] * row["decisions"],
+                          f"raises {row['raise']:.0%} of hands with ~{row['equity']:.0%} equity"))
+    return [text for _, text in sorted(found, reverse=True)]
+
+
+def report(store: HandStore, player: Optional[str] = None) -> str:
+    lines = [f"{len(store)} hands" + (f" for {player}" if player else "")]
+    for key in ("position", "street"):
+        lines.append(f"\nWin rate by {key}:")
+        for label, row in win_rate_by(store, key, player).items():
+            lines.append(f"  {label:<10} {row['hands']:>8} hands  {row['net_bb']:>+10.1f} bb  {row['bb_per_100']:>+8.1f} bb/100")
+    lines.append("\nShowdown / non-showdown winnings (bb):")
+    for name, row in showdown_split(store, player).items():
+        lines.append(f"  {name:<10} {row.get('showdown', 0):>+10.1f}  {row.get('non_showdown', 0):>+10.1f}")
+    buckets = by_equity_bucket(store, player)
+    if buckets:
+        lines.append("\nBy equity: decisions  fold  call  raise  EV loss/decision (bb)")
+        for row in buckets:
+            lines.append(f"  {row['equity']:.2f} {row['decisions']:>10} {row['fold']:>5.0%} {row['call']:>5.0%}"
+                         f" {row['raise']:>5.0%}  {row['ev_loss_bb']:>8.2f}")
+        found = leaks(store, player)
+        lines.append("\nLeaks:" if found else "\nNo leaks found.")
+        lines.extend(f"  - {text}" for text in found)
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Session statistics and leak detection")
+    parser.add_argument("path", nargs="?", default=HAND_STORE_PATH)
+    parser.add_argument("--player", help="only this player's seats and decisions")
+    parser.add_argument("--annotate", action="store_true", help="compute equities for unannotated decisions and save them")
+    parser.add_argument("--simulations", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    store = HandStore.load(args.path)
+    if args.annotate and annotate(store, args.simulations):
+        store.save(args.path)
+    print(report(store, args.player))
+
+
+if __name__ == "__main__":
+    main()
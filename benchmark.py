@@ -0,0 +1,384 @@
+"""
+Benchmark suite for the hot paths of the engine and AI.
+
+    python benchmark.py                          # run everything, print a table
+    python benchmark.py --json out.json          # also write machine-readable results
+    python benchmark.py --save bench_baseline.json
+    python benchmark.py --compare bench_baseline.json --tolerance 0.2
+    python benchmark.py --filter montecarlo
+    python benchmark.py --imports                # only the cold-import budget check
+
+Every benchmark reseeds the RNGs before setup and before each repeat, so runs are comparable.
+--compare exits with status 1 if any benchmark is slower than baseline by more than --tolerance.
+The import check runs with the full suite or --imports, not with --filter. It exits with
+status 1 if the fastest of five cold `import game`/`import ai` runs takes longer than
+--import-budget or a training-only package (pandas, scikit-learn, joblib) is loaded.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from cards import Card, Deck, HandRank, SUITS, RANKS
+from profiler import PROFILER
+from randomness import set_seed
+
+SEED = 1234
+DEFAULT_BASELINE = "bench_baseline.json"
+IMPORT_BUDGET_S = 0.2
+COLD_IMPORTS = ("game", "ai")
+TRAINING_ONLY = ("pandas", "sklearn", "joblib")
+POLL_INTERVAL_S = 0.001
+
+# name -> (setup, number of calls per repeat, repeats)
+BENCHMARKS: Dict[str, Tuple[Callable[[], Callable[[], object]], int, int]] = {}
+
+
+def benchmark(name: str, number: int = 100, repeat: int = 5):
+    """Register a setup function; it returns the zero-argument callable that gets timed."""
+    def register(setup):
+        BENCHMARKS[name] = (setup, number, repeat)
+        return setup
+    return register
+
+
+def seed_all(seed: int = SEED) -> None:
+    random.seed(seed)
+    np.random.seed(seed)
+    set_seed(seed)
+
+
+def sample_cards(n: int) -> List[Card]:
+    cards = [Card(suit=suit, rank=rank) for suit in SUITS for rank in RANKS]
+    return random.sample(cards, n)
+
+
+def make_table(num_players: int = 6, chips: int = 400):
+    from game import PokerGame, Player
+    game = PokerGame(num_players=num_players)
+    positions = ["SB", "BB", "UTG", "MP", "CO", "BTN", "UTG+1", "LJ", "HJ"][:num_players]
+    for pos in positions:
+        game.players.append(Player(pos, chips=chips, position=pos))
+    game.player = game.players[0]
+    return game
+
+
+def play_headless_hand(game, worker) -> None:
+    """
+    Deal a hand and let every seat act once per street, then evaluate the showdown. Rounds
+    go through the AIWorker (`worker`) the way the GUI plays them: decisions on its threads,
+    applied here when poll() hands them back.
+    """
+    for player in game.players:
+        player.is_active = True
+    game.start_new_hand()
+    worker.new_hand()
+    for stage, cards in (("preflop", 0), ("flop", 3), ("turn", 1), ("river", 1)):
+        game.current_stage = stage
+        if cards:
+            game.deal_community_cards(cards)
+        done = []
+        worker.request_round(game.players, done.append)
+        while not done:
+            if worker.poll():
+                time.sleep(POLL_INTERVAL_S)
+        if sum(p.is_active for p in game.players) <= 1:
+            break
+    game.settle_hand()
+
+
+# ==== Cards ====
+for _n in (5, 6, 7):
+    def _evaluate_setup(n=_n):
+        hands = [sample_cards(n) for _ in range(200)]
+        it = iter(range(10 ** 9))
+        return lambda: HandRank.evaluate_hand(hands[next(it) % len(hands)])
+    benchmark(f"evaluate_hand_{_n}", number=2000)(_evaluate_setup)
+
+
+@benchmark("deck_create", number=2000)
+def _deck_create():
+    return Deck
+
+
+@benchmark("deck_create_and_deal_9", number=2000)
+def _deck_deal():
+    def run():
+        deck = Deck()
+        for _ in range(9):
+            deck.deal(2)
+        deck.deal(5)
+    return run
+
+
+@benchmark("tablestate_reset_1000_tables", number=100)
+def _table_reset():
+    from tablestate import TableState
+    state = TableState(num_tables=1000, num_seats=9, rng=np.random.default_rng(SEED))
+    return state.reset
+
+
+@benchmark("tablestate_clone_1000_tables", number=1000)
+def _table_clone():
+    from tablestate import TableState
+    state = TableState(num_tables=1000, num_seats=9, rng=np.random.default_rng(SEED))
+    state.reset()
+    return state.clone
+
+
+# ==== Monte Carlo ====
+for _street, _board in (("preflop", 0), ("flop", 3), ("river", 5)):
+    for _sims in (100, 1000):
+        def _mc_setup(board=_board, sims=_sims):
+            from montecarlo import MonteCarloSimulator
+            simulator = MonteCarloSimulator(num_simulations=sims)
+            cards = sample_cards(2 + board)
+            return lambda: simulator.calculate_win_rate(cards[:2], cards[2:])
+        benchmark(f"montecarlo_{_street}_{_sims}", number=1, repeat=5 if _sims == 1000 else 10)(_mc_setup)
+    for _mode in ("stratified", "quasi"):
+        def _mc_mode_setup(board=_board, mode=_mode):
+            from montecarlo import MonteCarloSimulator
+            simulator = MonteCarloSimulator(num_simulations=200, sampling=mode, control_variate=True)
+            cards = sample_cards(2 + board)
+            return lambda: simulator.calculate_win_rate(cards[:2], cards[2:])
+        benchmark(f"montecarlo_{_mode}_{_street}_200", number=5, repeat=10)(_mc_mode_setup)
+
+
+# ==== AI ====
+def _decision_setup(use_ml: bool):
+    game = make_table()
+    game.start_new_hand()
+    player = game.players[2]
+    ai = game.ai_agent
+    if use_ml:
+        ai.ml_model = _tiny_model()
+        ai.use_ml = True
+    else:
+        ai.use_ml = False
+    return lambda: ai.make_decision(game, player, player.position)
+
+
+def _tiny_model():
+    # A small model trained on random features, so the predict() cost is measured without ml/model.pkl
+    from ml.trainer import train_model, load_model
+    rng = np.random.default_rng(SEED)
+    X = rng.integers(0, 15, size=(400, 11)).astype(float)
+    y = rng.choice(["fold", "call", "raise"], size=400)
+    path = os.path.join(tempfile.mkdtemp(prefix="ace-bench-"), "model.pkl")
+    with contextlib.redirect_stdout(sys.stderr):
+        train_model(X, y, model_path=path)
+    return load_model(path)
+
+
+benchmark("ai_decision_rules", number=1, repeat=5)(lambda: _decision_setup(False))
+benchmark("ai_decision_ml", number=1, repeat=5)(lambda: _decision_setup(True))
+
+
+@benchmark("bet_sizing_flop", number=20)
+def _bet_sizing():
+    game = make_table()
+    game.start_new_hand()
+    game.deal_community_cards(3)
+    player = game.players[2]
+    return lambda: game.ai_agent.raise_amount(game, player)
+
+
+@benchmark("extract_features", number=5000)
+def _features():
+    from ml.features import extract_features
+    cards = sample_cards(5)
+    return lambda: extract_features(cards[:2], cards[2:], "BTN", 120, 40)
+
+
+@benchmark("showdown_settle_9way", number=500)
+def _settle():
+    from settlement import settle_players
+    game = make_table(num_players=9)
+    game.start_new_hand()
+    game.deal_community_cards(5)
+    for i, player in enumerate(game.players):
+        player.bet(40 * (i + 1))
+    return lambda: settle_players(game.players, game.community_cards)
+
+
+# ==== Full hands ====
+@benchmark("headless_hand_6max", number=1, repeat=3)
+def _headless_hand():
+    from aiworker import AIWorker
+    game = make_table()
+    game.ai_agent.use_ml = False
+    game.ai_agent.simulator.num_simulations = 200
+    worker = AIWorker(game)
+    return lambda: play_headless_hand(game, worker)
+
+
+# ==== Cold start ====
+_COLD_IMPORT = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print(json.dumps([time.perf_counter() - start, [m for m in {heavy!r} if m in sys.modules]]))\n"
+)
+
+
+def cold_import(module: str) -> Tuple[float, List[str]]:
+    """Import `module` in a fresh interpreter; returns (seconds, training-only packages it loaded)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run([sys.executable, "-c", _COLD_IMPORT.format(module=module, heavy=TRAINING_ONLY)],
+                         cwd=here, capture_output=True, text=True, check=True).stdout
+    seconds, loaded = json.loads(out.splitlines()[-1])
+    return seconds, loaded
+
+
+def check_imports(budget_s: float = IMPORT_BUDGET_S, repeat: int = 5) -> Tuple[Dict, List[str]]:
+    """
+    Cold import time of each COLD_IMPORTS module and the budget violations. The budget is
+    checked against the fastest of `repeat` runs, which a busy machine disturbs least.
+    """
+    results, failures = {}, []
+    for module in COLD_IMPORTS:
+        runs = [cold_import(module) for _ in range(repeat)]
+        fastest = min(seconds for seconds, _ in runs)
+        loaded = sorted({name for _, names in runs for name in names})
+        results[module] = {"median_s": statistics.median(seconds for seconds, _ in runs), "min_s": fastest,
+                           "loaded": loaded}
+        print(f"import {module:<25}{_fmt(fastest):>12}", file=sys.stderr)
+        if fastest > budget_s:
+            failures.append(f"import {module}: {_fmt(fastest)} > budget {_fmt(budget_s)}")
+        if loaded:
+            failures.append(f"import {module} loads training-only packages: {', '.join(loaded)}")
+    return results, failures
+
+
+def run_benchmark(name: str) -> Dict[str, float]:
+    setup, number, repeat = BENCHMARKS[name]
+    seed_all()
+    fn = setup()
+    fn()  # warm-up
+    timings = []
+    for i in range(repeat):
+        seed_all(SEED + i)
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "mean_s": statistics.fmean(timings),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run_all(pattern: str = "") -> Dict:
+    results = {}
+    for name in BENCHMARKS:
+        if pattern in name:
+            results[name] = run_benchmark(name)
+            print(f"{name:<32}{_fmt(results[name]['median_s']):>12}", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": SEED,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return a line per benchmark that regressed beyond tolerance (relative change of the median)."""
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        change = result["median_s"] / base["median_s"] - 1.0
+        marker = ""
+        if change > tolerance:
+            marker = "  REGRESSION"
+            regressions.append(f"{name}: {_fmt(base['median_s'])} -> {_fmt(result['median_s'])} ({change:+.0%})")
+        print(f"{name:<32}{_fmt(base['median_s']):>12}{_fmt(result['median_s']):>12}{change:>+9.0%}{marker}")
+    return regressions
+
+
+def _fmt(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="ACE Poker benchmarks")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, help="save results as the baseline")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing (0.2 = 20%%)")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    parser.add_argument("--stages", action="store_true", help="also report per-stage latency percentiles")
+    parser.add_argument("--imports", action="store_true", help="only run the cold-import budget check")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_S,
+                        help="maximum cold import time of the game/AI modules in seconds")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    # Cold imports start fresh interpreters, so they only run for the full suite or --imports
+    import_results, import_failures = {}, []
+    if args.imports or not args.filter:
+        import_results, import_failures = check_imports(args.import_budget)
+    if args.imports:
+        print(json.dumps(import_results, indent=2))
+        if import_failures:
+            print("\nImport budget exceeded:\n  " + "\n  ".join(import_failures))
+        return 1 if import_failures else 0
+
+    if args.stages:
+        PROFILER.enable()
+    results = run_all(args.filter)
+    if import_results:
+        results["imports"] = import_results
+    if args.stages:
+        results["stages"] = PROFILER.report()
+        print(PROFILER.format_report(), file=sys.stderr)
+    for path in (args.json, args.save):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nPerformance regressions:\n  " + "\n  ".join(regressions))
+            return 1
+    elif not args.json and not args.save:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if import_failures:
+        print("\nImport budget exceeded:\n  " + "\n  ".join(import_failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
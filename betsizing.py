@@ -0,0 +1,123 @@
+"""
+Bet sizing: pick the raise size with the highest expected value from a grid.
+
+Candidates are fractions of the pot (SIZE_FRACTIONS) plus all-in, as raise-to amounts no
+smaller than the minimum raise. Each size is scored as
+
+    EV(b) = fold(b) * pot + (1 - fold(b)) * calculate_expected_value(eq(b), pot + b, b)
+
+with the same EV formula the simulator and the replay analysis use, applied to the whole
+grid as arrays.
+
+Fold equity: an opponent who folds `base` of the time to a REFERENCE_FRACTION pot bet
+(fold_to_cbet postflop, 1 - VPIP preflop, from opponents.py) folds
+
+    fold(b) = 1 - (1 - base) ** (odds(b) / odds(reference)),   odds(b) = b / (pot + 2b)
+
+to a bet of b, the price they are laid. Bigger bets fold out more, never everything, and
+a multiway pot only folds when every opponent does. The opponent is assumed to fold the
+weakest part of their range (ranges.combo_strength), so eq(b) is the equity against what
+is left; the equities of all sizes come from one batch_win_rates call.
+"""
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from montecarlo import MonteCarloSimulator, batch_win_rates
+from opponents import PRIORS
+from ranges import combo_strength, full_range, remove_dead
+
+SIZE_FRACTIONS = (0.33, 0.5, 0.75, 1.0, 1.5)
+REFERENCE_FRACTION = 0.66
+SIZING_SIMULATIONS = 200
+
+
+@dataclass
+class Sizing:
+    amounts: np.ndarray     # raise-to amount of each candidate
+    fold: np.ndarray        # chance that everyone folds to it
+    equity: np.ndarray      # equity when called
+    ev: np.ndarray
+
+    @property
+    def best(self) -> int:
+        return int(self.amounts[int(np.argmax(self.ev))])
+
+
+def min_raise_to(current_bet: int, big_blind: int = 0) -> int:
+    return max(2 * current_bet, big_blind)
+
+
+def candidate_sizes(pot: int, current_bet: int, chips: int, big_blind: int = 0,
+                    fractions: Sequence[float] = SIZE_FRACTIONS) -> np.ndarray:
+    """Sorted distinct raise-to amounts: call, then raise each fraction of the pot; plus all-in."""
+    fractions = np.asarray(fractions, dtype=np.float64)
+    sizes = np.rint(current_bet + fractions * (pot + current_bet)).astype(np.int64)
+    sizes = np.clip(sizes, min_raise_to(current_bet, big_blind), None)
+    return np.unique(np.append(sizes[(sizes > 0) & (sizes < chips)], chips))
+
+
+def _pot_odds(pot: int, bets: np.ndarray) -> np.ndarray:
+    return bets / np.maximum(pot + 2 * bets, 1)
+
+
+def fold_probability(base, pot, bets: np.ndarray) -> np.ndarray:
+    """Chance that an opponent folding `base` to a REFERENCE_FRACTION pot bet folds to each bet; broadcasts."""
+    reference = _pot_odds(pot, REFERENCE_FRACTION * np.maximum(pot, 1))
+    base = np.clip(base, 0.0, 0.99)
+    return 1.0 - (1.0 - base) ** (_pot_odds(pot, np.asarray(bets, dtype=np.float64)) / reference)
+
+
+def fold_rate(stats, player_id: str, street: int) -> float:
+    """Base fold rate of one opponent: fold_to_cbet postflop, 1 - VPIP preflop; priors without stats."""
+    if street == 0:
+        return 1.0 - (stats.vpip(player_id) if stats else PRIORS["vpip"][0])
+    return stats.fold_to_cbet(player_id) if stats else PRIORS["fold_to_cbet"][0]
+
+
+def calling_ranges(weights: np.ndarray, board: Sequence[int], dead: Iterable[int], folds: np.ndarray) -> np.ndarray:
+    """(S, 1326) range left after the weakest `folds[s]` share of `weights` folds."""
+    strength = combo_strength(board)
+    live = remove_dead(weights, dead)
+    order = np.argsort(strength, kind="stable")
+    cumulative = np.cumsum(live[order]) / max(live.sum(), 1e-12)
+    cut = np.minimum(np.searchsorted(cumulative, folds, side="left"), len(order) - 1)
+    # Never fold the strongest live combo, so every calling range is non-empty
+    top = strength[order][np.flatnonzero(live[order] > 0)[-1]] if live.any() else 0.0
+    thresholds = np.minimum(strength[order][cut], top)
+    return live[None, :] * (strength[None, :] >= thresholds[:, None])
+
+
+def called_equities(hand: Sequence[int], board: Sequence[int], opponent_range: Optional[np.ndarray],
+                    folds: np.ndarray, num_simulations: int = SIZING_SIMULATIONS,
+                    rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Equity of card codes `hand` against the calling range for every size, in one batch."""
+    hand, board = [int(c) for c in hand], [int(c) for c in board]
+    weights = full_range() if opponent_range is None else np.asarray(opponent_range, dtype=np.float64)
+    ranges = calling_ranges(weights, board, hand + board, folds)
+    return batch_win_rates([hand] * len(folds), [board] * len(folds), num_simulations, list(ranges), rng)
+
+
+def score_sizes(amounts: np.ndarray, pot: int, fold: np.ndarray, equity, simulator: MonteCarloSimulator) -> Sizing:
+    """EV of every candidate; `equity` is one value or one per candidate."""
+    equity = np.broadcast_to(np.asarray(equity, dtype=np.float64), amounts.shape)
+    called = simulator.calculate_expected_value(equity, pot + amounts, amounts)
+    return Sizing(amounts, fold, equity, fold * pot + (1.0 - fold) * called)
+
+
+def choose_size(pot: int, current_bet: int, chips: int, simulator: MonteCarloSimulator,
+                fold_rates: Sequence[float], equity: float, hand: Optional[Sequence[int]] = None,
+                board: Sequence[int] = (), opponent_range: Optional[np.ndarray] = None, big_blind: int = 0,
+                num_simulations: int = SIZING_SIMULATIONS, rng: Optional[np.random.Generator] = None) -> Sizing:
+    """
+    Score the size grid. `fold_rates` are the base rates of the opponents still in, the
+    first being the one whose range the equity is computed against. Without `hand` every
+    size uses the given `equity`; with it, equity against each calling range is simulated.
+    """
+    amounts = candidate_sizes(pot, current_bet, chips, big_blind)
+    per_opponent: List[np.ndarray] = [fold_probability(rate, pot, amounts) for rate in fold_rates] or [np.zeros(len(amounts))]
+    fold = np.prod(per_opponent, axis=0)
+    if hand is not None:
+        equity = called_equities(hand, board, opponent_range, per_opponent[0], num_simulations, rng)
+    return score_sizes(amounts, pot, fold, equity, simulator)
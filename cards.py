@@ -1,11 +1,20 @@
 from enum import Enum
 from dataclasses import dataclass
-from typing import List
-import random
+from typing import List, Optional
+
+import numpy as np
+
+from logger import get_logger
+from randomness import resolve
+
+_log = get_logger("cards")
 
 SUITS = ['hearts', 'diamonds', 'clubs', 'spades']
 RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
 
+RANK_VALUES = {'2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8,
+               '9': 9, '10': 10, 'J': 11, 'Q': 12, 'K': 13, 'A': 14}
+
 class Suit(Enum):
     HEARTS = "♥"
     DIAMONDS = "♦"
@@ -48,11 +57,34 @@ class Card:
     def __eq__(self, other) -> bool:
         return isinstance(other, Card) and self.rank == other.rank and self.suit == other.suit
 
+def rank_value(rank) -> int:
+    # Deck deals string ranks ('10', 'J'), while some callers build cards from Rank enums
+    return rank.value if isinstance(rank, Rank) else RANK_VALUES.get(str(rank), 0)
+
+def flatten_cards(cards) -> List[Card]:
+    # Deck.deal() returns a list, so hands built with add_card(deck.deal()) hold nested lists
+    return [c[0] if isinstance(c, list) and c else c for c in cards]
+
+# Integer card codes: rank index (0 = '2' ... 12 = 'A') * 4 + suit index (SUITS order)
+SUIT_INDEX = {suit: i for i, suit in enumerate(SUITS)}
+SUIT_INDEX.update({suit: i for i, suit in enumerate(Suit)})
+
+def card_to_int(card: Card) -> int:
+    return (rank_value(card.rank) - 2) * 4 + SUIT_INDEX[card.suit]
+
+def int_to_card(code: int) -> Card:
+    return Card(suit=SUITS[code % 4], rank=RANKS[code // 4])
+
 class Deck:
-    def __init__(self):
-        self.cards = [Card(suit=suit, rank=rank) for suit in SUITS for rank in RANKS]
-        # print("Deck initialized with cards:", self.cards)
-        random.shuffle(self.cards)
+    # Cards are never mutated, so every deck shares these 52 objects
+    FULL_DECK: List["Card"] = []
+
+    def __init__(self, rng: Optional[np.random.Generator] = None):
+        if not Deck.FULL_DECK:
+            Deck.FULL_DECK = [Card(suit=suit, rank=rank) for suit in SUITS for rank in RANKS]
+        self.rng = rng    # None: the process default stream (randomness.py)
+        self.cards = Deck.FULL_DECK.copy()
+        resolve(self.rng).shuffle(self.cards)
 
     def deal(self, n=1):
         return [self.cards.pop() for _ in range(n)]
@@ -60,7 +92,8 @@ class Deck:
     def __len__(self) -> int:
         return len(self.cards)
     def reset(self):
-        self.__init__()  
+        self.cards[:] = Deck.FULL_DECK
+        resolve(self.rng).shuffle(self.cards)
 #  HandRank 
 class HandRank:
     ROYAL_FLUSH = 10
@@ -78,11 +111,7 @@ class HandRank:
     def evaluate_hand(cards: List[Card]) -> int:
         if len(cards) < 5:
             return HandRank.HIGH_CARD
-        print("evaluate_hand:", cards)
-        ranks = [card.rank for card in cards]
-        suits = [card.suit for card in cards]
-        print("ranks:", ranks)
-        print("suits:", suits)
+        _log.debug("evaluate_hand: %s", cards)
         ranks = []
         for card in cards:
             if hasattr(card, 'rank'):
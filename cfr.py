@@ -0,0 +1,456 @@
+"""
+CFR+ solver for an abstracted heads-up hold'em game.
+
+Abstraction
+  cards    preflop: the 169 hand classes; postflop: hand-strength percentile on the
+           flop, split into POSTFLOP_BUCKETS buckets
+  actions  fold / check / call / pot-sized raise (all-in once the stack is reached),
+           at most RAISE_CAP raises per street, histories encoded with actionhistory
+  streets  preflop, then a single flop betting round; the turn and river are dealt
+           without betting and the hand goes to showdown on the full board
+
+Only preflop and flop decisions are covered: the AI buckets the flop exactly as the solver
+does, and turn and river spots are off the tree and fall back to the AI's other rules.
+
+Each iteration samples one board (public chance sampling) and walks the betting tree
+once with reach vectors over all 1326 hole-card combos for both players, so terminal
+values and regret updates are NumPy operations over every combo at once. Batches of
+iterations can run on several processes. Checkpoints are .npz files; the exported
+strategy is a strategyfile, memory-mapped on load. PokerAI loads the exported StrategyTable and queries it per decision.
+
+    python cfr.py --iterations 20000 --workers 4 --checkpoint cfr_checkpoint.npz --out cfr_strategy.bin
+"""
+import argparse
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from actionhistory import ALL_IN, CALL, CHECK, FOLD, STREET_SEPARATOR, encode_action
+from cards import card_to_int, flatten_cards
+from evaluator import evaluate_batch
+from handclass import hand_class
+from logger import get_logger
+from randomness import stream
+from ranges import COMBO_INDEX, COMBO_MASK, COMBOS, PREFLOP_CLASS, strength_percentiles
+from strategyfile import STRATEGY_SECTIONS, StrategyFileError, open_file, write_sections
+
+_log = get_logger("cfr")
+
+STACK = 100.0          # big blinds
+BLINDS = (0.5, 1.0)    # player 0 is the small blind / button
+RAISE_CAP = 2
+POSTFLOP_BUCKETS = 10
+PREFLOP_BUCKETS = 169
+MAX_ACTIONS = 3
+DEFAULT_STRATEGY_PATH = "cfr_strategy.bin"
+POSITIONS = ("SB", "BB")
+
+
+@dataclass
+class Node:
+    street: int
+    player: int                       # -1 for terminals
+    history: bytes
+    contrib: Tuple[float, float]
+    actions: bytes = b""
+    children: List[int] = field(default_factory=list)
+    terminal: str = ""                # "fold" or "showdown"
+    loser: int = -1                   # who folded
+    offset: int = 0                   # first row in the regret table
+
+
+def build_tree() -> List[Node]:
+    nodes: List[Node] = []
+
+    def add(street, player, contrib, raises, acted, history) -> int:
+        index = len(nodes)
+        node = Node(street=street, player=player, history=history, contrib=contrib)
+        nodes.append(node)
+        me, opp = player, 1 - player
+        facing = contrib[opp] - contrib[me]
+        pot = contrib[0] + contrib[1]
+
+        def close(new_contrib):
+            if street == 0 and max(new_contrib) < STACK:
+                return add(1, 1, new_contrib, 0, 0, history + bytes([code]) + STREET_SEPARATOR)
+            return terminal(new_contrib, "showdown", -1, history + bytes([code]))
+
+        if facing > 0:
+            code = FOLD
+            node.actions += bytes([code])
+            node.children.append(terminal(contrib, "fold", me, history + bytes([code])))
+            code = CALL
+            new = _with(contrib, me, contrib[opp])
+            node.actions += bytes([code])
+            # The small blind completing preflop leaves the big blind an option
+            if acted == 0:
+                node.children.append(add(street, opp, new, raises, acted + 1, history + bytes([code])))
+            else:
+                node.children.append(close(new))
+        else:
+            code = CHECK
+            node.actions += bytes([code])
+            if acted == 0:
+                node.children.append(add(street, opp, contrib, raises, acted + 1, history + bytes([code])))
+            else:
+                node.children.append(close(contrib))
+        if raises < RAISE_CAP and max(contrib) < STACK:
+            raise_to = min(STACK, contrib[opp] + pot + facing)
+            code = ALL_IN if raise_to >= STACK else encode_action("raise", int(round(raise_to - contrib[me])), int(round(pot)))
+            node.actions += bytes([code])
+            node.children.append(add(street, opp, _with(contrib, me, raise_to), raises + 1, acted + 1, history + bytes([code])))
+        return index
+
+    def terminal(contrib, kind, loser, history) -> int:
+        nodes.append(Node(street=-1, player=-1, history=history, contrib=contrib, terminal=kind, loser=loser))
+        return len(nodes) - 1
+
+    add(0, 0, BLINDS, 0, 0, b"")
+    offset = 0
+    for node in nodes:
+        if node.player >= 0:
+            node.offset = offset
+            offset += PREFLOP_BUCKETS if node.street == 0 else POSTFLOP_BUCKETS
+    return nodes
+
+
+def _with(contrib, seat, value):
+    return (value, contrib[1]) if seat == 0 else (contrib[0], value)
+
+
+def strength_buckets(scores: np.ndarray, valid: np.ndarray, buckets: int = POSTFLOP_BUCKETS) -> np.ndarray:
+    """Bucket every combo by the percentile of its score among the valid combos."""
+    percentile = strength_percentiles(scores, valid)
+    return np.minimum((percentile * buckets).astype(np.int64), buckets - 1)
+
+
+def combo_scores(board: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Evaluator score of every combo on `board`; combos that collide with the board score -1."""
+    scores = np.full(len(COMBOS), -1, dtype=np.int64)
+    scores[valid] = evaluate_batch(COMBOS[valid], board)
+    return scores
+
+
+def regret_match(regrets: np.ndarray, num_actions: int) -> np.ndarray:
+    positive = np.maximum(regrets[:, :num_actions], 0)
+    total = positive.sum(axis=1, keepdims=True)
+    return np.where(total > 0, positive / np.where(total > 0, total, 1), 1.0 / num_actions)
+
+
+class _Board:
+    """Per-iteration data shared by every node: valid combos, buckets and showdown ordering."""
+
+    def __init__(self, board: np.ndarray):
+        self.valid = ~np.isin(COMBOS, board).any(axis=1)
+        self.scores = combo_scores(board, self.valid)
+        # Flop betting only sees the first three cards, so buckets come from those, the way
+        # postflop_bucket sees the flop at the table
+        flop = board[:3]
+        flop_valid = ~np.isin(COMBOS, flop).any(axis=1)
+        self.buckets = (PREFLOP_CLASS, strength_buckets(combo_scores(flop, flop_valid), flop_valid))
+        self.order = np.argsort(self.scores, kind="stable")
+        sorted_scores = self.scores[self.order]
+        self.lower = np.searchsorted(sorted_scores, self.scores, side="left")
+        self.upper = np.searchsorted(sorted_scores, self.scores, side="right")
+        self.mask_sorted = COMBO_MASK[self.order]
+
+
+def _opp_total(reach: np.ndarray) -> np.ndarray:
+    # Opponent reach summed over combos that share no card with each of our combos
+    per_card = reach @ COMBO_MASK
+    return reach.sum() - per_card[COMBOS[:, 0]] - per_card[COMBOS[:, 1]] + reach
+
+
+def _showdown(reach: np.ndarray, board: _Board) -> np.ndarray:
+    # (opponent reach we beat) - (opponent reach that beats us), card removal included
+    rs = reach[board.order]
+    cum = np.concatenate([[0.0], np.cumsum(rs)])
+    cum_card = np.vstack([np.zeros(52), np.cumsum(rs[:, None] * board.mask_sorted, axis=0)])
+    a, b = COMBOS[:, 0], COMBOS[:, 1]
+    lo, hi = board.lower, board.upper
+    win = cum[lo] - cum_card[lo, a] - cum_card[lo, b]
+    lose = (cum[-1] - cum[hi]) - (cum_card[-1, a] - cum_card[hi, a]) - (cum_card[-1, b] - cum_card[hi, b])
+    return win - lose
+
+
+class CFRSolver:
+    def __init__(self, seed: int = 0):
+        self.nodes = build_tree()
+        rows = max((n.offset + (PREFLOP_BUCKETS if n.street == 0 else POSTFLOP_BUCKETS)
+                    for n in self.nodes if n.player >= 0), default=0)
+        self.regrets = np.zeros((rows, MAX_ACTIONS))
+        self.strategy_sum = np.zeros((rows, MAX_ACTIONS))
+        self.iteration = 0
+        self.rng = stream("cfr", seed=seed)
+
+    # ==== Training ====
+    def run(self, iterations: int) -> None:
+        for _ in range(iterations):
+            self.iteration += 1
+            board = _Board(self.rng.choice(52, 5, replace=False))
+            reach = np.stack([board.valid.astype(np.float64)] * 2)
+            self._walk(0, reach, board)
+
+    def _walk(self, index: int, reach: np.ndarray, board: _Board) -> np.ndarray:
+        node = self.nodes[index]
+        if node.terminal == "fold":
+            winner = 1 - node.loser
+            stake = node.contrib[node.loser]
+            values = np.empty((2, len(COMBOS)))
+            values[winner] = stake * _opp_total(reach[node.loser])
+            values[node.loser] = -stake * _opp_total(reach[winner])
+            return values
+        if node.terminal == "showdown":
+            stake = node.contrib[0]
+            return np.stack([stake * _showdown(reach[1], board), stake * _showdown(reach[0], board)])
+
+        p, n_actions = node.player, len(node.actions)
+        buckets = board.buckets[node.street]
+        n_buckets = PREFLOP_BUCKETS if node.street == 0 else POSTFLOP_BUCKETS
+        rows = slice(node.offset, node.offset + n_buckets)
+        sigma = regret_match(self.regrets[rows], n_actions)[buckets]
+
+        child_values = []
+        for a, child in enumerate(node.children):
+            child_reach = reach.copy()
+            child_reach[p] *= sigma[:, a]
+            child_values.append(self._walk(child, child_reach, board))
+        action_values = np.stack([v[p] for v in child_values], axis=1)
+        node_value = (sigma * action_values).sum(axis=1)
+
+        instant = (action_values - node_value[:, None]) * board.valid[:, None]
+        weight = self.iteration
+        for a in range(n_actions):
+            self.regrets[rows, a] += np.bincount(buckets, weights=instant[:, a], minlength=n_buckets)
+            self.strategy_sum[rows, a] += weight * np.bincount(buckets, weights=reach[p] * sigma[:, a], minlength=n_buckets)
+        # CFR+: regrets never go negative
+        np.maximum(self.regrets[rows], 0, out=self.regrets[rows])
+
+        values = np.empty((2, len(COMBOS)))
+        values[p] = node_value
+        values[1 - p] = sum(v[1 - p] for v in child_values)
+        return values
+
+    def solve(self, iterations: int, workers: int = 1, batch: int = 50,
+              checkpoint: Optional[str] = None, checkpoint_every: int = 1000) -> None:
+        """Run `iterations` iterations, split into batches across `workers` processes."""
+        done, last_checkpoint = 0, 0
+        pool = None
+        if workers > 1:
+            from multiprocessing import Pool
+            pool = Pool(workers)
+        try:
+            while done < iterations:
+                start = time.perf_counter()
+                if pool is None:
+                    step = min(batch, iterations - done)
+                    self.run(step)
+                else:
+                    step = min(batch * workers, iterations - done)
+                    per_worker = [step // workers + (1 if i < step % workers else 0) for i in range(workers)]
+                    seeds = self.rng.integers(2 ** 63, size=workers)
+                    jobs = [(self.regrets, self.iteration, n, int(s)) for n, s in zip(per_worker, seeds) if n]
+                    for regret_delta, strategy_delta in pool.map(_run_batch, jobs):
+                        self.regrets += regret_delta
+                        self.strategy_sum += strategy_delta
+                    np.maximum(self.regrets, 0, out=self.regrets)
+                    self.iteration += step
+                done += step
+                _log.info("CFR iteration %d (%.0f it/s)", self.iteration, step / (time.perf_counter() - start))
+                if checkpoint and done - last_checkpoint >= checkpoint_every:
+                    self.save_checkpoint(checkpoint)
+                    last_checkpoint = done
+        finally:
+            if pool is not None:
+                pool.close()
+        if checkpoint:
+            self.save_checkpoint(checkpoint)
+
+    # ==== Persistence ====
+    def save_checkpoint(self, path: str) -> None:
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, regrets=self.regrets, strategy_sum=self.strategy_sum, iteration=self.iteration)
+        os.replace(tmp, path)
+
+    def load_checkpoint(self, path: str) -> None:
+        data = np.load(path)
+        self.regrets = data["regrets"].copy()
+        self.strategy_sum = data["strategy_sum"].copy()
+        self.iteration = int(data["iteration"])
+
+    def average_strategy(self) -> np.ndarray:
+        total = self.strategy_sum.sum(axis=1, keepdims=True)
+        probs = np.zeros_like(self.strategy_sum)
+        for node in self.nodes:
+            if node.player < 0:
+                continue
+            n_buckets = PREFLOP_BUCKETS if node.street == 0 else POSTFLOP_BUCKETS
+            rows = slice(node.offset, node.offset + n_buckets)
+            uniform = 1.0 / len(node.actions)
+            probs[rows, :len(node.actions)] = np.where(
+                total[rows] > 0, self.strategy_sum[rows, :len(node.actions)] / np.where(total[rows] > 0, total[rows], 1), uniform)
+        return probs
+
+    def export(self, path: str = DEFAULT_STRATEGY_PATH) -> "StrategyTable":
+        decision = [n for n in self.nodes if n.player >= 0]
+        table = StrategyTable(
+            histories=[n.history for n in decision],
+            actions=[n.actions for n in decision],
+            streets=np.array([n.street for n in decision], dtype=np.int8),
+            offsets=np.array([n.offset for n in decision], dtype=np.int32),
+            probs=self.average_strategy().astype(np.float16),
+            node_positions=np.array([n.player for n in decision], dtype=np.int8),
+        )
+        table.save(path)
+        return table
+
+
+def _run_batch(args) -> Tuple[np.ndarray, np.ndarray]:
+    regrets, iteration, iterations, seed = args
+    solver = CFRSolver(seed=seed)
+    solver.regrets = regrets.copy()
+    solver.iteration = iteration
+    solver.run(iterations)
+    return solver.regrets - regrets, solver.strategy_sum
+
+
+class StrategyTable:
+    """Exported average strategy: one row of action probabilities per (history, bucket)."""
+
+    def __init__(self, histories: Sequence[bytes], actions: Sequence[bytes], streets: np.ndarray,
+                 offsets: np.ndarray, probs: np.ndarray, node_positions: Optional[np.ndarray] = None,
+                 positions: Sequence[str] = POSITIONS):
+        self.histories = list(histories)
+        self.actions = list(actions)
+        self.streets = streets
+        self.offsets = offsets
+        self.probs = probs
+        self.positions = list(positions)
+        self.node_positions = node_positions if node_positions is not None else np.zeros(len(self.histories), np.int8)
+        self.index: Dict[bytes, int] = {h: i for i, h in enumerate(self.histories)}
+
+    def save(self, path: str) -> None:
+        write_sections(path, {
+            "strategy_seats": np.array(self.positions, dtype="S8"),
+            "node_history": np.array(self.histories, dtype=object).astype("S"),
+            "node_position": self.node_positions.astype(np.int8),
+            "node_street": self.streets.astype(np.int8),
+            "node_actions": np.array(self.actions, dtype=object).astype("S"),
+            "node_offset": self.offsets.astype(np.int32),
+            "probs": self.probs.astype(np.float16),
+        })
+
+    @classmethod
+    def load(cls, path: str) -> "StrategyTable":
+        """Open the strategy sections of a strategy file; probs stays a view into the mapping."""
+        f = open_file(path)
+        if not all(name in f for name in STRATEGY_SECTIONS):
+            raise StrategyFileError(f"{path} has no solved strategy")
+        return cls([bytes(h) for h in f["node_history"]], [bytes(a) for a in f["node_actions"]],
+                   f["node_street"], f["node_offset"], f["probs"], f["node_position"],
+                   [p.decode() for p in f["strategy_seats"]])
+
+    def lookup(self, history: bytes, bucket: int, position: Optional[str] = None) -> Optional[Dict[int, float]]:
+        """Action code -> probability at this decision point, or None if it is not in the tree."""
+        node = self.index.get(history)
+        if node is None:
+            return None
+        if position is not None and self.positions[self.node_positions[node]] != position:
+            return None
+        if not 0 <= bucket < (PREFLOP_BUCKETS if self.streets[node] == 0 else POSTFLOP_BUCKETS):
+            return None
+        actions = self.actions[node]
+        row = self.probs[self.offsets[node] + bucket]
+        return {code: float(row[i]) for i, code in enumerate(actions)}
+
+    def street(self, history: bytes) -> int:
+        """Street (0 = preflop) of an abstract decision point."""
+        return int(self.streets[self.index[history]])
+
+    def project(self, real_history: bytes) -> Optional[bytes]:
+        """
+        Map a real (possibly multiway) history onto the abstract tree: folds by other seats
+        are dropped, check/call are interchangeable and any raise follows the abstract raise.
+        Returns the abstract history of the decision point reached, or None, also when that
+        point is on another street than the real one (e.g. a multiway limp that closes the
+        abstract preflop round).
+        """
+        current = b""
+        for street, codes in enumerate(real_history.split(STREET_SEPARATOR)):
+            if street > 0:
+                if current + STREET_SEPARATOR not in self.index and not current.endswith(STREET_SEPARATOR):
+                    return None
+            for code in codes:
+                if code == FOLD:
+                    continue
+                node = self.index.get(current)
+                if node is None:
+                    return None
+                step = _match_action(code, self.actions[node])
+                if step is None:
+                    continue
+                if current + bytes([step]) in self.index:
+                    current += bytes([step])
+                elif current + bytes([step]) + STREET_SEPARATOR in self.index:
+                    current += bytes([step]) + STREET_SEPARATOR
+                else:
+                    return None
+        if current not in self.index or self.street(current) != real_history.count(STREET_SEPARATOR):
+            return None
+        return current
+
+
+def _match_action(code: int, available: bytes) -> Optional[int]:
+    if code in available:
+        return code
+    if code in (CHECK, CALL):
+        for alt in (CHECK, CALL):
+            if alt in available:
+                return alt
+        return None
+    # Any bet size maps to the one abstract raise
+    for alt in available:
+        if alt not in (FOLD, CHECK, CALL):
+            return alt
+    return None
+
+
+def preflop_bucket(hand) -> int:
+    return hand_class(hand)
+
+
+def postflop_bucket(hand, board) -> int:
+    """Strength bucket of `hand` against every other holding on the flop (the solver's postflop round)."""
+    board_codes = np.array([card_to_int(c) for c in flatten_cards(board)[:3]])
+    a, b = sorted(card_to_int(c) for c in flatten_cards(hand))
+    valid = ~np.isin(COMBOS, board_codes).any(axis=1)
+    scores = combo_scores(board_codes, valid)
+    return int(strength_buckets(scores, valid)[COMBO_INDEX[(a, b)]])
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Train the abstract CFR+ strategy")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--checkpoint", default="cfr_checkpoint.npz")
+    parser.add_argument("--checkpoint-every", type=int, default=1000)
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=DEFAULT_STRATEGY_PATH)
+    args = parser.parse_args(argv)
+
+    solver = CFRSolver(seed=args.seed)
+    if args.resume and os.path.exists(args.checkpoint):
+        solver.load_checkpoint(args.checkpoint)
+    solver.solve(args.iterations, workers=args.workers, batch=args.batch,
+                 checkpoint=args.checkpoint, checkpoint_every=args.checkpoint_every)
+    solver.export(args.out)
+    print(f"Wrote {args.out} after {solver.iteration} iterations")
+
+
+if __name__ == "__main__":
+    main()
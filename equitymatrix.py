@@ -0,0 +1,189 @@
+"""
+Heads-up preflop all-in equity of every hole-card combo against every other.
+
+The matrix is built board by board rather than matchup by matchup. For each 5-card board
+all 1326 combos are scored at once, and G[a, b] counts the boards on which combo a beats
+combo b. Combos that collide with the board score -1, so they lose to every live combo.
+With N[a, b] the boards on which both are live and s[a] those on which a is live, ties
+counting half:
+
+    equity[a, b] = (G[a, b] - G[b, a] - s[a] + s[b] + N[a, b]) / (2 N[a, b])
+
+Equity is unchanged by relabelling suits, so every count is summed over the 24 suit maps
+at the end. An exact build visits each of the 134,459 suit-canonical boards once, weighted
+by the number of boards it stands for (abstraction.canonical_keys). The default build
+samples random boards, and the suit symmetrisation makes each sample count 24 times.
+
+One strategyfile holds the result, memory-mapped on load:
+
+    equity   f4 (1326, 1326)   equity of the row combo against the column combo, 0 where they share a card
+    boards   i8 (1,)           boards sampled, 0 for an exact build
+
+Equity of a hand or a range against a range (ranges.Range or a (1326,) weight vector) is
+then one matrix-vector product (EquityMatrix).
+
+    python equitymatrix.py                       # 20000 random boards, under 2 minutes on one core
+    python equitymatrix.py --exact --workers 8   # every board, about 11 minutes on one core
+"""
+import argparse
+import os
+import time
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+from abstraction import canonical_keys, key_board
+from evaluator import evaluate_codes
+from handclass import COMBOS, NUM_COMBOS, PAIR_COMBO
+from handstrength import SUIT_MAPS
+from logger import get_logger
+from randomness import stream
+from ranges import COMBO_MASK
+from strategyfile import open_file, write_sections
+
+_log = get_logger("equitymatrix")
+
+PREFLOP_EQUITY_PATH = "preflop_equity.bin"
+DEFAULT_BOARDS = 20_000
+CHUNK = 250
+
+
+@lru_cache(maxsize=1)
+def compatible() -> np.ndarray:
+    """(1326, 1326) float32, 1 where two combos share no card."""
+    table = (COMBO_MASK @ COMBO_MASK.T == 0).astype(np.float32)
+    table.setflags(write=False)
+    return table
+
+
+def _weights(weights) -> np.ndarray:
+    return np.asarray(getattr(weights, "weights", weights), dtype=np.float32)
+
+
+# ==== Build ====
+def _board_counts(boards: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(G, N, s) for a chunk of boards, as defined in the module docstring."""
+    live = COMBO_MASK[:, boards].sum(axis=2).T == 0            # (B, 1326)
+    rows, combos = np.nonzero(live)
+    scores = np.full(live.shape, -1, dtype=np.int64)
+    scores[rows, combos] = evaluate_codes(np.column_stack([COMBOS[combos], boards[rows]]))
+    wins = np.zeros((NUM_COMBOS, NUM_COMBOS), dtype=np.int32)
+    for row in scores:
+        wins += row[:, None] > row[None, :]
+    live = live.astype(np.float64)
+    return wins, live.T @ live, live.sum(axis=0)
+
+
+def _counts_job(args) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    boards, weight = args
+    wins, both, single = _board_counts(boards)
+    return wins.astype(np.float64) * weight, both * weight, single * weight
+
+
+def _symmetrise(table: np.ndarray) -> np.ndarray:
+    """Sum of the table over every relabelling of the suits."""
+    total = np.zeros_like(table)
+    for suit_map in SUIT_MAPS:
+        perm = PAIR_COMBO[suit_map[COMBOS[:, 0]], suit_map[COMBOS[:, 1]]]
+        total += table[np.ix_(perm, perm)] if table.ndim == 2 else table[perm]
+    return total
+
+
+def _jobs(exact: bool, boards: int, rng: np.random.Generator):
+    if exact:
+        keys, counts = canonical_keys(5, counts=True)
+        for count in np.unique(counts):
+            group = np.array([key_board(k, 5) for k in keys[counts == count]], dtype=np.int64)
+            for start in range(0, len(group), CHUNK):
+                yield group[start:start + CHUNK], float(count)
+        return
+    for start in range(0, boards, CHUNK):
+        n = min(CHUNK, boards - start)
+        yield np.argsort(rng.random((n, 52)), axis=1)[:, :5], 1.0
+
+
+def build(exact: bool = False, boards: int = DEFAULT_BOARDS, workers: Optional[int] = None, seed: int = 0,
+          out_path: str = PREFLOP_EQUITY_PATH) -> str:
+    """Compute the matrix from `boards` random boards, or every board when `exact`, and write it."""
+    workers = workers or os.cpu_count() or 1
+    rng = stream("equitymatrix", seed=seed)
+    start = time.perf_counter()
+    wins = np.zeros((NUM_COMBOS, NUM_COMBOS))
+    both = np.zeros((NUM_COMBOS, NUM_COMBOS))
+    single = np.zeros(NUM_COMBOS)
+
+    pool = None
+    if workers > 1:
+        from multiprocessing import Pool
+        pool = Pool(workers)
+    try:
+        parts = pool.imap_unordered(_counts_job, _jobs(exact, boards, rng)) if pool else map(_counts_job, _jobs(exact, boards, rng))
+        for done, (w, b, s) in enumerate(parts, 1):
+            wins += w
+            both += b
+            single += s
+            if done % 100 == 0:
+                _log.info("%d board chunks done in %.0fs", done, time.perf_counter() - start)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    wins, both, single = _symmetrise(wins), _symmetrise(both), _symmetrise(single)
+    doubled = wins - wins.T - single[:, None] + single[None, :] + both
+    equity = np.where(both > 0, doubled / np.maximum(2 * both, 1), 0.0) * compatible()
+    write_sections(out_path, {"equity": equity.astype(np.float32),
+                              "boards": np.array([0 if exact else boards], dtype=np.int64)})
+    _log.info("Wrote %s (%s) in %.1fs", out_path, "exact" if exact else f"{boards} boards",
+              time.perf_counter() - start)
+    return out_path
+
+
+# ==== Lookup ====
+class EquityMatrix:
+    """Preflop all-in equities; hands are combo indices (ranges.hand_combo), ranges (1326,) weights or Range."""
+
+    def __init__(self, path: str = PREFLOP_EQUITY_PATH):
+        f = open_file(path)
+        self.path = path
+        self.equity = f["equity"]
+        self.boards = int(f["boards"][0])
+
+    @property
+    def exact(self) -> bool:
+        return self.boards == 0
+
+    def against(self, villain) -> np.ndarray:
+        """Equity of every combo against the range (NaN where no combo of the range is left)."""
+        weights = _weights(villain)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (self.equity @ weights) / (compatible() @ weights)
+
+    def hand_vs_range(self, combo: int, villain) -> float:
+        weights = _weights(villain)
+        live = float(compatible()[combo] @ weights)
+        return float(self.equity[combo] @ weights) / live if live > 0 else float("nan")
+
+    def range_vs_range(self, hero, villain) -> float:
+        hero, villain = _weights(hero), _weights(villain)
+        live = float(hero @ compatible() @ villain)
+        return float(hero @ self.equity @ villain) / live if live > 0 else float("nan")
+
+
+def load(path: str = PREFLOP_EQUITY_PATH) -> Optional[EquityMatrix]:
+    return EquityMatrix(path) if os.path.exists(path) else None
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Build the 1326 x 1326 preflop all-in equity matrix")
+    parser.add_argument("--exact", action="store_true", help="enumerate every board instead of sampling")
+    parser.add_argument("--boards", type=int, default=DEFAULT_BOARDS, help="random boards to sample")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=PREFLOP_EQUITY_PATH)
+    args = parser.parse_args(argv)
+    build(args.exact, args.boards, args.workers, args.seed, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Local equity service: one warm MonteCarloSimulator shared by every GUI, bot and script.
+
+The server listens on localhost TCP ("127.0.0.1:8765") or a Unix socket ("unix:/tmp/ace.sock")
+and speaks newline-delimited JSON:
+
+    -> {"id": 7, "hand": [48, 51], "board": [0, 13, 26], "position": "BTN", "range": "<base64 float32>"}
+    <- {"id": 7, "equity": 0.6412}
+
+"range" (a 1326-combo weight vector, see ranges.py) and "simulations" are optional. Requests
+from all connections go through one bounded queue; a batcher takes whatever is waiting
+(up to MAX_BATCH, waiting at most MAX_WAIT_S for stragglers) and scores it with a single
+montecarlo.batch_win_rates call. Answers for queries without a range are kept in an LRU
+cache. When the queue is full, connections stop being read, so clients are slowed down
+by the socket instead of the server buffering without limit.
+
+EquityClient is a MonteCarloSimulator whose calculate_win_rate asks the service and falls
+back to the same estimator locally when the service cannot be reached. Set ACE_EQUITY_SERVICE to an
+address to make every PokerAI use it.
+
+    python equityservice.py --address 127.0.0.1:8765 --simulations 1000
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import socket
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cards import Card, card_to_int, flatten_cards, int_to_card
+from logger import get_logger
+from montecarlo import MonteCarloSimulator, batch_win_rates
+from randomness import stream
+from ranges import NUM_COMBOS
+
+_log = get_logger("equityservice")
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+MAX_BATCH = 64
+MAX_WAIT_S = 0.002
+MAX_QUEUE = 1024
+MAX_IN_FLIGHT = 256      # per connection
+CACHE_SIZE = 4096
+
+
+class EquityServiceError(RuntimeError):
+    pass
+
+
+def parse_address(address: str) -> Tuple[str, object]:
+    """("unix", path) for "unix:<path>", otherwise ("tcp", (host, port)) for "host:port"."""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+def encode_range(weights: np.ndarray) -> str:
+    return base64.b64encode(np.asarray(weights, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_range(data: str) -> np.ndarray:
+    weights = np.frombuffer(base64.b64decode(data), dtype=np.float32).astype(np.float64)
+    if len(weights) != NUM_COMBOS:
+        raise ValueError(f"range must have {NUM_COMBOS} weights, got {len(weights)}")
+    return weights
+
+
+def score_queries(simulator: MonteCarloSimulator, queries: List[tuple],
+                  rng: Optional[np.random.Generator] = None) -> List[float]:
+    """
+    Equities for (hand, board, position, opponent range, simulations) queries of card codes:
+    one batch_win_rates call per distinct simulation count, blended like calculate_win_rate.
+    The service and EquityClient's local fallback both score with this, so they agree.
+    """
+    results: List[float] = [0.0] * len(queries)
+    by_sims: Dict[int, List[int]] = {}
+    for i, query in enumerate(queries):
+        by_sims.setdefault(query[4], []).append(i)
+    for sims, indices in by_sims.items():
+        simulated = batch_win_rates([queries[i][0] for i in indices], [queries[i][1] for i in indices], sims,
+                                    opponent_ranges=[queries[i][3] for i in indices], rng=rng)
+        for i, win_rate in zip(indices, simulated):
+            hand, _, position = queries[i][:3]
+            results[i] = simulator.blend_win_rate([int_to_card(c) for c in hand], float(win_rate), position)
+    return results
+
+
+# ==== Server ====
+class EquityService:
+    def __init__(self, num_simulations: int = 1000, max_batch: int = MAX_BATCH, max_wait: float = MAX_WAIT_S,
+                 max_queue: int = MAX_QUEUE, cache_size: int = CACHE_SIZE,
+                 rng: Optional[np.random.Generator] = None):
+        self.simulator = MonteCarloSimulator(num_simulations)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.cache_size = cache_size
+        self.rng = rng or stream("equityservice")
+        self.stats = {"requests": 0, "batches": 0, "cache_hits": 0}
+        self._cache: "OrderedDict[tuple, float]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        # One compute thread: batches are already vectorized, and the event loop stays free
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="equity-batch")
+
+    async def evaluate(self, hand: List[int], board: List[int], position: str = "SB",
+                       opponent_range: Optional[np.ndarray] = None, num_simulations: Optional[int] = None) -> float:
+        """Equity for one query; waits for a queue slot when the service is saturated."""
+        if len(hand) != 2:
+            return 0.0
+        cards = hand + board
+        # Checked here so one bad query cannot fail the whole batch it would land in
+        if len(set(cards)) != len(cards) or not all(0 <= c < 52 for c in cards) or len(board) > 5:
+            raise ValueError(f"invalid cards: hand {hand}, board {board}")
+        sims = num_simulations or self.simulator.num_simulations
+        key = None
+        if opponent_range is None:
+            key = (tuple(sorted(hand)), tuple(sorted(board)), position, sims)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return cached
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((key, (hand, board, position, opponent_range, sims), future))
+        return await future
+
+    async def _batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self._queue.get_nowait())
+            queries = [query for _, query, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self._compute, queries)
+            except Exception as exc:
+                _log.exception("Equity batch of %d failed", len(batch))
+                results = [exc] * len(batch)
+            self.stats["batches"] += 1
+            for (key, _, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    if not future.done():
+                        future.set_exception(result)
+                    continue
+                if key is not None:
+                    self._cache[key] = result
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+                if not future.done():
+                    future.set_result(result)
+
+    def _compute(self, queries: List[tuple]) -> List[float]:
+        return score_queries(self.simulator, queries, self.rng)
+
+    async def _answer(self, message: dict, writer: asyncio.StreamWriter, slots: asyncio.Semaphore) -> None:
+        try:
+            weights = message.get("range")
+            equity = await self.evaluate(
+                [int(c) for c in message["hand"]], [int(c) for c in message.get("board", ())],
+                message.get("position", "SB"), decode_range(weights) if weights else None,
+                message.get("simulations"))
+            reply = {"id": message.get("id"), "equity": equity}
+        except Exception as exc:
+            reply = {"id": message.get("id"), "error": f"{type(exc).__name__}: {exc}"}
+        finally:
+            slots.release()
+        if not writer.is_closing():
+            writer.write(json.dumps(reply).encode() + b"\n")
+            await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+        tasks = set()
+        try:
+            while True:
+                # Stop reading while this connection has too many requests outstanding
+                await slots.acquire()
+                line = await reader.readline()
+                if not line:
+                    break
+                self.stats["requests"] += 1
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    slots.release()
+                    writer.write(json.dumps({"id": None, "error": "invalid JSON"}).encode() + b"\n")
+                    continue
+                task = asyncio.create_task(self._answer(message, writer, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address: str = DEFAULT_ADDRESS, ready: Optional[threading.Event] = None) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        batcher = asyncio.create_task(self._batcher())
+        kind, target = parse_address(address)
+        if kind == "unix":
+            server = await asyncio.start_unix_server(self._handle, path=target)
+        else:
+            server = await asyncio.start_server(self._handle, *target)
+        _log.info("Equity service listening on %s (%d simulations, batches of up to %d)",
+                  address, self.simulator.num_simulations, self.max_batch)
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._executor.shutdown(wait=False)
+
+
+def serve(address: str = DEFAULT_ADDRESS, **kwargs) -> None:
+    asyncio.run(EquityService(**kwargs).serve(address))
+
+
+# ==== Client ====
+class EquityClient(MonteCarloSimulator):
+    """
+    Drop-in MonteCarloSimulator backed by the service. Requests from any number of threads
+    share one connection and are answered out of order by id, so they coalesce server-side.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, num_simulations: int = 1000, timeout: float = 10.0,
+                 rng: Optional[np.random.Generator] = None):
+        super().__init__(num_simulations, rng=rng)
+        self.address = address
+        self.timeout = timeout
+        self._ids = itertools.count()
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._warned = False
+
+    def _connect(self) -> socket.socket:
+        if self._sock is None:
+            kind, target = parse_address(self.address)
+            if kind == "unix":
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(target)
+            else:
+                sock = socket.create_connection(target, timeout=self.timeout)
+                sock.settimeout(None)
+            self._sock = sock
+            threading.Thread(target=self._read_replies, args=(sock,), name="equity-client", daemon=True).start()
+        return self._sock
+
+    def _read_replies(self, sock: socket.socket) -> None:
+        error: Exception = EquityServiceError("connection closed by the equity service")
+        try:
+            for line in sock.makefile("rb"):
+                reply = json.loads(line)
+                with self._lock:
+                    future = self._pending.pop(reply.get("id"), None)
+                if future is None:
+                    continue
+                if "error" in reply:
+                    future.set_exception(EquityServiceError(reply["error"]))
+                else:
+                    future.set_result(reply["equity"])
+        except (OSError, ValueError) as exc:
+            error = exc
+        with self._lock:
+            if self._sock is sock:
+                self._sock = None
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(error)
+
+    def submit(self, hand: List[int], board: List[int], position: str = "SB",
+               opponent_range: Optional[np.ndarray] = None) -> Future:
+        """Send one query (card codes) and return a Future for its equity."""
+        request = {"id": next(self._ids), "hand": list(hand), "board": list(board), "position": position,
+                   "simulations": self.num_simulations}
+        if opponent_range is not None:
+            request["range"] = encode_range(opponent_range)
+        future: Future = Future()
+        with self._lock:
+            sock = self._connect()
+            self._pending[request["id"]] = future
+            try:
+                sock.sendall(json.dumps(request).encode() + b"\n")
+            except OSError:
+                self._pending.pop(request["id"], None)
+                self._sock = None
+                raise
+        return future
+
+    def calculate_win_rate(self, hand: List[Card], community_cards: List[Card], position: str = "SB",
+                           opponent_range=None) -> float:
+        hand_codes = [card_to_int(c) for c in flatten_cards(hand)]
+        if len(hand_codes) != 2:
+            return 0.0
+        board_codes = [card_to_int(c) for c in flatten_cards(community_cards or [])]
+        future = None
+        try:
+            future = self.submit(hand_codes, board_codes, position, opponent_range)
+            return future.result(self.timeout)
+        except Exception as exc:
+            if future is not None:
+                self._forget(future)
+            if not self._warned:
+                _log.warning("Equity service at %s unavailable (%s), computing locally", self.address, exc)
+                self._warned = True
+            # Same estimator as the service, so a fallback does not shift the AI's thresholds
+            query = (hand_codes, board_codes, position, opponent_range, self.num_simulations)
+            return score_queries(self, [query], self.rng)[0]
+
+    def _forget(self, future: Future) -> None:
+        """Drop a request that timed out; a late reply for it is ignored."""
+        with self._lock:
+            for request_id, pending in list(self._pending.items()):
+                if pending is future:
+                    del self._pending[request_id]
+
+    def close(self) -> None:
+        with self._lock:
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Shared Monte Carlo equity service")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="host:port or unix:/path/to/socket")
+    parser.add_argument("--simulations", type=int, default=1000)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE)
+    args = parser.parse_args(argv)
+    try:
+        serve(args.address, num_simulations=args.simulations, max_batch=args.max_batch, max_queue=args.max_queue)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Vectorized hand evaluator working on integer card codes (see cards.card_to_int).
+
+A score is a single int: category << 20 followed by up to five 4-bit rank fields,
+so comparing scores compares hands with full kicker resolution. Categories use the
+HandRank constants (HIGH_CARD = 1 ... ROYAL_FLUSH = 10).
+"""
+from typing import List, Sequence
+
+import numpy as np
+
+from cards import Card, HandRank, card_to_int, flatten_cards
+
+NUM_RANKS = 13
+_RANK_BITS = np.int64(1) << np.arange(NUM_RANKS, dtype=np.int64)
+
+
+def _build_tables():
+    masks = np.arange(1 << NUM_RANKS)
+    # Highest five ranks of every 13-bit rank mask, packed as 5 x 4 bits (highest first)
+    top5 = np.zeros(1 << NUM_RANKS, dtype=np.int64)
+    taken = np.zeros(1 << NUM_RANKS, dtype=np.int64)
+    for rank in range(NUM_RANKS - 1, -1, -1):
+        take = ((masks >> rank) & 1).astype(bool) & (taken < 5)
+        top5[take] |= np.int64(rank) << (4 * (4 - taken[take]))
+        taken += take
+    # Highest straight in every mask (-1 if none); the wheel A-2-3-4-5 has high card 5 (rank 3)
+    straight_high = np.full(1 << NUM_RANKS, -1, dtype=np.int64)
+    for high in range(3, NUM_RANKS):
+        if high == 3:
+            pattern = 0b1000000001111
+        else:
+            pattern = 0b11111 << (high - 4)
+        straight_high[(masks & pattern) == pattern] = high
+    return top5, straight_high
+
+
+TOP5, STRAIGHT_HIGH = _build_tables()
+
+
+def evaluate_codes(cards: np.ndarray) -> np.ndarray:
+    """Score an (N, k) array of card codes, 5 <= k <= 7, in one pass. Returns an (N,) int64 array."""
+    cards = np.asarray(cards, dtype=np.int64)
+    if cards.ndim == 1:
+        cards = cards[None, :]
+    ranks = cards // 4
+    suits = cards % 4
+    n = cards.shape[0]
+
+    rank_counts = (ranks[:, :, None] == np.arange(NUM_RANKS)).sum(axis=1)
+    suit_counts = (suits[:, :, None] == np.arange(4)).sum(axis=1)
+    present = (rank_counts > 0).astype(np.int64) @ _RANK_BITS
+
+    flush_suit = suit_counts.argmax(axis=1)
+    has_flush = suit_counts[np.arange(n), flush_suit] >= 5
+    flush_mask = np.where(suits == flush_suit[:, None], np.int64(1) << ranks, 0).sum(axis=1)
+    flush_mask = np.where(has_flush, flush_mask, 0)
+
+    straight_flush_high = STRAIGHT_HIGH[flush_mask]
+    straight_high = STRAIGHT_HIGH[present]
+
+    # Ranks ordered by (count, rank) descending: groups[:, 0] is the quad/trip/top pair rank
+    order_key = rank_counts * 16 + np.arange(NUM_RANKS)
+    groups = np.argsort(-order_key, axis=1, kind="stable")
+    counts = np.take_along_axis(rank_counts, groups, axis=1)
+    g0, g1 = groups[:, 0], groups[:, 1]
+    c0, c1 = counts[:, 0], counts[:, 1]
+    bit0 = np.int64(1) << g0
+    bit1 = np.int64(1) << g1
+    paired = ((rank_counts >= 2).astype(np.int64) @ _RANK_BITS) & ~bit0
+
+    score = (HandRank.HIGH_CARD << 20) | TOP5[present]
+    score = np.where(c0 == 2, (HandRank.ONE_PAIR << 20) | (g0 << 16) | (TOP5[present & ~bit0] >> 8 << 4), score)
+    score = np.where((c0 == 2) & (c1 == 2),
+                     (HandRank.TWO_PAIR << 20) | (g0 << 16) | (g1 << 12) | (TOP5[present & ~bit0 & ~bit1] >> 16 << 8),
+                     score)
+    score = np.where(c0 == 3, (HandRank.THREE_OF_A_KIND << 20) | (g0 << 16) | (TOP5[present & ~bit0] >> 12 << 8), score)
+    score = np.where(straight_high >= 0, (HandRank.STRAIGHT << 20) | (straight_high << 16), score)
+    score = np.where(has_flush, (HandRank.FLUSH << 20) | TOP5[flush_mask], score)
+    score = np.where((c0 == 3) & (c1 >= 2), (HandRank.FULL_HOUSE << 20) | (g0 << 16) | (TOP5[paired] >> 16 << 12), score)
+    score = np.where(c0 == 4, (HandRank.FOUR_OF_A_KIND << 20) | (g0 << 16) | (TOP5[present & ~bit0] >> 16 << 12), score)
+    score = np.where(straight_flush_high >= 0, (HandRank.STRAIGHT_FLUSH << 20) | (straight_flush_high << 16), score)
+    score = np.where(straight_flush_high == NUM_RANKS - 1, (HandRank.ROYAL_FLUSH << 20) | (straight_flush_high << 16), score)
+    return score
+
+
+def evaluate_batch(hands: np.ndarray, board: Sequence[int]) -> np.ndarray:
+    """Score N hole-card pairs (N, 2) against one shared board of 3-5 card codes."""
+    hands = np.asarray(hands, dtype=np.int64).reshape(-1, 2)
+    board = np.broadcast_to(np.asarray(board, dtype=np.int64), (hands.shape[0], len(board)))
+    return evaluate_codes(np.concatenate([hands, board], axis=1))
+
+
+def score_category(score) -> int:
+    return int(score) >> 20
+
+
+def score_cards(cards: List[Card]) -> int:
+    """Full-kicker score of one 5-7 card hand given as Card objects."""
+    return int(evaluate_codes(np.array([[card_to_int(c) for c in flatten_cards(cards)]]))[0])
@@ -1,8 +1,18 @@
 from dataclasses import dataclass
 from typing import List, Optional, Tuple, Dict
-from cards import Card, Deck
+from cards import Card, Deck, card_to_int, flatten_cards
 from ai import PokerAI
-from handrecord import HandRecord
+from handrecord import HandRecord, HandStore
+from settlement import Pot, settle_players
+from tablestate import TableState
+from actionhistory import ActionHistory
+from opponents import OpponentStats
+from betsizing import min_raise_to
+from logger import get_logger
+from profiler import PROFILER
+from randomness import split
+
+_log = get_logger("game")
 
 @dataclass
 class AIAction:
@@ -17,6 +27,7 @@ class Player:
     hand: List[Card]
     is_active: bool = True
     position: str = ""
+    contributed: int = 0
 
     def __init__(self, name: str, chips: int = 1000, position: str = ""):
         self.name = name
@@ -24,24 +35,36 @@ class Player:
         self.hand = []
         self.is_active = True
         self.position = position
+        self.contributed = 0  # chips put into the pot this hand, used to build side pots
 
     def add_card(self, card: Card) -> None:
         self.hand.append(card)
 
     def clear_hand(self) -> None:
         self.hand = []
+        self.contributed = 0
+
+    @property
+    def is_all_in(self) -> bool:
+        return self.chips == 0 and self.contributed > 0
 
     def bet(self, amount: int) -> int:
         if amount > self.chips:
             amount = self.chips
         self.chips -= amount
+        self.contributed += amount
         return amount
 
 class PokerGame:
-    def __init__(self, num_players=9):
+    def __init__(self, num_players=9, rng=None):
         self.num_players = num_players
         self.current_stage = "preflop"
-        self.deck = Deck()
+        # One stream per table (randomness.stream("table", i)) makes its hands reproducible. The
+        # deck and the AI get separate children, so the cards dealt do not depend on how many
+        # random numbers the AI used
+        self.rng = rng
+        deck_rng, ai_rng = split(rng, 2)
+        self.deck = Deck(deck_rng)
         self.players = []
         # self.ai = Player("BB", position="BB")
         self.community_cards: List[Card] = []
@@ -49,13 +72,22 @@ class PokerGame:
         self.current_bet = 0
         self.small_blind = 10
         self.big_blind = 20
-        self.ai_agent = PokerAI()
+        self.ai_agent = PokerAI(rng=ai_rng)
         self.history: List[HandRecord] = []
         self.ai_actions: List[AIAction] = []
         self.positions = ["UTG", "MP", "CO", "BTN", "SB", "BB"]
         self.dealer_position = 0
+        self.last_pots: List[Pot] = []
+        self.action_history = ActionHistory()
+        self.opponent_stats = OpponentStats()
+        self.hand_store = HandStore()
+        self._hand_seats: List[dict] = []
+        self._hand_actions: List[dict] = []
+        self.ai_agent.ranges.stats = self.opponent_stats
 
     def start_new_hand(self) -> None:
+        if any(player.hand for player in self.players):
+            PROFILER.hand_finished()
         self.deck.reset()
         for player in self.players:
             player.clear_hand()
@@ -64,24 +96,63 @@ class PokerGame:
         self.pot = 0
         self.current_bet = 0
         self.ai_actions = []
+        self.action_history.clear()
+        self.opponent_stats.new_hand(p.name for p in self.players)
+        self.ai_agent.ranges.new_hand(p.name for p in self.players)
+
+        stacks = [p.chips for p in self.players]
 
         for _ in range(2):
             for player in self.players:
                 player.add_card(self.deck.deal())
-        print("Dealt hands:", player.hand)
+        _log.debug("Dealt hands: %s", [(p.name, p.hand) for p in self.players])
         if len(self.players) >= 2:
             self.pot += self.players[0].bet(self.small_blind)
             self.pot += self.players[1].bet(self.big_blind)
             self.current_bet = self.big_blind
 
+        self._hand_seats = [
+            {"name": p.name, "position": p.position, "stack": stack, "blind": p.contributed,
+             "hole": [card_to_int(c) for c in flatten_cards(p.hand)]}
+            for p, stack in zip(self.players, stacks)
+        ]
+        self._hand_actions = []
+
     def deal_community_cards(self, count: int = 3) -> None:
         for _ in range(count):
             self.community_cards.append(self.deck.deal())
+        self.action_history.next_street()
+
+    def record_action(self, player: Player, action: str, amount: int, pot_before: int,
+                      to_call: Optional[int] = None) -> None:
+        code = self.action_history.add(action, amount, pot_before, all_in=player.is_all_in)
+        street = self.action_history.street
+        if player in self.players:
+            self._hand_actions.append({
+                "seat": self.players.index(player), "street": street, "code": code, "amount": amount,
+                "chips": self.pot - pot_before, "pot": pot_before,
+                "to_call": self.current_bet if to_call is None else to_call,
+            })
+        self.opponent_stats.observe(player.name, street, action)
+        self.ai_agent.ranges.observe(player.name, street, action, self._board_codes())
+
+    def _board_codes(self) -> List[int]:
+        return [card_to_int(c) for c in flatten_cards(self.community_cards)]
+
+    def opponent_range(self, player: Player):
+        """Weights over the 1326 combos for the opponent still in with the strongest range."""
+        opponents = [p.name for p in self.players if p is not player and p.is_active]
+        if not opponents:
+            return None
+        ranges = self.ai_agent.ranges
+        return ranges.range_of(ranges.strongest(opponents, self._board_codes()))
 
     def player_action(self, action: str, amount: Optional[int] = None) -> Tuple[bool, int]:
         bet_amount = 0
+        pot_before, to_call = self.pot, self.current_bet
         if action == "fold":
             self.player.is_active = False
+            self.record_action(self.player, action, 0, pot_before, to_call)
             return False, 0
         elif action == "call":
             bet_amount = self.current_bet
@@ -92,6 +163,7 @@ class PokerGame:
             self.pot += self.player.bet(amount)
         elif action == "check":
             bet_amount = 0
+        self.record_action(self.player, action, bet_amount, pot_before, to_call)
         return True, bet_amount
     
 
@@ -99,25 +171,36 @@ class PokerGame:
 
     def ai_action(self, player=None) -> Tuple[str, int]:
         player = player or self.ai
-        action, amount = self.ai_agent.make_decision(self, player, player.position)
+        action, amount = self.decide_ai_action(player)
+        self.apply_ai_action(player, action, amount)
+        return action, amount
+
+    def decide_ai_action(self, player, win_prob: Optional[float] = None) -> Tuple[str, int]:
+        # Read-only: safe to run on a worker thread while the table is idle.
+        action, amount = self.ai_agent.make_decision(self, player, player.position, win_prob=win_prob)
         
         
         if action == "call":
             amount = self.current_bet
         elif action == "raise":
-            
-            amount = max(amount, self.current_bet * 2)
-        
-        
+            # At least a min-raise, unless that is more than the player has
+            amount = max(amount, min(min_raise_to(self.current_bet, self.big_blind), player.chips))
+            if amount <= self.current_bet:
+                # All the player has does not beat the bet: that is a call, all-in for less
+                action, amount = "call", self.current_bet
+        return action, amount
+
+    def apply_ai_action(self, player, action: str, amount: int) -> None:
+        pot_before, to_call = self.pot, self.current_bet
         if action == "fold":
             player.is_active = False
         elif action == "call":
             self.pot += player.bet(amount)
         elif action == "raise":
-            self.current_bet = amount
+            # A short all-in never lowers the bet the others face
+            self.current_bet = max(self.current_bet, amount)
             self.pot += player.bet(amount)
-        
-        return action, amount
+        self.record_action(player, action, amount, pot_before, to_call)
 
     def simulate_other_players_actions(self):
         """
@@ -129,27 +212,47 @@ class PokerGame:
         ordered_positions = ["UTG", "MP", "CO", "BTN"]
         non_folders = []
 
+        seats = {p.position: p for p in self.players}
+
         for idx, pos in enumerate(ordered_positions):
-            if pos not in [self.player.position, self.ai.position]:
-                action, amount = self.ai_agent.make_decision(self, self.ai, pos)
+            seat = seats.get(pos)
+            if seat is not None and seat is not getattr(self, "player", None) and seat.is_active:
+                action, amount = self.ai_agent.make_decision(self, seat, pos)
 
                 # ensure that there is an AI in the flop
                 if action == "fold" and idx == len(ordered_positions) - 1 and len(non_folders) == 0:
                     action = "call"
                     amount = self.current_bet
 
-                if action == "call":
-                    self.pot += amount
-                elif action == "raise":
-                    self.current_bet = max(self.current_bet, amount)
-                    self.pot += amount
-                elif action == "check":
-                    amount = 0
-
+                self.apply_ai_action(seat, action, amount)
+                self.ai_actions.append(AIAction(position=pos, action=action, amount=amount))
                 if action != "fold":
                     non_folders.append(pos)
 
-                self.ai_actions.append(AIAction(position=pos, action=action, amount=amount))
+    def settle_hand(self) -> List[Tuple[Player, int]]:
+        """
+        Award the pot (and any side pots) to the best hands still in, with full kicker
+        comparison, and return (player, chips won) pairs. Works for an uncontested pot too.
+        """
+        # dealer_position is the SB seat, so the button sits one seat before it
+        button = (self.dealer_position - 1) % len(self.players) if self.players else 0
+        winnings, self.last_pots = settle_players(self.players, self.community_cards,
+                                                  pot_total=self.pot, button=button)
+        for player, amount in winnings.items():
+            player.chips += amount
+        self.pot = 0
+        self._store_hand(winnings, button)
+        return [(p, winnings[p]) for p in self.players if p in winnings]
+
+    def _store_hand(self, winnings: Dict[Player, int], button: int) -> None:
+        if not self._hand_seats:
+            return
+        for seat, player in zip(self._hand_seats, self.players):
+            seat["contributed"] = player.contributed
+            seat["won"] = winnings.get(player, 0)
+        self.hand_store.add_hand(self._hand_seats, self._hand_actions, self._board_codes(), button,
+                                 self.small_blind, self.big_blind)
+        self._hand_seats, self._hand_actions = [], []
 
     def record_hand(self, player: Player, action: str, bet_amount: int, result: float) -> None:
         record = HandRecord(
@@ -160,12 +263,17 @@ class PokerGame:
             result=result,
             position=player.position,
             pot_size=self.pot,
-            bet_amount=bet_amount
+            bet_amount=bet_amount,
+            actions=self.action_history.key()
         )
         self.history.append(record)
         if player == self.ai:
             self.ai_agent.record_hand(record)
 
+    def to_table_state(self) -> TableState:
+        """Compact array snapshot of this table, e.g. to clone for rollouts."""
+        return TableState.from_game(self)
+
     def get_hand_summary(self) -> str:
         if not self.history:
             return "No history available"
@@ -3,7 +3,10 @@ from tkinter import messagebox
 import math
 from PIL import Image, ImageTk
 from game import PokerGame, Player, AIAction
-from cards import HandRank
+from aiworker import AIWorker
+from handrecord import HAND_STORE_PATH, HandStore
+from logger import get_logger
+from profiler import PROFILER
 import os
 import random
 
@@ -11,6 +14,38 @@ import random
 SUITS = ['spades', 'hearts', 'diamonds', 'clubs']
 RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
 PLAYER_POSITIONS = ["SB", "BB", "UTG", "UTG+1", "MP", "LJ", "HJ", "CO", "BTN"]
+AI_POLL_MS = 30
+
+_log = get_logger("gui")
+
+
+# ==== Animation Clock ====
+class AnimationClock:
+    """
+    Scales every GUI pacing delay.
+
+    normal - full-speed animation, one AI action at a time
+    turbo  - 10% delays; AI rounds are batch-run through the engine and only the result is drawn
+    skip   - no delays at all until the human has a decision to make
+    """
+    MODES = {"normal": 1.0, "turbo": 0.1, "skip": 0.0}
+
+    def __init__(self, mode: str = "normal"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown animation mode: {mode}")
+        self.mode = mode
+
+    @property
+    def batch(self) -> bool:
+        return self.mode != "normal"
+
+    def delay(self, ms: int) -> int:
+        return int(ms * self.MODES[self.mode])
+
+    def cycle(self) -> str:
+        modes = list(self.MODES)
+        self.mode = modes[(modes.index(self.mode) + 1) % len(modes)]
+        return self.mode
 
 # ==== Poker Card Class ====
 class Card:
@@ -52,7 +87,7 @@ def get_ellipse_positions(cx, cy, a, b, n):
 
 # ==== GUI ====
 class PokerGUI(tk.Tk):
-    def __init__(self):
+    def __init__(self, speed: str = "normal"):
         super().__init__()
         self.title("ACE Poker GUI")
         self.geometry("1024x768")
@@ -76,6 +111,7 @@ class PokerGUI(tk.Tk):
 
         # Game logic - initialize PokerGame with a player name
         self.game = PokerGame(num_players=9)
+        self.game.hand_store = HandStore.open(HAND_STORE_PATH)
         if not hasattr(self.game, 'dealer_position'):
             self.game.dealer_position = 0  
         # self.game.dealer_position = 0
@@ -95,7 +131,14 @@ class PokerGUI(tk.Tk):
             ai_player = Player(pos, chips=400, position=pos)  
             self.game.players.append(ai_player)
 
-        print("Players in game:", [p.name for p in self.game.players])
+        _log.info("Players in game: %s", [p.name for p in self.game.players])
+
+        # AI decisions run on worker threads; results come back through poll_ai_results()
+        self.ai_worker = AIWorker(self.game)
+        self.ai_busy = False
+        self.ai_polling = False
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.clock = AnimationClock(speed)
 
 
         
@@ -161,7 +204,7 @@ class PokerGUI(tk.Tk):
         
         # Load card images
         self.card_images = self.load_card_images("./cards")
-        print("Loaded card images:", list(self.card_images.keys()))
+        _log.debug("Loaded %d card images", len(self.card_images))
 
         self.show_ai_hands = tk.BooleanVar(value=True)  
         self.show_hands_btn = tk.Button(
@@ -175,6 +218,17 @@ class PokerGUI(tk.Tk):
         )
         self.show_hands_btn.place(x=900, y=20)  
 
+        self.speed_btn = tk.Button(
+            self,
+            text=f"Speed: {self.clock.mode.capitalize()}",
+            command=self.cycle_speed,
+            bg="#333",
+            fg="#222",
+            font=("Arial", 10),
+            relief=tk.FLAT
+        )
+        self.speed_btn.place(x=900, y=50)
+
 
          
         for position in self.ai_card_images:
@@ -237,6 +291,13 @@ class PokerGUI(tk.Tk):
         
         self.update_ai_hands()
 
+    def cycle_speed(self):
+        mode = self.clock.cycle()
+        self.speed_btn.config(text=f"Speed: {mode.capitalize()}")
+
+    def schedule(self, ms, callback):
+        return self.after(self.clock.delay(ms), callback)
+
     def load_card_images(self, folder):
         card_images = {}
         for filename in os.listdir(folder):
@@ -313,11 +374,11 @@ class PokerGUI(tk.Tk):
                                             image=self.card_images[card_key])
                     else:
                         
-                        print(f"Community card image not found: {card_key}")
+                        _log.warning("Community card image not found: %s", card_key)
                         self.canvas.itemconfig(self.community_card_images[i], 
                                             image=self.card_images["back"])
                 except Exception as e:
-                    print(f"Error updating community card {i}: {e}")
+                    _log.warning("Error updating community card %d: %s", i, e)
                     self.canvas.itemconfig(self.community_card_images[i], 
                                         image=self.card_images["back"])
 
@@ -365,7 +426,7 @@ class PokerGUI(tk.Tk):
                                     self.canvas.itemconfig(self.ai_card_images[i][card_idx], 
                                                         image=self.card_images[card_key])
                                 else:
-                                    print(f"AI player card image not found: {card_key} for {player.position}")
+                                    _log.warning("AI player card image not found: %s for %s", card_key, player.position)
                                     self.canvas.itemconfig(self.ai_card_images[i][card_idx], 
                                                         image=self.card_images["back"])
                             else:
@@ -373,7 +434,7 @@ class PokerGUI(tk.Tk):
                                 self.canvas.itemconfig(self.ai_card_images[i][card_idx], 
                                                     image=self.card_images["back"])
                         except Exception as e:
-                            print(f"Error updating AI player {player.position} card {card_idx}: {e}")
+                            _log.warning("Error updating AI player %s card %d: %s", player.position, card_idx, e)
                             self.canvas.itemconfig(self.ai_card_images[i][card_idx], 
                                                 image=self.card_images["back"])
     def update_player_status(self):
@@ -404,6 +465,10 @@ class PokerGUI(tk.Tk):
 
 
     def update_display(self):
+        with PROFILER.stage("render"):
+            self._update_display()
+
+    def _update_display(self):
         
         self.canvas.itemconfig(self.pot_text, text=f"pot: {self.game.pot}")
         self.update_player_hand()
@@ -469,6 +534,8 @@ class PokerGUI(tk.Tk):
 
 
     def fold_action(self):
+        if self.ai_busy:
+            return
         self.prompt.config(text="You folded")
         success, amount = self.game.player_action("fold")
         
@@ -478,9 +545,11 @@ class PokerGUI(tk.Tk):
         self.game.ai_actions.append(AIAction(position=self.human_player.position, action="fold", amount=0))
         
         self.update_display()  
-        self.after(1000, self.play_ai_turns)
+        self.schedule(1000, self.play_ai_turns)
 
     def call_action(self):
+        if self.ai_busy:
+            return
         call_amount = self.game.current_bet
         self.prompt.config(text=f"You called ${call_amount}")
         success, amount = self.game.player_action("call")
@@ -492,9 +561,11 @@ class PokerGUI(tk.Tk):
         
         self.update_display()
         
-        self.after(1000, self.play_ai_turns)
+        self.schedule(1000, self.play_ai_turns)
 
     def raise_action(self):
+        if self.ai_busy:
+            return
         
         raise_amount = self.game.current_bet * 2
         if raise_amount < 20:  
@@ -513,9 +584,11 @@ class PokerGUI(tk.Tk):
         
         self.update_display()
         
-        self.after(1000, self.handle_raise)
+        self.schedule(1000, self.handle_raise)
 
     def check_action(self):
+        if self.ai_busy:
+            return
         self.prompt.config(text="You checked")
         success, amount = self.game.player_action("check")
         
@@ -528,7 +601,7 @@ class PokerGUI(tk.Tk):
         
         
         self.human_checked_this_round = True
-        self.after(1000, self.play_ai_turns)
+        self.schedule(1000, self.play_ai_turns)
     def update_player_hand(self):
         if hasattr(self, 'human_player') and self.human_player.hand:
             # print("Hand content:", self.human_player.hand)
@@ -553,37 +626,87 @@ class PokerGUI(tk.Tk):
                         rank = rank_mapping[rank]
                     
                     card_key = f"{rank}_of_{suit}"
-                    print(f"Trying to build card key: {card_key}")
                     
                     if card_key in self.card_images:
                         self.canvas.itemconfig(self.user_card_images[i], image=self.card_images[card_key])
                     else:
-                        print(f"Card image not found: {card_key}")
+                        _log.warning("Card image not found: %s", card_key)
                         self.canvas.itemconfig(self.user_card_images[i], image=self.card_images["back"])
                 except Exception as e:
-                    print(f"Error processing card: {e}")
+                    _log.warning("Error processing card: %s", e)
                     self.canvas.itemconfig(self.user_card_images[i], image=self.card_images["back"])
     
+    def on_close(self):
+        self.ai_worker.shutdown()
+        PROFILER.stop_capture()
+        if len(self.game.hand_store):
+            self.game.hand_store.save(HAND_STORE_PATH)
+        self.destroy()
+
+    def request_ai_action(self, ai_player, on_done, upcoming=None):
+        """Ask the worker for ai_player's decision; on_done(action, amount) runs on the Tk thread once applied."""
+        self.ai_busy = True
+
+        def apply(action, amount):
+            self.game.apply_ai_action(ai_player, action, amount)
+            self.ai_busy = self.ai_worker.pending > 0
+            on_done(action, amount)
+
+        self.ai_worker.request_decision(ai_player, apply, upcoming)
+        self.start_ai_polling()
+
+    def start_ai_polling(self):
+        if not self.ai_polling:
+            self.ai_polling = True
+            self.after(AI_POLL_MS, self.poll_ai_results)
+
+    def poll_ai_results(self):
+        if self.ai_worker.poll() > 0:
+            self.after(AI_POLL_MS, self.poll_ai_results)
+        else:
+            self.ai_polling = False
+
     def play_ai_turns(self):
         ai_players = [p for p in self.game.players if p != self.human_player and p.is_active]
-        print("AI players in the game:", ai_players)
+        _log.debug("AI players in the game: %s", [p.position for p in ai_players])
         self.game.ai_actions = []
         self.update_display()
         
-        ai_bet = False
-        
-        
-        for ai_player in ai_players:
-            self.highlight_active_player(ai_player.position)
-            
-            action, amount = self.game.ai_action(player=ai_player)
+        self.ai_bet = False
+        if self.clock.batch:
+            self.ai_busy = True
+            self.ai_worker.request_round(ai_players, self.on_ai_round)
+            self.start_ai_polling()
+            return
+        self.ai_worker.prefetch(ai_players)
+        self.play_next_ai_turn(ai_players)
+
+    def on_ai_round(self, actions):
+        self.ai_busy = self.ai_worker.pending > 0
+        self.game.ai_actions.extend(actions)
+        self.ai_bet = any(a.action in ("call", "raise") and a.amount > 0 for a in actions)
+        if actions:
+            last = actions[-1]
+            amount_text = f"${last.amount}" if last.amount else ""
+            self.prompt.config(text=f"{last.position} {last.action}ed {amount_text}")
+        self.update_display()
+        self.finish_ai_turns()
+
+    def play_next_ai_turn(self, ai_players):
+        if not ai_players:
+            self.finish_ai_turns()
+            return
 
+        ai_player, upcoming = ai_players[0], ai_players[1:]
+        self.highlight_active_player(ai_player.position)
+
+        def on_action(action, amount):
             self.game.ai_actions.append(AIAction(position=ai_player.position, action=action, amount=amount))
             
             
             if (action == "call" or action == "raise") and amount > 0:
-                ai_bet = True
-                self.game.current_bet = amount
+                self.ai_bet = True
+                self.game.current_bet = max(self.game.current_bet, amount)
             
             
             amount_text = f"${amount}" if amount else ""
@@ -591,13 +714,12 @@ class PokerGUI(tk.Tk):
             
             
             self.update_display()
-            
-            
-            self.update()
-            self.after(1000 if self.human_player.is_active else 300)
-        
-        
-        if hasattr(self, 'human_checked_this_round') and self.human_checked_this_round and ai_bet:
+            self.schedule(1000 if self.human_player.is_active else 300, lambda: self.play_next_ai_turn(upcoming))
+
+        self.request_ai_action(ai_player, on_action, upcoming)
+
+    def finish_ai_turns(self):
+        if hasattr(self, 'human_checked_this_round') and self.human_checked_this_round and self.ai_bet:
             self.human_checked_this_round = False  
             self.prompt_human_after_ai_bet()
             return
@@ -608,12 +730,11 @@ class PokerGUI(tk.Tk):
             winner = active_players[0] if active_players else None
             if winner:
                 self.prompt.config(text=f"{winner.name} wins ${self.game.pot}!")
-                winner.chips += self.game.pot
-                self.game.pot = 0
-            self.after(2000, self.start_new_hand)
+                self.game.settle_hand()
+            self.schedule(2000, self.start_new_hand)
             return True  
         
-        self.after(1000, self.check_game_stage)
+        self.schedule(1000, self.check_game_stage)
         return False  
 
     def check_game_stage(self):
@@ -624,9 +745,10 @@ class PokerGUI(tk.Tk):
             winner = active_players[0] if active_players else None
             if winner:
                 self.prompt.config(text=f"{winner.name} wins ${self.game.pot}!")
+                self.game.settle_hand()
             else:
                 self.prompt.config(text="All players folded!")
-            self.after(2000, self.start_new_hand)
+            self.schedule(2000, self.start_new_hand)
             return
         
         
@@ -681,70 +803,39 @@ class PokerGUI(tk.Tk):
     #     self.after(2000, self.start_new_hand)
 
     def handle_showdown(self):
+        with PROFILER.stage("showdown"):
+            self._handle_showdown()
+
+    def _handle_showdown(self):
         self.prompt.config(text="Showdown!")
         
         
-        active_players = [p for p in self.game.players if p.is_active]
-        
-        
-        player_scores = {}
-        for player in active_players:
-            
-            flat_hand = []
-            for item in player.hand:
-                if isinstance(item, list) and item:
-                    flat_hand.append(item[0])
-                else:
-                    flat_hand.append(item)
-            
-            flat_community = []
-            for item in self.game.community_cards:
-                if isinstance(item, list) and item:
-                    flat_community.append(item[0])
-                else:
-                    flat_community.append(item)
-            
-            
-            score = HandRank.evaluate_hand(flat_hand + flat_community)
-            player_scores[player] = score
-        
-        
-        max_score = max(player_scores.values())
-        winners = [p for p in player_scores if player_scores[p] == max_score]
+        results = self.game.settle_hand()
+        names = ["You" if p == self.human_player else p.position for p, _ in results]
         
         
-        pot_per_winner = self.game.pot // len(winners)
-        
-        
-        if len(winners) == 1:
-            winner = winners[0]
+        if len(results) == 1:
+            winner, amount = results[0]
             if winner == self.human_player:
-                self.prompt.config(text=f"You win ${self.game.pot}!")
+                self.prompt.config(text=f"You win ${amount}!")
             else:
-                self.prompt.config(text=f"{winner.position} wins ${self.game.pot}!")
-            winner.chips += self.game.pot
+                self.prompt.config(text=f"{winner.position} wins ${amount}!")
         else:
-            
-            winner_names = []
-            for winner in winners:
-                if winner == self.human_player:
-                    winner_names.append("You")
-                else:
-                    winner_names.append(winner.position)
-                winner.chips += pot_per_winner
-            
-            self.prompt.config(text=f"Pot split between: {', '.join(winner_names)}! Each gets ${pot_per_winner}")
+            amounts = ", ".join(f"{name} ${amount}" for name, (_, amount) in zip(names, results))
+            if len(self.game.last_pots) == 1:
+                self.prompt.config(text=f"Pot split between: {amounts}")
+            else:
+                self.prompt.config(text=f"{len(self.game.last_pots)} pots awarded: {amounts}")
         
-        self.game.pot = 0
         self.update_display()
-        self.after(2000, self.start_new_hand)
+        self.schedule(2000, self.start_new_hand)
 
     def handle_raise(self):
         active_ai_players = [p for p in self.game.players if p != self.human_player and p.is_active]
         
         
         if not active_ai_players:
-            self.after(1000, self.check_game_stage)
+            self.schedule(1000, self.check_game_stage)
             return
         
         
@@ -765,44 +856,47 @@ class PokerGUI(tk.Tk):
             self.game.current_bet = max(self.game.current_bet, 40)  
             
             
-            action, amount = self.game.ai_action(player=next_to_respond)
-            
-            
-            if action == "call":
-                amount = self.game.current_bet  
-            
-            
-            if not hasattr(self.game, 'ai_actions'):
-                self.game.ai_actions = []
-            self.game.ai_actions.append(AIAction(position=next_to_respond.position, action=action, amount=amount))
-            
-            
-            self.responded_to_raise.add(next_to_respond)
-            
-            
-            amount_text = f"${amount}" if amount else ""
-            self.prompt.config(text=f"{next_to_respond.position} {action}ed {amount_text}")
+            upcoming = [p for p in active_ai_players if p not in self.responded_to_raise and p != next_to_respond]
+            self.request_ai_action(next_to_respond,
+                                   lambda action, amount: self.on_raise_response(next_to_respond, action, amount),
+                                   upcoming)
+        else:
             
-            self.update_display()
+            self.responded_to_raise = set()
             
+            self.schedule(1000, self.check_game_stage)
+    
+    def on_raise_response(self, next_to_respond, action, amount):
+        if action == "call":
+            amount = self.game.current_bet  
+        
+        
+        if not hasattr(self.game, 'ai_actions'):
+            self.game.ai_actions = []
+        self.game.ai_actions.append(AIAction(position=next_to_respond.position, action=action, amount=amount))
+        
+        
+        self.responded_to_raise.add(next_to_respond)
+        
+        
+        amount_text = f"${amount}" if amount else ""
+        self.prompt.config(text=f"{next_to_respond.position} {action}ed {amount_text}")
+        
+        self.update_display()
+        
+        
+        if action == "raise":
+            self.game.current_bet = max(self.game.current_bet, amount)
+            self.responded_to_raise = set([next_to_respond])
             
-            if action == "raise":
-                self.game.current_bet = amount
-                self.responded_to_raise = set([next_to_respond])
-                
-                if self.human_player.is_active:
-                    self.after(1000, lambda: self.prompt_human_response_to_raise(amount))
-                else:
-                    self.after(800, self.handle_raise)
+            if self.human_player.is_active:
+                self.schedule(1000, lambda: self.prompt_human_response_to_raise(amount))
             else:
-                
-                self.after(800, self.handle_raise)
+                self.schedule(800, self.handle_raise)
         else:
             
-            self.responded_to_raise = set()
-            
-            self.after(1000, self.check_game_stage)
-    
+            self.schedule(800, self.handle_raise)
+
     def prompt_human_response_to_raise(self, raise_amount):
 
         self.prompt.config(text=f"AI raised to ${raise_amount}. Your turn.")
@@ -845,6 +939,7 @@ class PokerGUI(tk.Tk):
             player.position = positions[rel_pos]
         
         
+        self.ai_worker.new_hand()
         self.game.start_new_hand()
         self.update_display()
         self.update_stage_display()
@@ -864,7 +959,7 @@ class PokerGUI(tk.Tk):
         
         
         if sb_player and sb_player != self.human_player:
-            self.after(1000, lambda: self.ai_turn(sb_player))
+            self.schedule(1000, lambda: self.ai_turn(sb_player))
         
 
     def ai_turn(self, ai_player=None):
@@ -877,33 +972,38 @@ class PokerGUI(tk.Tk):
         
         if ai_player and ai_player.is_active:
             self.highlight_active_player(ai_player.position)
-            action, amount = self.game.ai_action(player=ai_player)
-            
-            
-            if not hasattr(self.game, 'ai_actions'):
-                self.game.ai_actions = []
-            self.game.ai_actions.append(AIAction(position=ai_player.position, action=action, amount=amount))
-            
-            
-            amount_text = f"${amount}" if amount else ""
-            self.prompt.config(text=f"{ai_player.position} {action}ed {amount_text}")
-            
-            
-            self.update_display()
-            
+            upcoming = []
+            player = self.find_next_player(ai_player)
+            while player not in (None, ai_player, self.human_player) and len(upcoming) < self.ai_worker.lookahead:
+                upcoming.append(player)
+                player = self.find_next_player(player)
+            self.request_ai_action(ai_player, lambda action, amount: self.on_ai_turn_action(ai_player, action, amount), upcoming)
+        else:
             
-            next_player = self.find_next_player(ai_player)
+            self.schedule(1000, self.check_game_stage)
+
+    def on_ai_turn_action(self, ai_player, action, amount):
+        if not hasattr(self.game, 'ai_actions'):
+            self.game.ai_actions = []
+        self.game.ai_actions.append(AIAction(position=ai_player.position, action=action, amount=amount))
+        
+        
+        amount_text = f"${amount}" if amount else ""
+        self.prompt.config(text=f"{ai_player.position} {action}ed {amount_text}")
+        
+        
+        self.update_display()
+        
+        
+        next_player = self.find_next_player(ai_player)
+        
+        if next_player == self.human_player:
             
-            if next_player == self.human_player:
-                
-                self.prompt.config(text="Your turn")
-                self.highlight_active_player(self.human_player.position)
-            else:
-                
-                self.after(800, lambda: self.ai_turn(next_player))
+            self.prompt.config(text="Your turn")
+            self.highlight_active_player(self.human_player.position)
         else:
             
-            self.after(1000, self.check_game_stage)
+            self.schedule(800, lambda: self.ai_turn(next_player))
 
     def find_next_player(self, current_player):
         current_index = self.game.players.index(current_player)
@@ -915,5 +1015,6 @@ class PokerGUI(tk.Tk):
         return None
 
 if __name__ == "__main__":
-    app = PokerGUI()
+    import sys
+    app = PokerGUI(speed=sys.argv[1] if len(sys.argv) > 1 else "normal")
     app.mainloop()
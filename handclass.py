@@ -0,0 +1,91 @@
+"""
+The 169 preflop hand classes and precomputed lookups from hole cards to them.
+
+Classes live on a 13x13 grid indexed by rank (0 = '2' ... 12 = 'A'): pairs on the
+diagonal, suited hands at hi * 13 + lo, offsuit hands at lo * 13 + hi. Canonical names
+use one character per rank ("AA", "AKs", "T9o").
+
+Hole cards are integer card codes (cards.card_to_int). PAIR_CLASS[a, b] gives the class
+of any two codes in either order, so a batch of hands (N, 2) is classed with one fancy
+index, and a per-class table (e.g. preflop strengths) becomes a (52, 52) lookup.
+"""
+from itertools import combinations
+from typing import Sequence
+
+import numpy as np
+
+from cards import Card, card_to_int, flatten_cards
+
+RANK_CHARS = "23456789TJQKA"
+NUM_CLASSES = 169
+
+COMBOS = np.array(list(combinations(range(52), 2)), dtype=np.int64)
+NUM_COMBOS = len(COMBOS)
+
+
+def _combo_classes() -> np.ndarray:
+    hi = np.maximum(COMBOS[:, 0] // 4, COMBOS[:, 1] // 4)
+    lo = np.minimum(COMBOS[:, 0] // 4, COMBOS[:, 1] // 4)
+    suited = COMBOS[:, 0] % 4 == COMBOS[:, 1] % 4
+    return np.where(suited, hi * 13 + lo, lo * 13 + hi).astype(np.int16)
+
+
+def class_name(index: int) -> str:
+    row, col = divmod(int(index), 13)
+    if row == col:
+        return RANK_CHARS[row] * 2
+    if row > col:
+        return RANK_CHARS[row] + RANK_CHARS[col] + "s"
+    return RANK_CHARS[col] + RANK_CHARS[row] + "o"
+
+
+def class_index(key: str) -> int:
+    """Index into the 13x13 class grid for keys like "AA", "AKs", "T9o"; -1 if unparseable."""
+    if len(key) not in (2, 3) or key[0] not in RANK_CHARS or key[1] not in RANK_CHARS:
+        return -1
+    hi, lo = sorted((RANK_CHARS.index(key[0]), RANK_CHARS.index(key[1])), reverse=True)
+    if hi == lo:
+        return hi * 13 + lo if len(key) == 2 else -1
+    if key[2:] == "s":
+        return hi * 13 + lo
+    if key[2:] == "o":
+        return lo * 13 + hi
+    return -1
+
+
+COMBO_CLASS = _combo_classes()
+CLASS_NAMES = np.array([class_name(i) for i in range(NUM_CLASSES)])
+COMBO_NAMES = CLASS_NAMES[COMBO_CLASS]
+# Combo index for every ordered pair of codes, -1 on the diagonal
+PAIR_COMBO = np.full((52, 52), -1, dtype=np.int16)
+PAIR_COMBO[COMBOS[:, 0], COMBOS[:, 1]] = np.arange(NUM_COMBOS)
+PAIR_COMBO[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(NUM_COMBOS)
+PAIR_CLASS = np.where(PAIR_COMBO >= 0, COMBO_CLASS[PAIR_COMBO], -1).astype(np.int16)
+# Number of combos in each class: 6 per pair, 4 per suited, 12 per offsuit hand
+CLASS_SIZE = np.bincount(COMBO_CLASS, minlength=NUM_CLASSES)
+for _table in (COMBO_CLASS, CLASS_NAMES, COMBO_NAMES, PAIR_COMBO, PAIR_CLASS, CLASS_SIZE):
+    _table.setflags(write=False)
+
+
+def classes_of(hands: np.ndarray) -> np.ndarray:
+    """Class index of each row of an (N, 2) array of card codes."""
+    hands = np.asarray(hands)
+    return PAIR_CLASS[hands[..., 0], hands[..., 1]]
+
+
+def hand_class(hand: Sequence[Card]) -> int:
+    a, b = (card_to_int(c) for c in flatten_cards(hand))
+    return int(PAIR_CLASS[a, b])
+
+
+def hand_key(hand: Sequence[Card]) -> str:
+    """Canonical class name of two Cards, e.g. "ATs"."""
+    return str(CLASS_NAMES[hand_class(hand)])
+
+
+def pair_table(class_values: np.ndarray, default: float = 0.5) -> np.ndarray:
+    """Expand a (169,) per-class table to (52, 52) indexed by two card codes; NaN and the diagonal get `default`."""
+    values = np.where(np.isnan(class_values), default, class_values)
+    table = np.where(PAIR_CLASS >= 0, values[PAIR_CLASS], default)
+    table.setflags(write=False)
+    return table
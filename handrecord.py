@@ -1,6 +1,11 @@
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Optional, Sequence
+import os
+
+import numpy as np
+
 from cards import Card
+from strategyfile import open_file, write_sections
 
 @dataclass
 class HandRecord:
@@ -12,3 +17,175 @@ class HandRecord:
     position: str
     pot_size: int
     bet_amount: int
+    actions: bytes = b""  # ActionHistory.key() at the time of the record
+
+
+# ==== Hand-history store ====
+# Complete hands are kept column by column in three tables (hands, seats, actions) that
+# grow in place; a hand's seats and actions are contiguous row ranges. Saved files use
+# the strategyfile section format, so a stored session opens memory-mapped. Player and
+# position names are stored once each, UTF-8 encoded back to back with their byte lengths.
+HAND_STORE_PATH = "hand_history.bin"
+NO_CARD = -1
+
+HAND_COLUMNS = {
+    "button": (np.int8, ()),
+    "small_blind": (np.int32, ()),
+    "big_blind": (np.int32, ()),
+    "board": (np.int8, (5,)),
+    "seat_start": (np.int64, ()),
+    "seat_count": (np.int8, ()),
+    "action_start": (np.int64, ()),
+    "action_count": (np.int32, ()),
+}
+SEAT_COLUMNS = {
+    "hand": (np.int64, ()),
+    "seat": (np.int8, ()),
+    "player": (np.int32, ()),     # index into strings
+    "position": (np.int32, ()),   # index into strings
+    "stack": (np.int32, ()),      # chips before the blinds
+    "blind": (np.int32, ()),
+    "hole": (np.int8, (2,)),
+    "contributed": (np.int32, ()),
+    "won": (np.int32, ()),
+}
+ACTION_COLUMNS = {
+    "hand": (np.int64, ()),
+    "seat": (np.int8, ()),
+    "street": (np.int8, ()),
+    "code": (np.uint8, ()),       # actionhistory byte code
+    "amount": (np.int32, ()),     # amount named with the action (raise-to for raises)
+    "chips": (np.int32, ()),      # chips that actually went in
+    "pot": (np.int32, ()),        # pot before the action
+    "to_call": (np.int32, ()),    # current bet the seat was facing
+    # Filled in by analytics.annotate(); NaN until then
+    "equity": (np.float32, (), np.nan),
+    "ev_loss": (np.float32, (), np.nan),
+    "best": (np.uint8, ()),       # actionhistory code of the highest-EV alternative, 0 if unknown
+}
+
+
+class ColumnTable:
+    """
+    Struct-of-arrays table that grows by doubling; columns are views up to len(self).
+    Schema entries are (dtype, shape) or (dtype, shape, fill value for unset cells).
+    """
+
+    def __init__(self, schema: Dict[str, tuple], capacity: int = 256):
+        self.schema = schema
+        self.size = 0
+        self._data = {name: np.full((capacity,) + spec[1], spec[2] if len(spec) > 2 else 0, dtype=spec[0])
+                      for name, spec in schema.items()}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._data[name][:self.size]
+
+    def append(self, **values) -> int:
+        row = self.size
+        if row == len(next(iter(self._data.values()))):
+            for name, column in self._data.items():
+                spec = self.schema[name]
+                self._data[name] = np.concatenate([column, np.full_like(column, spec[2] if len(spec) > 2 else 0)])
+        for name, value in values.items():
+            self._data[name][row] = value
+        self.size += 1
+        return row
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: self[name] for name in self.schema}
+
+    @classmethod
+    def from_columns(cls, schema: Dict[str, tuple], columns: Dict[str, np.ndarray]) -> "ColumnTable":
+        size = len(next(iter(columns.values())))
+        table = cls(schema, capacity=max(size, 1) * 2)
+        for name, column in columns.items():
+            table._data[name][:size] = column
+        table.size = size
+        return table
+
+
+def _load_strings(f) -> List[str]:
+    if "string_bytes" not in f:
+        # Files written before names were variable-length hold them as fixed-width S64
+        return [s.decode() for s in f["strings"]]
+    blob, lengths = f["string_bytes"].tobytes(), f["string_lengths"].tolist()
+    starts = np.concatenate([[0], np.cumsum(lengths)]).tolist()
+    return [blob[start:start + length].decode("utf-8") for start, length in zip(starts, lengths)]
+
+
+class HandStore:
+    def __init__(self):
+        self.hands = ColumnTable(HAND_COLUMNS)
+        self.seats = ColumnTable(SEAT_COLUMNS)
+        self.actions = ColumnTable(ACTION_COLUMNS)
+        self.strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.hands)
+
+    def string_id(self, value: str) -> int:
+        index = self._string_ids.get(value)
+        if index is None:
+            index = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def add_hand(self, seats: Sequence[dict], actions: Sequence[dict], board: Sequence[int],
+                 button: int, small_blind: int, big_blind: int) -> int:
+        """
+        Store one finished hand. `seats` holds dicts with name, position, stack, blind, hole,
+        contributed and won; `actions` holds dicts with the ACTION_COLUMNS fields except hand.
+        """
+        hand = len(self.hands)
+        padded_board = list(board)[:5] + [NO_CARD] * (5 - min(len(board), 5))
+        self.hands.append(button=button, small_blind=small_blind, big_blind=big_blind, board=padded_board,
+                          seat_start=len(self.seats), seat_count=len(seats),
+                          action_start=len(self.actions), action_count=len(actions))
+        for i, seat in enumerate(seats):
+            hole = list(seat["hole"])[:2] + [NO_CARD] * (2 - min(len(seat["hole"]), 2))
+            self.seats.append(hand=hand, seat=i, player=self.string_id(seat["name"]),
+                              position=self.string_id(seat["position"]), stack=seat["stack"],
+                              blind=seat["blind"], hole=hole, contributed=seat["contributed"], won=seat["won"])
+        for action in actions:
+            self.actions.append(hand=hand, **action)
+        return hand
+
+    def hand_seats(self, hand: int) -> slice:
+        start = int(self.hands["seat_start"][hand])
+        return slice(start, start + int(self.hands["seat_count"][hand]))
+
+    def hand_actions(self, hand: int) -> slice:
+        start = int(self.hands["action_start"][hand])
+        return slice(start, start + int(self.hands["action_count"][hand]))
+
+    def save(self, path: str = HAND_STORE_PATH) -> None:
+        encoded = [s.encode("utf-8") for s in self.strings]
+        sections = {"string_bytes": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                    "string_lengths": np.array([len(b) for b in encoded], dtype=np.int32)}
+        for prefix, table in (("h_", self.hands), ("s_", self.seats), ("a_", self.actions)):
+            sections.update({prefix + name: column for name, column in table.columns().items()})
+        write_sections(path, sections)
+
+    @classmethod
+    def load(cls, path: str = HAND_STORE_PATH) -> "HandStore":
+        """Load a saved store; columns are copied so more hands can be appended."""
+        f = open_file(path)
+        store = cls()
+        store.strings = _load_strings(f)
+        store._string_ids = {s: i for i, s in enumerate(store.strings)}
+        for prefix, attr, schema in (("h_", "hands", HAND_COLUMNS), ("s_", "seats", SEAT_COLUMNS),
+                                     ("a_", "actions", ACTION_COLUMNS)):
+            size = len(f[prefix + next(iter(schema))])
+            columns = {name: f[prefix + name] if prefix + name in f else
+                       np.full((size,) + spec[1], spec[2] if len(spec) > 2 else 0, dtype=spec[0])
+                       for name, spec in schema.items()}
+            setattr(store, attr, ColumnTable.from_columns(schema, columns))
+        return store
+
+    @classmethod
+    def open(cls, path: str = HAND_STORE_PATH) -> "HandStore":
+        return cls.load(path) if os.path.exists(path) else cls()
@@ -0,0 +1,122 @@
+"""
+Hand strength and hand potential by exact enumeration (Billings et al.).
+
+For hole cards on a flop or turn, against every opponent combo (optionally weighted by a
+range, see ranges.py):
+
+    hs     share of opponent hands currently beaten (ties count half)
+    ppot   chance of getting ahead with the next card when behind or tied
+    npot   chance of falling behind with the next card when ahead or tied
+    ehs    hs * (1 - npot) + (1 - hs) * ppot
+    ehs2   mean of the squared hand strength after the next card
+
+Everything is array arithmetic over one cached table per board: the evaluator score of
+all 1326 combos on the board and on the board plus each possible next card. Boards are
+canonicalised by suit relabelling first, so e.g. all monotone A-K-2 flops share one table.
+On the river there is no next card, so hs is exact and ppot = npot = 0; preflop, hs is the
+preflop table strength (ranges.PREFLOP_STRENGTH) against the range.
+"""
+from dataclasses import astuple, dataclass
+from functools import lru_cache
+from itertools import permutations
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cards import Card, card_to_int, flatten_cards
+from evaluator import evaluate_codes
+from handclass import COMBOS, NUM_COMBOS, PAIR_COMBO
+from ranges import COMBO_MASK, PREFLOP_STRENGTH, full_range
+
+FEATURE_NAMES = ("hs", "ppot", "npot", "ehs", "ehs2")
+# Every relabelling of the four suits, as a map from card code to card code
+SUIT_MAPS = np.array([[c // 4 * 4 + perm[c % 4] for c in range(52)] for perm in permutations(range(4))])
+
+
+@dataclass(frozen=True)
+class HandPotential:
+    hs: float
+    ppot: float
+    npot: float
+    ehs: float
+    ehs2: float
+
+    def features(self) -> List[float]:
+        return list(astuple(self))
+
+
+def canonical_board(board: Sequence[int]) -> Tuple[Tuple[int, ...], np.ndarray]:
+    """The smallest suit relabelling of the board, and the card map that produces it."""
+    best, best_map = None, None
+    for suit_map in SUIT_MAPS:
+        key = tuple(sorted(int(suit_map[c]) for c in board))
+        if best is None or key < best:
+            best, best_map = key, suit_map
+    return best, best_map
+
+
+@lru_cache(maxsize=128)
+def board_table(board: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (current, after) for a sorted board of 3-4 cards: current[c] is combo c's score now,
+    after[r, c] its score once card r is dealt; -1 where the combo collides with the cards.
+    """
+    board_cards = np.array(board, dtype=np.int64)
+    dead = COMBO_MASK[:, board_cards].any(axis=1)
+    current = np.full(NUM_COMBOS, -1, dtype=np.int32)
+    live = np.flatnonzero(~dead)
+    current[live] = evaluate_codes(np.column_stack([COMBOS[live], np.broadcast_to(board_cards, (len(live), len(board)))]))
+
+    after = np.full((52, NUM_COMBOS), -1, dtype=np.int32)
+    if len(board) < 5:
+        cards = np.setdiff1d(np.arange(52), board_cards)
+        rows, combos = np.nonzero(COMBO_MASK[:, cards].T == 0)
+        rows, combos = rows[~dead[combos]], combos[~dead[combos]]
+        codes = np.column_stack([COMBOS[combos], np.broadcast_to(board_cards, (len(combos), len(board))), cards[rows]])
+        after[cards[rows], combos] = evaluate_codes(codes)
+    current.setflags(write=False)
+    after.setflags(write=False)
+    return current, after
+
+
+def hand_potential(hand: Sequence[int], board: Sequence[int], opponent_range: Optional[np.ndarray] = None) -> HandPotential:
+    """Strength and potential of two hole-card codes on a board of 0 or 3-5 card codes."""
+    hand, board = [int(c) for c in hand], [int(c) for c in board]
+    weights = full_range() if opponent_range is None else np.asarray(opponent_range, dtype=np.float64)
+    live = weights * (COMBO_MASK[:, hand + board].sum(axis=1) == 0)
+    if live.sum() <= 0:
+        live = full_range() * (COMBO_MASK[:, hand + board].sum(axis=1) == 0)
+    if len(board) < 3:
+        hero = PREFLOP_STRENGTH[PAIR_COMBO[hand[0], hand[1]]]
+        hs = float(live @ ((PREFLOP_STRENGTH < hero) + 0.5 * (PREFLOP_STRENGTH == hero)) / live.sum())
+        return HandPotential(hs, 0.0, 0.0, hs, hs * hs)
+
+    key, suit_map = canonical_board(board)
+    current, after = board_table(key)
+    # Move the hand and the range into the canonical suits
+    hand = [int(suit_map[c]) for c in hand]
+    live = np.bincount(PAIR_COMBO[suit_map[COMBOS[:, 0]], suit_map[COMBOS[:, 1]]], weights=live, minlength=NUM_COMBOS)
+    hero = PAIR_COMBO[hand[0], hand[1]]
+
+    now = np.sign(current[hero] - current)               # +1 ahead, 0 tied, -1 behind, per opponent
+    hs = float(live @ ((now + 1) / 2) / live.sum())
+    if len(board) == 5:
+        return HandPotential(hs, 0.0, 0.0, hs, hs * hs)
+
+    cards = np.setdiff1d(np.arange(52), list(key) + hand)
+    weight = live[None, :] * (after[cards] >= 0)         # (next card, opponent)
+    later = np.sign(after[cards, hero][:, None] - after[cards])
+    # transitions[i, j]: weight moving from now == i - 1 to later == j - 1
+    transitions = np.zeros((3, 3))
+    np.add.at(transitions, (np.broadcast_to(now + 1, later.shape).ravel(), (later + 1).ravel()), weight.ravel())
+    behind, tied, ahead = transitions.sum(axis=1)
+    ppot = (transitions[0, 2] + transitions[0, 1] / 2 + transitions[1, 2] / 2) / max(behind + tied / 2, 1e-12)
+    npot = (transitions[2, 0] + transitions[1, 0] / 2 + transitions[2, 1] / 2) / max(ahead + tied / 2, 1e-12)
+    hs_next = (weight * (later + 1) / 2).sum(axis=1) / np.maximum(weight.sum(axis=1), 1e-12)
+    ehs = hs * (1 - npot) + (1 - hs) * ppot
+    return HandPotential(hs, float(ppot), float(npot), float(ehs), float(np.mean(hs_next ** 2)))
+
+
+def potential_of(hand: List[Card], community: List[Card], opponent_range: Optional[np.ndarray] = None) -> HandPotential:
+    return hand_potential([card_to_int(c) for c in flatten_cards(hand)],
+                          [card_to_int(c) for c in flatten_cards(community or [])], opponent_range)
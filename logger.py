@@ -0,0 +1,163 @@
+import logging
+import os
+import struct
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+# Environment overrides, e.g. ACE_LOG_LEVEL=DEBUG ACE_TRACE_FILE=trace.bin python gui.py
+LOG_LEVEL_ENV = "ACE_LOG_LEVEL"
+TRACE_FILE_ENV = "ACE_TRACE_FILE"
+ROOT = "ace"
+DEFAULT_LEVEL = logging.WARNING
+
+_DEFINE = 0
+_EVENT = 1
+_HEADER = b"ACETRC1\n"
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return a logger under the "ace" namespace. Call sites pass format args, never pre-built strings."""
+    _ensure_configured()
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+class BinaryTraceHandler(logging.Handler):
+    """
+    Writes log records in a compact binary form without formatting them.
+
+    Each distinct (logger, format string) pair is written once as a definition record
+    and later events refer to it by a 16-bit id; args are stored as typed values.
+    Decode a trace with read_trace().
+    """
+
+    def __init__(self, path: str):
+        super().__init__(level=logging.DEBUG)
+        self.file = open(path, "wb")
+        self.file.write(_HEADER)
+        self.ids: Dict[Tuple[str, str], int] = {}
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            key = (record.name, str(record.msg))
+            msg_id = self.ids.get(key)
+            if msg_id is None:
+                msg_id = self.ids[key] = len(self.ids)
+                text = f"{key[0]}\x00{key[1]}".encode("utf-8")
+                self.file.write(struct.pack("<BHI", _DEFINE, msg_id, len(text)) + text)
+            args = record.args if isinstance(record.args, tuple) else (record.args,) if record.args else ()
+            parts = [struct.pack("<BdBHB", _EVENT, record.created, record.levelno, msg_id, len(args))]
+            for arg in args:
+                parts.append(_pack_arg(arg))
+            self.file.write(b"".join(parts))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        if not self.file.closed:
+            self.file.flush()
+
+    def close(self) -> None:
+        if not self.file.closed:
+            self.file.close()
+        super().close()
+
+
+def _pack_arg(arg) -> bytes:
+    if isinstance(arg, bool):
+        return struct.pack("<c?", b"b", arg)
+    if isinstance(arg, int) and -2**63 <= arg < 2**63:
+        return struct.pack("<cq", b"i", arg)
+    if isinstance(arg, float):
+        return struct.pack("<cd", b"f", arg)
+    data = (arg if isinstance(arg, str) else repr(arg)).encode("utf-8")
+    return struct.pack("<cI", b"s", len(data)) + data
+
+
+def _unpack_arg(data: bytes, offset: int):
+    tag = data[offset:offset + 1]
+    offset += 1
+    if tag == b"b":
+        return struct.unpack_from("<?", data, offset)[0], offset + 1
+    if tag == b"i":
+        return struct.unpack_from("<q", data, offset)[0], offset + 8
+    if tag == b"f":
+        return struct.unpack_from("<d", data, offset)[0], offset + 8
+    (length,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    return data[offset:offset + length].decode("utf-8"), offset + length
+
+
+def read_trace(path: str) -> Iterator[Tuple[float, int, str, str]]:
+    """Yield (timestamp, level, logger name, formatted message) from a binary trace file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(_HEADER):
+        raise ValueError(f"{path} is not an ACE trace file")
+    defs: Dict[int, Tuple[str, str]] = {}
+    offset = len(_HEADER)
+    while offset < len(data):
+        kind = data[offset]
+        if kind == _DEFINE:
+            _, msg_id, length = struct.unpack_from("<BHI", data, offset)
+            offset += struct.calcsize("<BHI")
+            name, msg = data[offset:offset + length].decode("utf-8").split("\x00", 1)
+            defs[msg_id] = (name, msg)
+            offset += length
+        else:
+            _, created, level, msg_id, nargs = struct.unpack_from("<BdBHB", data, offset)
+            offset += struct.calcsize("<BdBHB")
+            args = []
+            for _ in range(nargs):
+                value, offset = _unpack_arg(data, offset)
+                args.append(value)
+            name, msg = defs[msg_id]
+            try:
+                text = msg % tuple(args) if args else msg
+            except (TypeError, ValueError):
+                text = f"{msg} {args}"
+            yield created, level, name, text
+
+
+def configure(level: Optional[str] = None, trace_file: Optional[str] = None) -> None:
+    """
+    (Re)configure the "ace" loggers. The console level defaults to WARNING so hot paths
+    stay silent; a trace file captures everything down to DEBUG in binary form.
+    """
+    root = logging.getLogger(ROOT)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+    level_name = (level or os.environ.get(LOG_LEVEL_ENV) or logging.getLevelName(DEFAULT_LEVEL)).upper()
+    console_level = logging.getLevelName(level_name)
+    if not isinstance(console_level, int):
+        console_level = DEFAULT_LEVEL
+    console = logging.StreamHandler()
+    console.setLevel(console_level)
+    console.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root.addHandler(console)
+
+    trace_file = trace_file or os.environ.get(TRACE_FILE_ENV)
+    if trace_file:
+        root.addHandler(BinaryTraceHandler(trace_file))
+        root.setLevel(logging.DEBUG)
+    else:
+        root.setLevel(console_level)
+    root.propagate = False
+
+
+_configured = False
+
+
+def _ensure_configured() -> None:
+    global _configured
+    if not _configured:
+        _configured = True
+        configure()
+
+
+if __name__ == "__main__":
+    import sys
+    for created, level, name, text in read_trace(sys.argv[1]):
+        stamp = time.strftime("%H:%M:%S", time.localtime(created))
+        print(f"{stamp}.{int(created % 1 * 1000):03d} {logging.getLevelName(level)} {name}: {text}")
@@ -1,5 +1,5 @@
-from typing import List
-from cards import Card
+from typing import List, Optional
+from cards import Card, flatten_cards, rank_value
 
 POSITION_MAP = {
     "UTG": 0,
@@ -10,19 +10,52 @@ POSITION_MAP = {
     "BB": 5
 }
 
-def extract_features(hand: List[Card], community: List[Card], position: str, pot: int, bet: int) -> List[float]:
-    
+# Column order shared by training (ml.trainer.prepare_data) and prediction (PokerAI)
+BASE_FEATURES = ["is_suited", "rank_gap", "high_card", "position_index",
+                 "pot", "current_bet", "num_community_cards", "is_pair",
+                 "is_connector", "is_ace", "pot_odds"]
+# Extra columns appended when a handstrength.HandPotential is passed
+POTENTIAL_FEATURES = ["hs", "ppot", "npot", "ehs", "ehs2"]
+# Card abstraction bucket (PokerAI.card_bucket), appended last
+BUCKET_FEATURE = "bucket"
+
+
+def feature_columns(potential: bool = False, bucket: bool = False) -> List[str]:
+    return BASE_FEATURES + (POTENTIAL_FEATURES if potential else []) + ([BUCKET_FEATURE] if bucket else [])
+
+
+def model_columns(model) -> List[str]:
+    """The columns a trained model expects, by name when it was fit on a DataFrame, else by count."""
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None:
+        return [str(name) for name in names]
+    extra = getattr(model, "n_features_in_", len(BASE_FEATURES)) - len(BASE_FEATURES)
+    return feature_columns(potential=extra >= len(POTENTIAL_FEATURES), bucket=extra % len(POTENTIAL_FEATURES) == 1)
+
+
+def extract_features(hand: List[Card], community: List[Card], position: str, pot: int, bet: int,
+                     potential=None, bucket=None, columns: Optional[List[str]] = None) -> List[float]:
+    """Feature values in `columns` order; by default every column that can be computed from the arguments."""
+
+    hand = flatten_cards(hand)
+    r0, r1 = rank_value(hand[0].rank), rank_value(hand[1].rank)
     features = {
         "is_suited": int(hand[0].suit == hand[1].suit),
-        "rank_gap": abs(hand[0].rank.value - hand[1].rank.value),
-        "high_card": max(hand[0].rank.value, hand[1].rank.value),
+        "rank_gap": abs(r0 - r1),
+        "high_card": max(r0, r1),
         "position_index": POSITION_MAP.get(position, 0),
         "pot": pot,
         "current_bet": bet,
         "num_community_cards": len(community),
-        "is_pair": int(hand[0].rank == hand[1].rank),
-        "is_connector": int(abs(hand[0].rank.value - hand[1].rank.value) == 1),
-        "is_ace": int(hand[0].rank.value == 14 or hand[1].rank.value == 14),
+        "is_pair": int(r0 == r1),
+        "is_connector": int(abs(r0 - r1) == 1),
+        "is_ace": int(r0 == 14 or r1 == 14),
         "pot_odds": bet / (pot + bet) if pot + bet > 0 else 0
     }
-    return list(features.values()) 
\ No newline at end of file
+    if potential is not None:
+        features.update(zip(POTENTIAL_FEATURES, potential.features()))
+    if bucket is not None:
+        features[BUCKET_FEATURE] = bucket
+    if columns is not None:
+        return [features[name] for name in columns]
+    return list(features.values())
@@ -1,21 +1,26 @@
-import pandas as pd
-import joblib
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
+# pandas, scikit-learn and joblib are imported inside the functions that need them, so
+# importing this module (and the game/AI modules that reach it) stays cheap when no
+# training happens.
 from typing import List, Tuple
 import numpy as np
 
 def prepare_data(records: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
-    
+    import pandas as pd
+
+    from ml.features import BUCKET_FEATURE, POTENTIAL_FEATURES, feature_columns
+
     df = pd.DataFrame(records)
-    X = df[["is_suited", "rank_gap", "high_card", "position_index", 
-            "pot", "current_bet", "num_community_cards", "is_pair",
-            "is_connector", "is_ace", "pot_odds"]]
+    # Hand strength / potential and bucket columns are used when the records have them
+    columns = feature_columns(potential=all(name in df for name in POTENTIAL_FEATURES), bucket=BUCKET_FEATURE in df)
+    X = df[columns]
     y = df["action"]
     return X, y
 
 def train_model(X: np.ndarray, y: np.ndarray, model_path: str = "ml/model.pkl") -> None:
-    
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
     model = RandomForestClassifier(
@@ -34,5 +39,6 @@ def train_model(X: np.ndarray, y: np.ndarray, model_path: str = "ml/model.pkl")
     print(f"Testing accuracy: {test_score:.2f}")
 
 def load_model(model_path: str = "ml/model.pkl"):
-    
+    # Unpickling pulls in the sklearn estimator classes, but only once a model file exists
+    import joblib
     return joblib.load(model_path) 
\ No newline at end of file
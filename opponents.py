@@ -0,0 +1,149 @@
+"""
+Per-opponent statistics, updated in O(1) per action.
+
+Each player ID gets one row of int32 counters; the derived stats are smoothed towards
+typical population values until a player has enough hands behind them:
+
+    VPIP          voluntarily put chips in preflop (call or raise), per hand
+    PFR           raised preflop, per hand
+    AF            aggression factor, postflop bets and raises / calls
+    cbet          bet the flop as the preflop raiser when checked to
+    fold_to_cbet  folded to a flop continuation bet
+
+ranges.RangeTracker reads them to set each player's action thresholds when it narrows
+their range, and betsizing.py takes its fold rates from them.
+"""
+from typing import Dict, Iterable
+
+import numpy as np
+
+
+COUNTERS = ("hands", "vpip", "pfr", "bets", "calls", "cbet_chances", "cbets", "cbets_faced", "cbet_folds")
+_C = {name: i for i, name in enumerate(COUNTERS)}
+
+# (population value, weight in hands) used to smooth each stat
+PRIORS = {
+    "vpip": (0.25, 10),
+    "pfr": (0.15, 10),
+    "af": (1.5, 5),
+    "cbet": (0.6, 5),
+    "fold_to_cbet": (0.5, 5),
+}
+AGGRESSIVE = ("raise", "bet", "all-in")
+
+
+class OpponentStats:
+    def __init__(self, capacity: int = 16):
+        self.ids: Dict[str, int] = {}
+        self.counts = np.zeros((capacity, len(COUNTERS)), dtype=np.int32)
+        self._vpip_seen = np.zeros(capacity, dtype=bool)
+        self._pfr_seen = np.zeros(capacity, dtype=bool)
+        self._aggressor = -1     # preflop raiser of the current hand
+        self._street = 0
+        self._street_bet = False
+        self._cbet_live = False
+
+    def _row(self, player_id: str) -> int:
+        row = self.ids.get(player_id)
+        if row is None:
+            row = self.ids[player_id] = len(self.ids)
+            if row >= len(self.counts):
+                grow = len(self.counts)
+                self.counts = np.vstack([self.counts, np.zeros_like(self.counts)])
+                self._vpip_seen = np.concatenate([self._vpip_seen, np.zeros(grow, dtype=bool)])
+                self._pfr_seen = np.concatenate([self._pfr_seen, np.zeros(grow, dtype=bool)])
+        return row
+
+    def new_hand(self, player_ids: Iterable[str]) -> None:
+        for player_id in player_ids:
+            self.counts[self._row(player_id), _C["hands"]] += 1
+        self._vpip_seen[:] = False
+        self._pfr_seen[:] = False
+        self._aggressor = -1
+        self._street = 0
+        self._street_bet = False
+        self._cbet_live = False
+
+    def observe(self, player_id: str, street: int, action: str) -> None:
+        """Count one action; `street` is 0 for preflop, 1 for the flop and so on."""
+        row = self._row(player_id)
+        counts = self.counts[row]
+        aggressive = action in AGGRESSIVE
+        if street != self._street:
+            self._street = street
+            self._street_bet = False
+            self._cbet_live = False
+
+        if street == 0:
+            if (aggressive or action == "call") and not self._vpip_seen[row]:
+                self._vpip_seen[row] = True
+                counts[_C["vpip"]] += 1
+            if aggressive:
+                if not self._pfr_seen[row]:
+                    self._pfr_seen[row] = True
+                    counts[_C["pfr"]] += 1
+                self._aggressor = row
+            return
+
+        if aggressive:
+            counts[_C["bets"]] += 1
+        elif action == "call":
+            counts[_C["calls"]] += 1
+
+        if street == 1:
+            if row == self._aggressor and not self._street_bet:
+                counts[_C["cbet_chances"]] += 1
+                if aggressive:
+                    counts[_C["cbets"]] += 1
+                    self._cbet_live = True
+            elif self._cbet_live:
+                counts[_C["cbets_faced"]] += 1
+                if action == "fold":
+                    counts[_C["cbet_folds"]] += 1
+                elif aggressive:
+                    self._cbet_live = False
+        if aggressive:
+            self._street_bet = True
+
+    # ==== Derived stats ====
+    def _rate(self, player_id: str, stat: str, hits: str, chances: str) -> float:
+        prior, weight = PRIORS[stat]
+        row = self.ids.get(player_id)
+        if row is None:
+            return prior
+        counts = self.counts[row]
+        return float((counts[_C[hits]] + prior * weight) / (counts[_C[chances]] + weight))
+
+    def vpip(self, player_id: str) -> float:
+        return self._rate(player_id, "vpip", "vpip", "hands")
+
+    def pfr(self, player_id: str) -> float:
+        return self._rate(player_id, "pfr", "pfr", "hands")
+
+    def cbet(self, player_id: str) -> float:
+        return self._rate(player_id, "cbet", "cbets", "cbet_chances")
+
+    def fold_to_cbet(self, player_id: str) -> float:
+        return self._rate(player_id, "fold_to_cbet", "cbet_folds", "cbets_faced")
+
+    def aggression_factor(self, player_id: str) -> float:
+        prior, weight = PRIORS["af"]
+        row = self.ids.get(player_id)
+        if row is None:
+            return prior
+        counts = self.counts[row]
+        return float((counts[_C["bets"]] + prior * weight) / (counts[_C["calls"]] + weight))
+
+    def hands(self, player_id: str) -> int:
+        row = self.ids.get(player_id)
+        return 0 if row is None else int(self.counts[row, _C["hands"]])
+
+    def summary(self, player_id: str) -> Dict[str, float]:
+        return {
+            "hands": self.hands(player_id),
+            "vpip": self.vpip(player_id),
+            "pfr": self.pfr(player_id),
+            "af": self.aggression_factor(player_id),
+            "cbet": self.cbet(player_id),
+            "fold_to_cbet": self.fold_to_cbet(player_id),
+        }
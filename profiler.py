@@ -0,0 +1,240 @@
+"""
+Per-stage latency counters for the decision pipeline, plus on-demand cProfile or
+sampling-profiler capture around a number of hands.
+
+    ACE_PROFILE=1 python gui.py                     # collect stage timings, report on exit
+    ACE_PROFILE_CAPTURE=cprofile:50 python gui.py   # cProfile the next 50 hands -> ace_profile.prof
+    ACE_PROFILE_CAPTURE=sample:50 python gui.py     # sample stacks for 50 hands -> ace_profile.folded
+
+cProfile only sees the thread that started it; use "sample" to include the GUI's AI worker threads.
+
+In code:
+
+    from profiler import PROFILER
+    with PROFILER.stage("equity"):
+        ...
+    print(PROFILER.format_report())
+"""
+import atexit
+import cProfile
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Optional
+
+from logger import get_logger
+
+_log = get_logger("profiler")
+
+PROFILE_ENV = "ACE_PROFILE"
+CAPTURE_ENV = "ACE_PROFILE_CAPTURE"
+PERCENTILES = (50, 95, 99)
+
+
+class StageStats:
+    """Count, total and a bounded reservoir of samples (seconds) for one stage."""
+
+    def __init__(self, capacity: int = 10000):
+        self.capacity = capacity
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = array("d")
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if len(self.samples) < self.capacity:
+            self.samples.append(seconds)
+        else:
+            # Overwrite round-robin so recent behaviour stays represented
+            self.samples[self.count % self.capacity] = seconds
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+        result = {"count": self.count, "mean": self.total / self.count if self.count else 0.0, "max": self.max}
+        for p in PERCENTILES:
+            result[f"p{p}"] = _percentile(ordered, p)
+        return result
+
+
+def _percentile(ordered, p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Stage:
+    __slots__ = ("stats", "start")
+
+    def __init__(self, stats: StageStats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add(time.perf_counter() - self.start)
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class StackSampler:
+    """Poor man's sampling profiler: snapshots every thread's stack at a fixed interval."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ace-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, path: str) -> None:
+        # Folded-stack format, readable by flamegraph.pl / speedscope
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages: Dict[str, StageStats] = {}
+        self._capture = None
+        self._capture_mode = ""
+        self._capture_path = ""
+        self._hands_left = 0
+        self._lock = threading.Lock()
+
+    def enable(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+
+    def reset(self) -> None:
+        self.stages = {}
+
+    def stage(self, name: str):
+        """Context manager timing one stage; a no-op object when the profiler is disabled."""
+        if not self.enabled:
+            return _NULL_STAGE
+        stats = self.stages.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.stages.setdefault(name, StageStats())
+        return _Stage(stats)
+
+    def record(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            stats = self.stages.get(name)
+            if stats is None:
+                with self._lock:
+                    stats = self.stages.setdefault(name, StageStats())
+            stats.add(seconds)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {name: stats.summary() for name, stats in sorted(self.stages.items())}
+
+    def format_report(self) -> str:
+        lines = [f"{'stage':<20}{'count':>8}{'mean':>10}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES) + f"{'max':>10}"]
+        for name, s in self.report().items():
+            lines.append(f"{name:<20}{s['count']:>8}{s['mean'] * 1e3:>9.2f}m"
+                         + "".join(f"{s[f'p{p}'] * 1e3:>9.2f}m" for p in PERCENTILES)
+                         + f"{s['max'] * 1e3:>9.2f}m")
+        return "\n".join(lines)
+
+    def dump(self) -> None:
+        if self.stages:
+            _log.warning("Stage latency (ms):\n%s", self.format_report())
+
+    def capture(self, hands: int, mode: str = "cprofile", path: Optional[str] = None) -> None:
+        """Start cProfile ("cprofile") or the stack sampler ("sample") and stop after `hands` hands."""
+        self.stop_capture()
+        if mode == "cprofile":
+            self._capture = cProfile.Profile()
+            self._capture.enable()
+        elif mode == "sample":
+            self._capture = StackSampler()
+            self._capture.start()
+        else:
+            raise ValueError(f"Unknown capture mode: {mode}")
+        self._capture_mode = mode
+        self._capture_path = path or ("ace_profile.prof" if mode == "cprofile" else "ace_profile.folded")
+        self._hands_left = hands
+
+    def hand_finished(self) -> None:
+        """Called by the game once per hand; ends an active capture after the requested number of hands."""
+        if self._capture is None:
+            return
+        self._hands_left -= 1
+        if self._hands_left <= 0:
+            self._finish_capture()
+
+    def stop_capture(self) -> None:
+        if self._capture is not None:
+            self._finish_capture()
+
+    def _finish_capture(self) -> None:
+        capture, self._capture = self._capture, None
+        if self._capture_mode == "cprofile":
+            capture.disable()
+            capture.dump_stats(self._capture_path)
+        else:
+            capture.stop()
+            capture.dump(self._capture_path)
+        _log.warning("Profile written to %s", self._capture_path)
+
+
+PROFILER = Profiler(enabled=os.environ.get(PROFILE_ENV, "") not in ("", "0"))
+
+
+def _configure_from_env() -> None:
+    spec = os.environ.get(CAPTURE_ENV)
+    if spec:
+        mode, _, rest = spec.partition(":")
+        hands, _, path = rest.partition(":")
+        PROFILER.capture(int(hands or 20), mode=mode, path=path or None)
+        atexit.register(PROFILER.stop_capture)
+    if PROFILER.enabled:
+        atexit.register(PROFILER.dump)
+
+
+_configure_from_env()
@@ -0,0 +1,276 @@
+"""
+Push/fold equilibrium charts for short stacks.
+
+With about 20 big blinds or less, preflop play is close to "jam all-in or fold". For a table
+of n seats with equal stacks of S big blinds, seats are numbered in preflop order: 0 acts
+first, n - 2 is the small blind and n - 1 the big blind (heads-up: 0 = SB, 1 = BB). The
+strategy is
+
+    jam[i]      chance seat i jams each of the 1326 combos when folded to
+    call[i, j]  chance seat j calls a jam from seat i when everyone in between folded
+
+A called jam is assumed to end the action: the players behind the caller fold. Every
+showdown is then heads-up, so the all-in equities come from the preflop equity matrix
+(equitymatrix.py). For a hand h against a range r, card removal included,
+
+    P(r has a hand)  = (C @ r)[h] / 1225        C: 1 where two combos share no card
+    equity vs r      = (E @ r)[h] / (C @ r)[h]
+
+and the chip EV of jamming or calling follows for every combo at once. Fictitious play
+iterates best responses for all seats against the average strategies. Each iteration
+multiplies both matrices by the stacked strategy columns, once. The averages converge
+to an equilibrium in chips; ICM is not modelled.
+
+Charts for a grid of table sizes and stack depths are written to one strategyfile:
+
+    seats    i1 (P,)                    table sizes
+    stacks   f4 (D,)                    stack depths in big blinds
+    jam      u1 (P, D, 9, 1326)         jam[i] as 0-255
+    call     u1 (P, D, 81, 1326)        call[i, j] as 0-255 in row 9 i + j
+
+    python pushfold.py build                             # 2-9 seats, 2-20bb
+    python pushfold.py build --seats 6 --stacks 10 15
+    python pushfold.py show --seats 6 --stack 10
+"""
+import argparse
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from equitymatrix import EquityMatrix, compatible
+from handclass import COMBO_CLASS, CLASS_NAMES, CLASS_SIZE, NUM_CLASSES, NUM_COMBOS
+from logger import get_logger
+from strategyfile import open_file, write_sections
+
+_log = get_logger("pushfold")
+
+PUSHFOLD_PATH = "pushfold.bin"
+MAX_SEATS = 9
+DEFAULT_SEATS = tuple(range(2, MAX_SEATS + 1))
+DEFAULT_STACKS = (2, 3, 4, 5, 6, 7, 8, 10, 12, 15, 20)
+ITERATIONS = 1000
+SMALL_BLIND, BIG_BLIND = 0.5, 1.0
+# Position names in chart seat order, blinds last
+PREFLOP_ORDER = ("UTG", "UTG+1", "MP", "LJ", "HJ", "CO", "BTN", "SB", "BB")
+
+
+def blinds(seats: int) -> np.ndarray:
+    posted = np.zeros(seats)
+    posted[-2:] = SMALL_BLIND, BIG_BLIND
+    return posted
+
+
+def seat_order(players: Sequence) -> List:
+    """Players sorted into chart seats by their position names (PREFLOP_ORDER); unknown names keep their order."""
+    rank = {name: i for i, name in enumerate(PREFLOP_ORDER)}
+    return sorted(players, key=lambda p: rank.get(p.position, len(PREFLOP_ORDER)))
+
+
+def _pairs(seats: int) -> List[Tuple[int, int]]:
+    return [(i, j) for i in range(seats - 1) for j in range(i + 1, seats)]
+
+
+# ==== Solver ====
+class PushFoldSolver:
+    """Fictitious play for one table size and stack depth."""
+
+    def __init__(self, equity: EquityMatrix, seats: int, stack: float):
+        if not 2 <= seats <= MAX_SEATS:
+            raise ValueError(f"seats must be between 2 and {MAX_SEATS}")
+        self.E = np.asarray(equity.equity, dtype=np.float32)
+        self.C = compatible()
+        self.seats = seats
+        self.stack = float(stack)
+        self.blinds = blinds(seats)
+        self.pairs = _pairs(seats)
+        self.columns = {pair: k for k, pair in enumerate(self.pairs)}
+        # Averages start from "jam or call everything half the time"
+        self.jam = np.full((seats - 1, NUM_COMBOS), 0.5)
+        self.call = np.full((len(self.pairs), NUM_COMBOS), 0.5)
+        self.iterations = 0
+
+    def _products(self) -> Tuple[np.ndarray, np.ndarray]:
+        strategies = np.vstack([self.jam, self.call]).T.astype(np.float32)    # (1326, K)
+        return self.E @ strategies, self.C @ strategies
+
+    def values(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Chip EV (in big blinds, relative to the starting stack) of every combo for
+        (jam, fold when folded to) per seat and (call, fold) per (jammer, caller) pair.
+        """
+        ER, CR = self._products()
+        live = NUM_COMBOS - 101     # combos sharing no card with a given hand
+        total_blinds = self.blinds.sum()
+        pot = lambda i, j: 2 * self.stack + total_blinds - self.blinds[i] - self.blinds[j]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            equity = np.nan_to_num(ER / CR)
+        seats = self.seats - 1
+
+        jam_ev = np.zeros((seats, NUM_COMBOS))
+        for i in range(seats):
+            reach = np.ones(NUM_COMBOS)
+            for j in range(i + 1, self.seats):
+                column = seats + self.columns[i, j]
+                called = CR[:, column] / live
+                jam_ev[i] += reach * called * (equity[:, column] * pot(i, j) - self.stack)
+                reach *= 1.0 - called
+            jam_ev[i] += reach * (total_blinds - self.blinds[i])
+        call_ev = np.stack([equity[:, i] * pot(i, j) - self.stack for i, j in self.pairs])
+        fold_jam = -self.blinds[:seats, None]
+        fold_call = -self.blinds[[j for _, j in self.pairs], None]
+        return jam_ev, np.broadcast_to(fold_jam, jam_ev.shape), call_ev, np.broadcast_to(fold_call, call_ev.shape)
+
+    def exploitability(self) -> float:
+        """Mean gain in big blinds per combo a best response makes over the average strategy, summed over decisions."""
+        jam_ev, jam_fold, call_ev, call_fold = self.values()
+        gain = np.maximum(jam_ev, jam_fold) - (self.jam * jam_ev + (1 - self.jam) * jam_fold)
+        gain_call = np.maximum(call_ev, call_fold) - (self.call * call_ev + (1 - self.call) * call_fold)
+        return float(gain.mean(axis=1).sum() + gain_call.mean(axis=1).sum())
+
+    def step(self) -> None:
+        jam_ev, jam_fold, call_ev, call_fold = self.values()
+        self.iterations += 1
+        rate = 1.0 / (self.iterations + 1)
+        self.jam += rate * ((jam_ev > jam_fold) - self.jam)
+        self.call += rate * ((call_ev > call_fold) - self.call)
+
+    def solve(self, iterations: int = ITERATIONS) -> "PushFoldSolver":
+        for _ in range(iterations):
+            self.step()
+        return self
+
+    def call_table(self) -> np.ndarray:
+        """(seats, seats, 1326) call strategy indexed by (jammer, caller), zero off the pairs."""
+        table = np.zeros((self.seats, self.seats, NUM_COMBOS))
+        for row, (i, j) in enumerate(self.pairs):
+            table[i, j] = self.call[row]
+        return table
+
+
+def _solve_job(args) -> Tuple[np.ndarray, np.ndarray, float]:
+    equity_path, seats, stack, iterations = args
+    solver = PushFoldSolver(EquityMatrix(equity_path), seats, stack).solve(iterations)
+    return solver.jam, solver.call_table(), solver.exploitability()
+
+
+def _quantize(p: np.ndarray) -> np.ndarray:
+    return np.rint(np.clip(p, 0.0, 1.0) * 255).astype(np.uint8)
+
+
+def build(seats: Sequence[int] = DEFAULT_SEATS, stacks: Sequence[float] = DEFAULT_STACKS,
+          iterations: int = ITERATIONS, workers: Optional[int] = None, equity_path: Optional[str] = None,
+          out_path: str = PUSHFOLD_PATH) -> str:
+    """Solve every (table size, stack depth) and write the charts. Needs the preflop equity matrix."""
+    from equitymatrix import PREFLOP_EQUITY_PATH
+    equity_path = equity_path or PREFLOP_EQUITY_PATH
+    if not os.path.exists(equity_path):
+        raise FileNotFoundError(f"{equity_path} not found; build it with `python equitymatrix.py`")
+    workers = workers or os.cpu_count() or 1
+    seats, stacks = sorted(seats), sorted(stacks)
+    jobs = [(equity_path, n, s, iterations) for n in seats for s in stacks]
+    start = time.perf_counter()
+
+    pool = None
+    if workers > 1:
+        from multiprocessing import Pool
+        pool = Pool(workers)
+    try:
+        results = pool.map(_solve_job, jobs) if pool else [_solve_job(job) for job in jobs]
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    jam = np.zeros((len(seats), len(stacks), MAX_SEATS, NUM_COMBOS), dtype=np.uint8)
+    call = np.zeros((len(seats), len(stacks), MAX_SEATS, MAX_SEATS, NUM_COMBOS), dtype=np.uint8)
+    for (_, n, s, _), (jams, calls, exploit) in zip(jobs, results):
+        p, d = seats.index(n), stacks.index(s)
+        jam[p, d, :n - 1] = _quantize(jams)
+        call[p, d, :n, :n] = _quantize(calls)
+        _log.info("%d seats, %gbb: exploitability %.4f bb", n, s, exploit)
+    write_sections(out_path, {"seats": np.array(seats, dtype=np.int8), "stacks": np.array(stacks, dtype=np.float32),
+                              "jam": jam, "call": call.reshape(len(seats), len(stacks), -1, NUM_COMBOS)})
+    _log.info("Wrote %s: %d charts in %.1fs", out_path, len(jobs), time.perf_counter() - start)
+    return out_path
+
+
+# ==== Lookup ====
+class PushFoldCharts:
+    """Jam and call probabilities by table size, stack depth (nearest solved), seat and combo."""
+
+    def __init__(self, path: str = PUSHFOLD_PATH):
+        f = open_file(path)
+        self.path = path
+        self.seats = [int(n) for n in f["seats"]]
+        self.stacks = np.asarray(f["stacks"], dtype=np.float64)
+        self.jam = f["jam"]
+        self.call = f["call"]
+
+    @property
+    def max_stack(self) -> float:
+        return float(self.stacks[-1])
+
+    def _index(self, seats: int, stack: float) -> Optional[Tuple[int, int]]:
+        if seats not in self.seats:
+            return None
+        return self.seats.index(seats), int(np.abs(self.stacks - stack).argmin())
+
+    def jam_probability(self, seats: int, stack: float, seat: int, combo: int) -> Optional[float]:
+        index = self._index(seats, stack)
+        if index is None or not 0 <= seat < seats - 1:
+            return None
+        return float(self.jam[index + (seat, combo)]) / 255
+
+    def call_probability(self, seats: int, stack: float, jammer: int, seat: int, combo: int) -> Optional[float]:
+        index = self._index(seats, stack)
+        if index is None or not 0 <= jammer < seat < seats:
+            return None
+        return float(self.call[index + (jammer * MAX_SEATS + seat, combo)]) / 255
+
+    def class_chart(self, seats: int, stack: float) -> Dict[str, np.ndarray]:
+        """Per-class (169) jam chance of every seat and the big blind's call chance against each jammer."""
+        index = self._index(seats, stack)
+        if index is None:
+            raise ValueError(f"No charts for {seats} seats in {self.path}")
+        p, d = index
+        to_class = lambda combos: np.bincount(COMBO_CLASS, weights=combos / 255, minlength=NUM_CLASSES) / CLASS_SIZE
+        chart = {f"jam {seat}": to_class(self.jam[p, d, seat]) for seat in range(seats - 1)}
+        chart.update({f"BB call vs {seat}": to_class(self.call[p, d, seat * MAX_SEATS + seats - 1])
+                      for seat in range(seats - 1)})
+        return chart
+
+
+def load(path: str = PUSHFOLD_PATH) -> Optional[PushFoldCharts]:
+    return PushFoldCharts(path) if os.path.exists(path) else None
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Solve and inspect push/fold charts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    solve = sub.add_parser("build", help="solve a grid of table sizes and stack depths")
+    solve.add_argument("--seats", type=int, nargs="+", default=list(DEFAULT_SEATS))
+    solve.add_argument("--stacks", type=float, nargs="+", default=list(DEFAULT_STACKS))
+    solve.add_argument("--iterations", type=int, default=ITERATIONS)
+    solve.add_argument("--workers", type=int, default=os.cpu_count())
+    solve.add_argument("--equity", help="preflop equity matrix (default preflop_equity.bin)")
+    solve.add_argument("--out", default=PUSHFOLD_PATH)
+    show = sub.add_parser("show", help="print the hands each seat jams or calls with")
+    show.add_argument("--seats", type=int, default=MAX_SEATS)
+    show.add_argument("--stack", type=float, default=10)
+    show.add_argument("--path", default=PUSHFOLD_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build(args.seats, args.stacks, args.iterations, args.workers, args.equity, args.out)
+        print(f"Wrote {args.out}")
+        return
+    charts = PushFoldCharts(args.path)
+    for name, chance in charts.class_chart(args.seats, args.stack).items():
+        hands = CLASS_NAMES[np.argsort(-chance, kind="stable")][:np.count_nonzero(chance >= 0.5)]
+        share = float(chance @ CLASS_SIZE) / NUM_COMBOS
+        print(f"{name:<14} {share:6.1%}  {' '.join(hands)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Reproducible random number streams.
+
+All randomness in the engine comes from NumPy Generators over the counter-based Philox
+bit generator. A stream is named by a key path under one root seed:
+
+    stream("table", 3)             table 3; PokerGame splits it into deck, AI and simulator streams
+    stream("selfplay", worker)     one per worker process
+    stream("cfr", seed=0)          an explicit seed instead of the root seed
+
+The same root seed and key always give the same stream, whichever process asks first
+and in whatever order, so parallel self-play and sharded Monte Carlo replay bit for bit.
+Streams with different keys are statistically independent (SeedSequence spawn keys).
+split() hands out child streams: PokerGame gives its deck, AI and simulator one each, and
+the simulator draws every batch from a fresh child, so changing the number of simulations
+or the bet sizing leaves the cards dealt and the AI's other random draws unchanged.
+
+Code that is not given a Generator uses default(), the process-wide stream ("default",).
+The root seed comes from set_seed(), else the ACE_SEED environment variable, else fresh
+OS entropy; set_seed() also restarts default().
+"""
+import os
+import threading
+import zlib
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+SEED_ENV = "ACE_SEED"
+
+_lock = threading.RLock()
+_root: Optional[int] = None
+_default: Optional[np.random.Generator] = None
+
+
+def root_seed() -> int:
+    global _root
+    if _root is None:
+        with _lock:
+            if _root is None:
+                value = os.environ.get(SEED_ENV)
+                _root = int(value) if value else int(np.random.SeedSequence().entropy)
+    return _root
+
+
+def set_seed(seed: Optional[int]) -> None:
+    """Use `seed` as the root seed (None: fresh entropy) and restart the default stream."""
+    global _root, _default
+    with _lock:
+        _root = int(seed) if seed is not None else int(np.random.SeedSequence().entropy)
+        _default = None
+
+
+def _key(parts: Tuple[Union[int, str], ...]) -> Tuple[int, ...]:
+    # Names are hashed with CRC-32, which unlike hash() is the same in every process
+    return tuple(zlib.crc32(p.encode()) if isinstance(p, str) else int(p) for p in parts)
+
+
+def stream(*key: Union[int, str], seed: Optional[int] = None) -> np.random.Generator:
+    """The Philox stream for a key path under `seed`, by default the root seed."""
+    entropy = root_seed() if seed is None else int(seed)
+    return np.random.Generator(np.random.Philox(np.random.SeedSequence(entropy, spawn_key=_key(key))))
+
+
+def default() -> np.random.Generator:
+    global _default
+    if _default is None:
+        with _lock:
+            if _default is None:
+                _default = stream("default")
+    return _default
+
+
+def resolve(rng: Optional[np.random.Generator]) -> np.random.Generator:
+    """`rng`, or the default stream when it is None."""
+    return default() if rng is None else rng
+
+
+def split(rng: Optional[np.random.Generator], n: int) -> List[np.random.Generator]:
+    """`n` independent child streams of `rng`, e.g. one per shard of a simulation (NumPy 1.25+)."""
+    return resolve(rng).spawn(n)
@@ -0,0 +1,237 @@
+"""
+Hole-card ranges as weight vectors over the 1326 two-card combos.
+
+Combo i is the pair of card codes COMBOS[i] (cards.card_to_int, lower code first). A
+range is a float array of shape (1326,) holding each combo's weight, so narrowing,
+blending and card removal are plain array operations.
+
+RangeTracker keeps one such vector per opponent through a hand and narrows it with
+Bayes' rule after each of their actions: the weights are multiplied by the likelihood
+of the action for every combo under an assumed threshold strategy (strong hands raise,
+medium hands call, weak hands fold), with thresholds taken from the opponent's stats.
+
+Range wraps a weight vector for code that combines ranges, e.g. preflop all-in equity
+as a matrix-vector product (equitymatrix.py).
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cards import Card, card_to_int, flatten_cards, int_to_card
+from evaluator import evaluate_batch
+from handclass import COMBO_CLASS, COMBOS, NUM_COMBOS, PAIR_COMBO, class_index
+from randomness import resolve
+
+COMBO_MASK = np.zeros((NUM_COMBOS, 52), dtype=np.float64)
+COMBO_MASK[np.arange(NUM_COMBOS), COMBOS[:, 0]] = 1
+COMBO_MASK[np.arange(NUM_COMBOS), COMBOS[:, 1]] = 1
+COMBO_INDEX = {(int(a), int(b)): i for i, (a, b) in enumerate(COMBOS)}
+PREFLOP_CLASS = COMBO_CLASS
+
+
+def _chen_scores() -> np.ndarray:
+    """Chen formula score for each of the 169 classes, used to order hands from strongest."""
+    points = np.array([1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5, 6, 7, 8, 10])
+    row, col = np.divmod(np.arange(169), 13)
+    hi, lo = np.maximum(row, col), np.minimum(row, col)
+    pair, suited = row == col, row > col
+    gap = hi - lo - 1
+    score = points[hi] - np.select([gap <= 0, gap == 1, gap == 2, gap == 3], [0, 1, 2, 4], 5)
+    score = score + np.where(suited, 2, 0) + np.where(~pair & (gap <= 1) & (hi < 10), 1, 0)
+    return np.where(pair, np.maximum(points[hi] * 2, 5), score)
+
+
+CLASS_SCORE = _chen_scores()
+# Combos from strongest to weakest preflop
+COMBO_ORDER = np.argsort(-CLASS_SCORE[PREFLOP_CLASS], kind="stable")
+
+
+def hand_combo(hand: Sequence[Card]) -> int:
+    a, b = (card_to_int(c) for c in flatten_cards(hand))
+    return int(PAIR_COMBO[a, b])
+
+
+def full_range() -> np.ndarray:
+    return np.ones(NUM_COMBOS)
+
+
+def top_range(fraction: float) -> np.ndarray:
+    """The strongest `fraction` of all combos by preflop score, weight 1, everything else 0."""
+    weights = np.zeros(NUM_COMBOS)
+    count = int(round(min(max(fraction, 0.0), 1.0) * NUM_COMBOS))
+    weights[COMBO_ORDER[:max(count, 1)]] = 1.0
+    return weights
+
+
+def remove_dead(weights: np.ndarray, dead: Iterable[int]) -> np.ndarray:
+    """Zero every combo that uses one of the `dead` card codes."""
+    dead = list(dead)
+    if not dead:
+        return weights
+    return weights * (COMBO_MASK[:, dead].sum(axis=1) == 0)
+
+
+def sample_combos(weights: np.ndarray, dead: Iterable[int], n: int,
+                  rng: Optional[np.random.Generator] = None) -> Optional[List[List[Card]]]:
+    """
+    Draw `n` opponent hands from the range with dead cards removed, as Card pairs.
+    Returns None if no combo in the range is still possible.
+    """
+    live = remove_dead(weights, dead)
+    candidates = np.flatnonzero(live)
+    if not len(candidates):
+        return None
+    weights = live[candidates]
+    picks = resolve(rng).choice(candidates, size=n, p=weights / weights.sum())
+    return [[int_to_card(int(COMBOS[i, 0])), int_to_card(int(COMBOS[i, 1]))] for i in picks]
+
+
+class Range:
+    """A weight vector over the 1326 combos, with the constructors and operations ranges are built from."""
+
+    def __init__(self, weights: Optional[np.ndarray] = None):
+        self.weights = full_range() if weights is None else np.asarray(weights, dtype=np.float64)
+
+    @classmethod
+    def top(cls, fraction: float) -> "Range":
+        return cls(top_range(fraction))
+
+    @classmethod
+    def of_classes(cls, names: Iterable[str]) -> "Range":
+        """Every combo of the named classes, e.g. Range.of_classes(["AA", "AKs", "T9o"])."""
+        indices = [class_index(name) for name in names]
+        if -1 in indices:
+            raise ValueError(f"Unknown hand class in {list(names)}")
+        return cls(np.isin(COMBO_CLASS, indices).astype(np.float64))
+
+    @classmethod
+    def of_hand(cls, hand: Sequence[Card]) -> "Range":
+        weights = np.zeros(NUM_COMBOS)
+        weights[hand_combo(hand)] = 1.0
+        return cls(weights)
+
+    def without(self, dead: Iterable[int]) -> "Range":
+        return Range(remove_dead(self.weights, dead))
+
+    def normalized(self) -> "Range":
+        total = self.weights.sum()
+        return Range(self.weights / total if total > 0 else self.weights)
+
+    @property
+    def size(self) -> float:
+        """Total weight, the number of combos for a 0/1 range."""
+        return float(self.weights.sum())
+
+    def fraction(self) -> float:
+        return self.size / NUM_COMBOS
+
+    def __add__(self, other: "Range") -> "Range":
+        return Range(self.weights + other.weights)
+
+    def __mul__(self, other) -> "Range":
+        return Range(self.weights * (other.weights if isinstance(other, Range) else other))
+
+    def equity_vs(self, other: "Range", matrix=None) -> float:
+        """Preflop all-in equity of this range against `other`, from the shared equity matrix by default."""
+        if matrix is None:
+            from resources import RESOURCES
+            matrix = RESOURCES.preflop_equity()
+            if matrix is None:
+                raise FileNotFoundError("No preflop equity matrix; build it with `python equitymatrix.py`")
+        return matrix.range_vs_range(self.weights, other.weights)
+
+
+def strength_percentiles(scores: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Percentile (0-1) of every combo's score among the valid combos; ties share the midpoint."""
+    ordered = np.sort(scores[valid])
+    lower = np.searchsorted(ordered, scores, side="left")
+    upper = np.searchsorted(ordered, scores, side="right")
+    return (lower + upper) / 2 / max(len(ordered), 1)
+
+
+PREFLOP_STRENGTH = strength_percentiles(CLASS_SCORE[PREFLOP_CLASS], np.ones(NUM_COMBOS, dtype=bool))
+
+
+@lru_cache(maxsize=64)
+def _board_strength(board: Tuple[int, ...]) -> np.ndarray:
+    valid = remove_dead(full_range(), board) > 0
+    scores = np.full(NUM_COMBOS, -1, dtype=np.int64)
+    scores[valid] = evaluate_batch(COMBOS[valid], board)
+    strength = strength_percentiles(scores, valid)
+    strength.setflags(write=False)
+    return strength
+
+
+def combo_strength(board: Sequence[int] = ()) -> np.ndarray:
+    """Strength percentile of every combo: preflop by class, postflop by made hand on the board."""
+    if len(board) < 3:
+        return PREFLOP_STRENGTH
+    return _board_strength(tuple(sorted(int(c) for c in board)))
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class RangeTracker:
+    FLOOR = 0.02          # every action keeps some weight on every combo (bluffs, mistakes)
+    TEMPERATURE = 0.05    # softness of the strategy thresholds, in percentile units
+    POSTFLOP_FOLD = 0.35
+
+    def __init__(self, stats=None):
+        self.stats = stats    # opponents.OpponentStats, or None for population defaults
+        self.weights: Dict[str, np.ndarray] = {}
+
+    def new_hand(self, player_ids: Iterable[str]) -> None:
+        self.weights = {player_id: full_range() for player_id in player_ids}
+
+    def thresholds(self, player_id: str, street: int) -> Tuple[float, float]:
+        """(fold below, raise above) strength percentiles assumed for this player."""
+        if street == 0:
+            vpip = self.stats.vpip(player_id) if self.stats else 0.25
+            pfr = self.stats.pfr(player_id) if self.stats else 0.15
+            return 1.0 - vpip, 1.0 - pfr
+        af = self.stats.aggression_factor(player_id) if self.stats else 1.5
+        return self.POSTFLOP_FOLD, 1.0 - 0.5 * af / (1.0 + af)
+
+    def likelihood(self, player_id: str, street: int, action: str, strength: np.ndarray) -> np.ndarray:
+        fold_at, raise_at = self.thresholds(player_id, street)
+        p_raise = _sigmoid((strength - raise_at) / self.TEMPERATURE)
+        p_continue = _sigmoid((strength - fold_at) / self.TEMPERATURE)
+        if action in ("raise", "bet", "all-in"):
+            p = p_raise
+        elif action == "call":
+            p = np.maximum(p_continue - p_raise, 0.0)
+        elif action == "fold":
+            p = 1.0 - p_continue
+        else:  # check: anything that did not bet
+            p = 1.0 - p_raise
+        return np.maximum(p, self.FLOOR)
+
+    def observe(self, player_id: str, street: int, action: str, board: Sequence[int] = ()) -> None:
+        weights = self.weights.get(player_id)
+        if weights is None:
+            weights = self.weights[player_id] = full_range()
+        weights *= self.likelihood(player_id, street, action, combo_strength(board))
+        total = weights.sum()
+        if total > 0:
+            weights *= NUM_COMBOS / total
+
+    def range_of(self, player_id: str) -> np.ndarray:
+        """A copy of the player's weights, safe to hand to another thread while observe() updates them."""
+        weights = self.weights.get(player_id)
+        return full_range() if weights is None else weights.copy()
+
+    def strongest(self, player_ids: Iterable[str], board: Sequence[int] = ()) -> Optional[str]:
+        """The opponent whose range has the highest expected strength on this board."""
+        strength = combo_strength(board)
+        best, best_value = None, -1.0
+        for player_id in player_ids:
+            weights = self.weights.get(player_id)
+            if weights is None:
+                weights = full_range()
+            value = float(weights @ strength / max(weights.sum(), 1e-12))
+            if value > best_value:
+                best, best_value = player_id, value
+        return best
@@ -0,0 +1,201 @@
+"""
+Hand replay and what-if analysis over the hand-history store (handrecord.HandStore).
+
+A HandReplay rebuilds a stored hand from its seat and action rows and steps through it
+one action at a time. For every decision it recomputes the actor's equity, the EV of
+folding, calling and raising, and the AI's recommended action. The equities for all
+decisions in a hand come from a single montecarlo.batch_win_rates call, so a whole
+session can be reviewed interactively. EVs are analytics.decision_evs on the hand's
+actions, so a replay scores calls and raises the way the session reports do.
+
+    python replay.py                     # last hand in hand_history.bin
+    python replay.py hand_history.bin 12
+"""
+import sys
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from actionhistory import decode_action
+from analytics import decision_evs, hand_view
+from cards import RANKS
+from handrecord import HAND_STORE_PATH, NO_CARD, HandStore
+from montecarlo import batch_win_rates
+from tablestate import STREETS
+
+BOARD_SIZES = (0, 3, 4, 5, 5)
+ALTERNATIVES = ("fold", "call", "raise")
+
+
+@dataclass
+class TableView:
+    """Table state just before an action."""
+    stacks: List[int]
+    contributed: List[int]
+    active: List[bool]
+    pot: int
+    board: List[int]
+
+
+@dataclass
+class ReplayStep:
+    index: int
+    street: int
+    seat: int
+    player: str
+    position: str
+    action: str
+    amount: int
+    chips: int
+    pot: int
+    to_call: int
+    stack: int
+    hole: List[int]
+    board: List[int]
+    equity: float = 0.0
+    ev: Dict[str, float] = field(default_factory=dict)
+    recommended: Tuple[str, int] = ("", 0)
+
+    @property
+    def best(self) -> str:
+        return max(self.ev, key=self.ev.get) if self.ev else ""
+
+    @property
+    def ev_loss(self) -> float:
+        """EV given up versus the best alternative (0 when the actual action was best)."""
+        if not self.ev:
+            return 0.0
+        actual = "call" if self.action == "check" else "raise" if self.action == "all-in" else self.action
+        return max(self.ev.values()) - self.ev.get(actual, 0.0)
+
+
+class HandReplay:
+    def __init__(self, store: HandStore, hand: int = -1, ai=None, num_simulations: int = 1000,
+                 rng: Optional[np.random.Generator] = None, analyse: bool = True):
+        self.store = store
+        self.hand = hand % len(store)
+        self.ai = ai
+        seats = store.hand_seats(self.hand)
+        self.names = [store.strings[i] for i in store.seats["player"][seats]]
+        self.positions = [store.strings[i] for i in store.seats["position"][seats]]
+        self.holes = [[int(c) for c in hole if c != NO_CARD] for hole in store.seats["hole"][seats]]
+        self.start_stacks = store.seats["stack"][seats].tolist()
+        self.blinds = store.seats["blind"][seats].tolist()
+        self.won = store.seats["won"][seats].tolist()
+        self.board = [int(c) for c in store.hands["board"][self.hand] if c != NO_CARD]
+        self.big_blind = int(store.hands["big_blind"][self.hand])
+        self.steps = self._build_steps()
+        if analyse:
+            self.analyse(num_simulations, rng)
+
+    def _build_steps(self) -> List[ReplayStep]:
+        actions = self.store.actions
+        rows = self.store.hand_actions(self.hand)
+        steps = []
+        stacks = [s - b for s, b in zip(self.start_stacks, self.blinds)]
+        for i, (seat, street, code, amount, chips, pot, to_call) in enumerate(zip(
+                actions["seat"][rows], actions["street"][rows], actions["code"][rows], actions["amount"][rows],
+                actions["chips"][rows], actions["pot"][rows], actions["to_call"][rows])):
+            seat, street = int(seat), int(street)
+            steps.append(ReplayStep(
+                index=i, street=street, seat=seat, player=self.names[seat], position=self.positions[seat],
+                action=decode_action(int(code))[0], amount=int(amount), chips=int(chips), pot=int(pot),
+                to_call=int(to_call), stack=stacks[seat], hole=self.holes[seat],
+                board=self.board[:BOARD_SIZES[min(street, 4)]],
+            ))
+            stacks[seat] -= int(chips)
+        return steps
+
+    def analyse(self, num_simulations: int = 1000, rng: Optional[np.random.Generator] = None) -> None:
+        """Fill in equity, EV per alternative and the AI's recommendation for every step."""
+        steps = [s for s in self.steps if len(s.hole) == 2]
+        if not steps:
+            return
+        equities = batch_win_rates([s.hole for s in steps], [s.board for s in steps], num_simulations, rng=rng)
+        for step, equity in zip(steps, equities):
+            step.equity = float(equity)
+        evs = self._evs()
+        for step in steps:
+            step.ev = dict(zip(ALTERNATIVES, evs[step.index].tolist()))
+            step.recommended = self.recommend(step)
+
+    def alternatives(self, step: ReplayStep, raise_to: Optional[int] = None) -> Dict[str, float]:
+        """EV of folding, calling/checking and raising (best size, or to `raise_to`) at this step, given its equity."""
+        amounts = None if raise_to is None else np.full(len(self.steps), raise_to)
+        return dict(zip(ALTERNATIVES, self._evs(amounts)[step.index].tolist()))
+
+    def _evs(self, raise_to: Optional[np.ndarray] = None) -> np.ndarray:
+        equity = np.array([s.equity if len(s.hole) == 2 else np.nan for s in self.steps])
+        return decision_evs(hand_view(self.store, self.hand, equity), raise_to)
+
+    def what_if(self, index: int, action: str, amount: Optional[int] = None) -> float:
+        """EV of taking `action` (fold/call/raise, optionally raising to `amount`) at step `index`."""
+        step = self.steps[index]
+        return self.alternatives(step, raise_to=amount)["call" if action == "check" else action]
+
+    def recommend(self, step: ReplayStep) -> Tuple[str, int]:
+        if self.ai is None:
+            from ai import PokerAI
+            self.ai = PokerAI()
+        game = SimpleNamespace(pot=step.pot, current_bet=step.to_call, current_stage=STREETS[min(step.street, 3)])
+        player = SimpleNamespace(chips=step.stack)
+        return self.ai.threshold_decision(game, player, step.position, step.equity)
+
+    def state_at(self, index: int) -> TableView:
+        """Replay the blinds and the first `index` actions."""
+        contributed = list(self.blinds)
+        stacks = [s - b for s, b in zip(self.start_stacks, self.blinds)]
+        active = [True] * len(stacks)
+        pot = sum(contributed)
+        street = 0
+        for step in self.steps[:index]:
+            stacks[step.seat] -= step.chips
+            contributed[step.seat] += step.chips
+            pot += step.chips
+            street = step.street
+            if step.action == "fold":
+                active[step.seat] = False
+        if index < len(self.steps):
+            street = self.steps[index].street
+        return TableView(stacks, contributed, active, pot, self.board[:BOARD_SIZES[min(street, 4)]])
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def __getitem__(self, index: int) -> ReplayStep:
+        return self.steps[index]
+
+    def summary(self) -> str:
+        cards = lambda codes: " ".join(RANKS[c // 4] + "hdcs"[c % 4] for c in codes)
+        lines = [f"Hand {self.hand}  board: {cards(self.board) or '-'}"]
+        for name, position, hole, won in zip(self.names, self.positions, self.holes, self.won):
+            lines.append(f"  {position:<4} {name:<12} {cards(hole):<10} won {won}")
+        for s in self.steps:
+            ev = " ".join(f"{a}={v:+.1f}" for a, v in s.ev.items())
+            lines.append(f"{s.index:>3} {STREETS[min(s.street, 4)]:<8} {s.position:<4} {s.action:<6} {s.chips:>5}"
+                         f"  pot {s.pot:>5}  eq {s.equity:.2f}  {ev}  ai: {s.recommended[0]}  best: {s.best}")
+        return "\n".join(lines)
+
+
+def replay_session(store: HandStore, hands: Optional[List[int]] = None, **kwargs) -> List[HandReplay]:
+    return [HandReplay(store, hand, **kwargs) for hand in (range(len(store)) if hands is None else hands)]
+
+
+def main(argv=None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else HAND_STORE_PATH
+    store = HandStore.load(path)
+    if not len(store):
+        print(f"{path} has no hands")
+        return
+    hand = int(argv[1]) if len(argv) > 1 else -1
+    print(HandReplay(store, hand).summary())
+
+
+if __name__ == "__main__":
+    main()
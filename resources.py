@@ -0,0 +1,153 @@
+"""
+Process-wide registry of read-only resources shared by every PokerAI and simulator.
+
+The ML model, GTO tables, CFR strategy, card abstractions, preflop equity matrix and
+push/fold charts are loaded once per process on first use and handed out as shared
+objects, so extra seats, tables and self-play games cost nothing at startup. The model file is watched: when ml/model.pkl changes on disk the
+next model() call loads it and swaps it in for every AI at once
+(reload_model() does the same on demand).
+
+    from resources import RESOURCES
+    model = RESOURCES.model()        # None when no model has been trained
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from logger import get_logger
+
+_log = get_logger("resources")
+
+MODEL_PATH = "ml/model.pkl"
+RELOAD_CHECK_S = 2.0
+_UNSET = object()
+
+
+class Resources:
+    def __init__(self, model_path: str = MODEL_PATH, auto_reload: bool = True):
+        self.model_path = model_path
+        self.auto_reload = auto_reload
+        self._lock = threading.RLock()
+        self._model = _UNSET
+        self._model_mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._gto = None
+        self._strategy = _UNSET
+        self._abstractions: Dict[str, object] = {}
+        self._preflop_equity = _UNSET
+        self._pushfold = _UNSET
+
+    # ==== ML model ====
+    def model(self):
+        """The current model, or None if there is none. Picks up a changed model file."""
+        if self._model is _UNSET:
+            with self._lock:
+                if self._model is _UNSET:
+                    self._model = self._load_model(self.model_path)
+        elif self.auto_reload and time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + RELOAD_CHECK_S
+            if self._mtime(self.model_path) != self._model_mtime:
+                self.reload_model()
+        return self._model
+
+    def reload_model(self, path: Optional[str] = None) -> bool:
+        """Load a model and swap it in; the old one stays in place if loading fails."""
+        with self._lock:
+            if path is not None:
+                self.model_path = path
+            mtime = self._mtime(self.model_path)
+            try:
+                model = self._load_model(self.model_path, quiet=False)
+            except Exception:
+                _log.exception("Could not reload model from %s, keeping the current one", self.model_path)
+                self._model_mtime = mtime
+                return False
+            self._model = model
+            _log.info("Reloaded model from %s", self.model_path)
+            return model is not None
+
+    def _load_model(self, path: str, quiet: bool = True):
+        from ml.trainer import load_model
+        self._model_mtime = self._mtime(path)
+        self._next_check = time.monotonic() + RELOAD_CHECK_S
+        if self._model_mtime is None:
+            _log.info("ML model not found, using rule-based strategy")
+            return None
+        try:
+            return load_model(path)
+        except Exception:
+            if not quiet:
+                raise
+            _log.exception("Could not load model from %s, using rule-based strategy", path)
+            return None
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    # ==== Tables ====
+    def gto(self, default: Optional[Callable[[], Dict]] = None):
+        """GTOData for the preflop strengths and board textures (see strategyfile.load_gto)."""
+        if self._gto is None:
+            with self._lock:
+                if self._gto is None:
+                    from strategyfile import load_gto
+                    self._gto = load_gto(default=default)
+        return self._gto
+
+    def strategy(self):
+        """The solved CFR StrategyTable, or None when cfr_strategy.bin does not exist."""
+        if self._strategy is _UNSET:
+            with self._lock:
+                if self._strategy is _UNSET:
+                    import cfr
+                    self._strategy = None
+                    if os.path.exists(cfr.DEFAULT_STRATEGY_PATH):
+                        self._strategy = cfr.StrategyTable.load(cfr.DEFAULT_STRATEGY_PATH)
+                        _log.info("Loaded CFR strategy from %s", cfr.DEFAULT_STRATEGY_PATH)
+        return self._strategy
+
+    def abstraction(self, street: str):
+        """The card-abstraction BucketTable for a postflop street, or None when it has not been built."""
+        if street not in self._abstractions:
+            with self._lock:
+                if street not in self._abstractions:
+                    import abstraction
+                    self._abstractions[street] = abstraction.load(street)
+        return self._abstractions[street]
+
+    def preflop_equity(self):
+        """The preflop all-in EquityMatrix, or None when preflop_equity.bin has not been built."""
+        if self._preflop_equity is _UNSET:
+            with self._lock:
+                if self._preflop_equity is _UNSET:
+                    import equitymatrix
+                    self._preflop_equity = equitymatrix.load()
+        return self._preflop_equity
+
+    def pushfold(self):
+        """The short-stack PushFoldCharts, or None when pushfold.bin has not been built."""
+        if self._pushfold is _UNSET:
+            with self._lock:
+                if self._pushfold is _UNSET:
+                    import pushfold
+                    self._pushfold = pushfold.load()
+        return self._pushfold
+
+    def clear(self) -> None:
+        """Forget everything loaded so far; the next access loads again."""
+        with self._lock:
+            self._model = _UNSET
+            self._model_mtime = None
+            self._gto = None
+            self._strategy = _UNSET
+            self._abstractions = {}
+            self._preflop_equity = _UNSET
+            self._pushfold = _UNSET
+
+
+RESOURCES = Resources()
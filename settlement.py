@@ -0,0 +1,99 @@
+"""
+Pot settlement: builds the main pot and side pots from what each seat put in,
+ranks every live hand with full kickers in one batch, and pays each pot out
+including odd chips.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cards import Card, card_to_int, flatten_cards
+from evaluator import evaluate_codes
+
+
+@dataclass
+class Pot:
+    amount: int
+    eligible: List[int]
+    winners: List[int] = field(default_factory=list)
+
+
+def build_pots(contributions: Sequence[int], folded: Sequence[bool], dead_money: int = 0) -> List[Pot]:
+    """
+    Split contributions into a main pot and side pots. Each pot is capped at a contribution
+    level; only seats that are still in and put in at least that level are eligible.
+    Chips that nobody still in could win (a folded seat's overbet) go to the pot below.
+    Dead money not attributed to any seat (e.g. antes) is added to the main pot.
+    """
+    levels = sorted({c for c in contributions if c > 0})
+    pots: List[Pot] = []
+    previous = 0
+    for level in levels:
+        amount = sum(min(c, level) - min(c, previous) for c in contributions)
+        eligible = [seat for seat, c in enumerate(contributions) if c >= level and not folded[seat]]
+        if not eligible and pots:
+            pots[-1].amount += amount
+        elif pots and pots[-1].eligible == eligible:
+            pots[-1].amount += amount
+        else:
+            pots.append(Pot(amount=amount, eligible=eligible))
+        previous = level
+    if dead_money:
+        if pots:
+            pots[0].amount += dead_money
+        else:
+            pots.append(Pot(amount=dead_money, eligible=[s for s in range(len(contributions)) if not folded[s]]))
+    if pots and not pots[0].eligible:
+        # Only possible when every contributor folded; keep the chips in play for whoever is left
+        pots[0].eligible = [s for s in range(len(contributions)) if not folded[s]]
+    return pots
+
+
+def showdown_scores(hands: Sequence[Sequence[Card]], board: Sequence[Card], live: Sequence[bool]) -> np.ndarray:
+    """Full-kicker scores for every live seat, computed in a single evaluator call; folded seats score -1."""
+    scores = np.full(len(hands), -1, dtype=np.int64)
+    seats = [i for i, alive in enumerate(live) if alive and len(flatten_cards(hands[i])) == 2]
+    if not seats:
+        return scores
+    board_codes = [card_to_int(c) for c in flatten_cards(board)]
+    if len(board_codes) + 2 < 5:
+        # No showdown before the board is out; everyone still in ties
+        scores[seats] = 0
+        return scores
+    codes = np.array([[card_to_int(c) for c in flatten_cards(hands[i])] + board_codes for i in seats])
+    scores[seats] = evaluate_codes(codes)
+    return scores
+
+
+def settle(contributions: Sequence[int], folded: Sequence[bool], scores: Sequence[int],
+           button: int = 0, dead_money: int = 0) -> Tuple[List[int], List[Pot]]:
+    """
+    Return the chips won by each seat and the pots they came from. Tied winners split a pot
+    evenly; leftover odd chips go one at a time to the tied winners in seat order, starting
+    left of the button.
+    """
+    n = len(contributions)
+    payouts = [0] * n
+    pots = build_pots(contributions, folded, dead_money)
+    for pot in pots:
+        if not pot.eligible:
+            continue
+        best = max(scores[seat] for seat in pot.eligible)
+        pot.winners = sorted((seat for seat in pot.eligible if scores[seat] == best),
+                             key=lambda seat: (seat - button - 1) % n)
+        share, odd = divmod(pot.amount, len(pot.winners))
+        for i, seat in enumerate(pot.winners):
+            payouts[seat] += share + (1 if i < odd else 0)
+    return payouts, pots
+
+
+def settle_players(players, community_cards: Sequence[Card], pot_total: Optional[int] = None,
+                   button: int = 0) -> Tuple[Dict[object, int], List[Pot]]:
+    """Settle a hand for Player objects (game.Player); returns {player: chips won} and the pots."""
+    contributions = [p.contributed for p in players]
+    folded = [not p.is_active for p in players]
+    dead = max(0, (pot_total or 0) - sum(contributions))
+    scores = showdown_scores([p.hand for p in players], community_cards, [not f for f in folded])
+    payouts, pots = settle(contributions, folded, scores, button=button, dead_money=dead)
+    return {p: won for p, won in zip(players, payouts) if won}, pots
@@ -0,0 +1,222 @@
+"""
+Versioned binary container for GTO tables and solved strategies.
+
+Layout (little endian):
+
+    header    8s magic b"ACESTRT\\0", u16 version, u16 reserved, u32 section count
+    entries   one per section: 16s name, 16s NumPy dtype string, u8 ndim, 4 x u64 shape, u64 offset
+    data      each section's raw array, starting on a 64-byte boundary
+
+Files are opened with np.memmap and every section is a read-only view into the
+mapping, so loading is instant and processes opening the same file share its pages.
+open_file() keeps one mapping per path per process.
+
+Sections written by this module:
+
+    positions       S8 (P,)      position names, e.g. UTG ... BB
+    hand_strength   f4 (169,)    preflop strength per hand class, NaN when unknown
+    texture_names   S16 (T,)     board texture names
+    board_texture   f4 (T,)      postflop texture factors
+    strategy_seats  S8 (S,)      seat names used by the strategy nodes, e.g. SB, BB
+    node_history    S (N,)       action history key of each strategy node (actionhistory)
+    node_position   i1 (N,)      index into strategy_seats of the player to act
+    node_street     i1 (N,)
+    node_actions    S (N,)       action codes available at the node
+    node_offset     i4 (N,)      first row of the node in probs; row = offset + hand bucket
+    probs           f2 (R, A)    action probabilities
+
+    python strategyfile.py convert gto_data.json gto_data.bin [--strategy cfr_strategy.bin]
+    python strategyfile.py info gto_data.bin
+"""
+import argparse
+import json
+import os
+import struct
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from handclass import class_index, pair_table
+from logger import get_logger
+
+_log = get_logger("strategyfile")
+
+MAGIC = b"ACESTRT\0"
+VERSION = 1
+ALIGN = 64
+HEADER = struct.Struct("<8sHHI")
+ENTRY = struct.Struct("<16s16sB4QQ")
+MAX_DIMS = 4
+
+GTO_PATH = "gto_data.bin"
+GTO_JSON_PATH = "gto_data.json"
+TEXTURES = ("paired", "monotone", "connected", "rainbow")
+STRATEGY_SECTIONS = ("strategy_seats", "node_history", "node_position", "node_street", "node_actions", "node_offset", "probs")
+
+
+class StrategyFileError(ValueError):
+    pass
+
+
+def write_sections(path: str, sections: Dict[str, np.ndarray]) -> None:
+    """Write arrays to `path` atomically; names are at most 16 bytes."""
+    arrays = {name: np.ascontiguousarray(a) for name, a in sections.items()}
+    offset = _align(HEADER.size + ENTRY.size * len(arrays))
+    entries = []
+    for name, a in arrays.items():
+        if a.ndim > MAX_DIMS or a.dtype.hasobject:
+            raise StrategyFileError(f"Section {name} cannot be stored ({a.dtype}, {a.ndim} dims)")
+        shape = tuple(a.shape) + (0,) * (MAX_DIMS - a.ndim)
+        entries.append(ENTRY.pack(name.encode(), a.dtype.str.encode(), a.ndim, *shape, offset))
+        offset = _align(offset + a.nbytes)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(arrays)))
+        for entry in entries:
+            f.write(entry)
+        for a in arrays.values():
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(a.tobytes())
+    os.replace(tmp, path)
+    open_file.cache_clear()
+
+
+def _align(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+class StrategyFile:
+    """Read-only, memory-mapped view of a file written by write_sections."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, self.version, _, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise StrategyFileError(f"{path} is not a strategy file")
+        if self.version > VERSION:
+            raise StrategyFileError(f"{path} has version {self.version}, newest supported is {VERSION}")
+        self.sections: Dict[str, np.ndarray] = {}
+        for i in range(count):
+            name, dtype, ndim, *rest = ENTRY.unpack_from(self._map, HEADER.size + i * ENTRY.size)
+            shape, offset = tuple(rest[:ndim]), rest[MAX_DIMS]
+            dtype = np.dtype(dtype.rstrip(b"\0").decode())
+            size = int(np.prod(shape, dtype=np.int64))
+            array = np.frombuffer(self._map, dtype=dtype, count=size, offset=offset).reshape(shape)
+            self.sections[name.rstrip(b"\0").decode()] = array
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sections
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.sections[name]
+
+
+@lru_cache(maxsize=None)
+def open_file(path: str) -> StrategyFile:
+    return StrategyFile(path)
+
+
+# ==== GTO tables ====
+def gto_sections(data: Dict) -> Dict[str, np.ndarray]:
+    """Convert the gto_data.json structure to sections."""
+    strengths = np.full(169, np.nan, dtype=np.float32)
+    for key, value in data["preflop"]["hand_strengths"].items():
+        index = class_index(key)
+        if index < 0:
+            _log.warning("Skipping unknown hand class %r", key)
+            continue
+        strengths[index] = value
+    textures = data["postflop"]["board_textures"]
+    return {
+        "positions": np.array(data["preflop"]["positions"], dtype="S8"),
+        "hand_strength": strengths,
+        "texture_names": np.array(TEXTURES, dtype="S16"),
+        "board_texture": np.array([textures.get(name, 0.0) for name in TEXTURES], dtype=np.float32),
+    }
+
+
+def convert_json(json_path: str = GTO_JSON_PATH, out_path: str = GTO_PATH,
+                 strategy_path: Optional[str] = None) -> None:
+    with open(json_path, "r") as f:
+        sections = gto_sections(json.load(f))
+    if strategy_path:
+        strategy = open_file(strategy_path)
+        sections.update({name: np.array(strategy[name]) for name in STRATEGY_SECTIONS})
+    write_sections(out_path, sections)
+
+
+class GTOData:
+    """Preflop strengths and board textures, backed by a strategy file or in-memory sections."""
+
+    def __init__(self, sections):
+        self.sections = sections
+        self.positions: List[str] = [p.decode() for p in sections["positions"]]
+        self._strength = sections["hand_strength"]
+        self._textures = {name.decode(): float(v) for name, v in
+                          zip(sections["texture_names"], sections["board_texture"])}
+
+    def position_index(self, position: str) -> int:
+        return self.positions.index(position)
+
+    def strength_table(self, default: float = 0.5) -> np.ndarray:
+        """Preflop strength indexed by two card codes, [a, b] in either order (see handclass)."""
+        return pair_table(np.asarray(self._strength, dtype=np.float64), default)
+
+    def hand_strength(self, key: str, default: float = 0.5) -> float:
+        index = class_index(key)
+        if index < 0 or np.isnan(self._strength[index]):
+            return default
+        return float(self._strength[index])
+
+    def board_texture(self, name: str) -> float:
+        return self._textures[name]
+
+
+def load_gto(path: str = GTO_PATH, json_path: str = GTO_JSON_PATH,
+             default: Optional[Callable[[], Dict]] = None) -> GTOData:
+    """
+    Open the binary tables, converting the JSON file once if only that exists. Falls back
+    to `default()` (the JSON structure) when neither file is available.
+    """
+    if not os.path.exists(path) and os.path.exists(json_path):
+        try:
+            convert_json(json_path, path)
+            _log.info("Converted %s to %s", json_path, path)
+        except OSError:
+            _log.warning("Could not write %s, reading %s directly", path, json_path)
+            with open(json_path, "r") as f:
+                return GTOData(gto_sections(json.load(f)))
+    if os.path.exists(path):
+        return GTOData(open_file(path))
+    if default is None:
+        raise FileNotFoundError(path)
+    _log.warning("GTO data file not found, using default values")
+    return GTOData(gto_sections(default()))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Convert and inspect strategy files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="convert gto_data.json to the binary format")
+    convert.add_argument("json_path", nargs="?", default=GTO_JSON_PATH)
+    convert.add_argument("out_path", nargs="?", default=GTO_PATH)
+    convert.add_argument("--strategy", help="also embed a solved strategy file (cfr.py output)")
+    info = sub.add_parser("info", help="list the sections of a file")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        convert_json(args.json_path, args.out_path, args.strategy)
+        print(f"Wrote {args.out_path}")
+    else:
+        f = open_file(args.path)
+        print(f"{args.path}: version {f.version}")
+        for name, a in f.sections.items():
+            print(f"  {name:<16} {a.dtype.str:<6} {str(a.shape):<16} {a.nbytes:>10} bytes")
+
+
+if __name__ == "__main__":
+    main()
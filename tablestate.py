@@ -0,0 +1,151 @@
+"""
+Struct-of-arrays state for many tables at once.
+
+Every field is a NumPy array with the table as the leading axis, so a batch of
+thousands of tables is a handful of small contiguous arrays (roughly 200 bytes per
+9-seat table). clone() is a few array copies, which makes it cheap to branch a table
+for search or rollouts, and reset() deals the next hand in place without allocating.
+Cards are integer codes (cards.card_to_int).
+"""
+from typing import List, Optional
+
+import numpy as np
+
+from cards import Card, card_to_int, flatten_cards, int_to_card
+from randomness import resolve
+
+STREETS = ["preflop", "flop", "turn", "river", "showdown"]
+NO_CARD = -1
+
+
+class TableState:
+    FIELDS = ("stacks", "contributions", "street_bets", "active", "hole", "board", "board_count",
+              "deck", "deck_pos", "pot", "current_bet", "button", "street")
+
+    def __init__(self, num_tables: int = 1, num_seats: int = 9, stack: int = 1000,
+                 small_blind: int = 10, big_blind: int = 20, rng: Optional[np.random.Generator] = None):
+        self.num_tables = num_tables
+        self.num_seats = num_seats
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.rng = resolve(rng)
+
+        shape = (num_tables, num_seats)
+        self.stacks = np.full(shape, stack, dtype=np.int32)
+        self.contributions = np.zeros(shape, dtype=np.int32)  # whole hand, for side pots
+        self.street_bets = np.zeros(shape, dtype=np.int32)    # current street only
+        self.active = np.zeros(shape, dtype=bool)
+        self.hole = np.full(shape + (2,), NO_CARD, dtype=np.int8)
+        self.board = np.full((num_tables, 5), NO_CARD, dtype=np.int8)
+        self.board_count = np.zeros(num_tables, dtype=np.int8)
+        self.deck = np.zeros((num_tables, 52), dtype=np.int8)
+        self.deck_pos = np.zeros(num_tables, dtype=np.int8)
+        self.pot = np.zeros(num_tables, dtype=np.int32)
+        self.current_bet = np.zeros(num_tables, dtype=np.int32)
+        self.button = np.zeros(num_tables, dtype=np.int8)
+        self.street = np.zeros(num_tables, dtype=np.int8)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.FIELDS)
+
+    def clone(self) -> "TableState":
+        other = TableState.__new__(TableState)
+        other.__dict__.update(self.__dict__)
+        for name in self.FIELDS:
+            setattr(other, name, getattr(self, name).copy())
+        return other
+
+    def copy_from(self, other: "TableState") -> None:
+        """Overwrite this state with `other` without reallocating (shapes must match)."""
+        for name in self.FIELDS:
+            np.copyto(getattr(self, name), getattr(other, name))
+
+    def reset(self, advance_button: bool = True) -> None:
+        """Start the next hand on every table in place: shuffle, deal hole cards, post blinds."""
+        t, s = self.num_tables, self.num_seats
+        if advance_button:
+            self.button[:] = (self.button.astype(np.int64) + 1) % s
+        self.deck[:] = np.argsort(self.rng.random((t, 52)), axis=1)
+        self.contributions[:] = 0
+        self.street_bets[:] = 0
+        self.active[:] = self.stacks > 0
+        self.board[:] = NO_CARD
+        self.board_count[:] = 0
+        self.pot[:] = 0
+        self.current_bet[:] = 0
+        self.street[:] = 0
+
+        # Hole cards go round the table twice, as dealt from the top of the deck
+        dealt = self.deck[:, :2 * s].reshape(t, 2, s).transpose(0, 2, 1)
+        self.hole[:] = np.where(self.active[:, :, None], dealt, NO_CARD)
+        self.deck_pos[:] = 2 * s
+
+        rows = np.arange(t)
+        sb = (self.button.astype(np.int64) + 1) % s
+        bb = (self.button.astype(np.int64) + 2) % s
+        self._post(rows, sb, self.small_blind)
+        self._post(rows, bb, self.big_blind)
+        self.current_bet[:] = self.street_bets.max(axis=1)
+
+    def _post(self, rows: np.ndarray, seats: np.ndarray, amount: int) -> None:
+        paid = np.minimum(self.stacks[rows, seats], amount) * self.active[rows, seats]
+        self.stacks[rows, seats] -= paid
+        self.contributions[rows, seats] += paid
+        self.street_bets[rows, seats] += paid
+        self.pot[rows] += paid
+
+    def bet(self, table: int, seat: int, amount: int) -> int:
+        amount = int(min(amount, self.stacks[table, seat]))
+        self.stacks[table, seat] -= amount
+        self.contributions[table, seat] += amount
+        self.street_bets[table, seat] += amount
+        self.pot[table] += amount
+        self.current_bet[table] = max(self.current_bet[table], self.street_bets[table, seat])
+        return amount
+
+    def fold(self, table: int, seat: int) -> None:
+        self.active[table, seat] = False
+
+    def next_street(self) -> None:
+        """Advance every table one street, dealing 3/1/1 board cards from each table's deck."""
+        counts = np.array([3, 1, 1, 0, 0], dtype=np.int64)[self.street]
+        for table in np.nonzero(counts)[0]:
+            start, n = int(self.deck_pos[table]), int(counts[table])
+            self.board[table, self.board_count[table]:self.board_count[table] + n] = self.deck[table, start:start + n]
+            self.board_count[table] += n
+            self.deck_pos[table] += n
+        self.street[:] = np.minimum(self.street + 1, len(STREETS) - 1)
+        self.street_bets[:] = 0
+        self.current_bet[:] = 0
+
+    def hole_cards(self, table: int, seat: int) -> List[Card]:
+        return [int_to_card(int(c)) for c in self.hole[table, seat] if c != NO_CARD]
+
+    def board_cards(self, table: int) -> List[Card]:
+        return [int_to_card(int(c)) for c in self.board[table, :self.board_count[table]]]
+
+    @classmethod
+    def from_game(cls, game) -> "TableState":
+        """Snapshot a PokerGame into a single-table state."""
+        seats = len(game.players)
+        state = cls(num_tables=1, num_seats=seats, small_blind=game.small_blind, big_blind=game.big_blind)
+        for seat, player in enumerate(game.players):
+            state.stacks[0, seat] = player.chips
+            state.contributions[0, seat] = player.contributed
+            state.active[0, seat] = player.is_active
+            for i, card in enumerate(flatten_cards(player.hand)[:2]):
+                state.hole[0, seat, i] = card_to_int(card)
+        board = [card_to_int(c) for c in flatten_cards(game.community_cards)]
+        state.board[0, :len(board)] = board
+        state.board_count[0] = len(board)
+        used = set(state.hole[0].ravel().tolist()) | set(board)
+        remaining = [c for c in range(52) if c not in used]
+        state.deck[0, 52 - len(remaining):] = state.rng.permutation(remaining)
+        state.deck[0, :52 - len(remaining)] = sorted(used - {NO_CARD})
+        state.deck_pos[0] = 52 - len(remaining)
+        state.pot[0] = game.pot
+        state.current_bet[0] = game.current_bet
+        state.button[0] = (game.dealer_position - 1) % seats if seats else 0
+        state.street[0] = STREETS.index(game.current_stage) if game.current_stage in STREETS else 0
+        return state
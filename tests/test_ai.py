@@ -0,0 +1,41 @@
+import numpy as np
+
+from game import PokerGame, Player
+
+
+class FixedModel:
+    """Stands in for a trained classifier that always predicts one action."""
+
+    def __init__(self, action):
+        self.action = action
+
+    def predict(self, rows):
+        return np.array([self.action] * len(rows))
+
+
+def make_hand(seed=7):
+    game = PokerGame(num_players=3, rng=np.random.default_rng(seed))
+    for pos in ("SB", "BB", "BTN"):
+        game.players.append(Player(pos, chips=1000, position=pos))
+    game.player = game.players[0]
+    game.start_new_hand()
+    ai = game.ai_agent
+    ai.use_pushfold = False
+    ai.strategy_table = None
+    return game, ai, game.players[2]
+
+
+def test_model_prediction_decides_when_use_ml_is_set():
+    game, ai, player = make_hand()
+    for action in ("fold", "call"):
+        ai.ml_model = FixedModel(action)
+        decision = ai.make_decision(game, player, player.position, win_prob=0.9)
+        assert decision == (action, game.current_bet if action == "call" else 0)
+
+
+def test_model_is_ignored_without_use_ml():
+    game, ai, player = make_hand()
+    ai.ml_model = FixedModel("fold")
+    ai.use_ml = False
+    # Far above every raise threshold, so the rules raise
+    assert ai.make_decision(game, player, player.position, win_prob=0.99)[0] == "raise"
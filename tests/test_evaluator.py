@@ -0,0 +1,91 @@
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from cards import HandRank
+from evaluator import evaluate_batch, evaluate_codes, score_category
+
+
+def five_card_rank(cards):
+    """Reference score of exactly five card codes as (category, tie-break ranks), compared as tuples."""
+    ranks = sorted((c // 4 for c in cards), reverse=True)
+    flush = len({c % 4 for c in cards}) == 1
+    distinct = sorted(set(ranks), reverse=True)
+    straight_high = None
+    if len(distinct) == 5 and distinct[0] - distinct[4] == 4:
+        straight_high = distinct[0]
+    elif distinct == [12, 3, 2, 1, 0]:
+        straight_high = 3
+    groups = sorted(Counter(ranks).items(), key=lambda rc: (rc[1], rc[0]), reverse=True)
+    counts = [count for _, count in groups]
+    by_group = tuple(rank for rank, _ in groups)
+    if flush and straight_high is not None:
+        return (HandRank.ROYAL_FLUSH if straight_high == 12 else HandRank.STRAIGHT_FLUSH, straight_high)
+    if counts[0] == 4:
+        return (HandRank.FOUR_OF_A_KIND,) + by_group
+    if counts[:2] == [3, 2]:
+        return (HandRank.FULL_HOUSE,) + by_group
+    if flush:
+        return (HandRank.FLUSH,) + tuple(ranks)
+    if straight_high is not None:
+        return (HandRank.STRAIGHT, straight_high)
+    if counts[0] == 3:
+        return (HandRank.THREE_OF_A_KIND,) + by_group
+    if counts[:2] == [2, 2]:
+        return (HandRank.TWO_PAIR,) + by_group
+    if counts[0] == 2:
+        return (HandRank.ONE_PAIR,) + by_group
+    return (HandRank.HIGH_CARD,) + tuple(ranks)
+
+
+def brute_force(cards):
+    return max(five_card_rank(hand) for hand in combinations(cards, 5))
+
+
+def random_hands(n, k, seed):
+    rng = np.random.default_rng(seed)
+    return np.argsort(rng.random((n, 52)), axis=1)[:, :k]
+
+
+@pytest.mark.parametrize("k", [5, 6, 7])
+def test_matches_brute_force_ordering(k):
+    hands = random_hands(1500, k, seed=k)
+    scores = evaluate_codes(hands)
+    reference = [brute_force(hand.tolist()) for hand in hands]
+    for score, ref in zip(scores, reference):
+        assert score_category(score) == ref[0]
+    # Kickers: every pair of hands must compare the same way under both scores
+    order = np.argsort(scores, kind="stable")
+    for a, b in zip(order[:-1], order[1:]):
+        assert (scores[a] < scores[b]) == (reference[a] < reference[b])
+        assert (scores[a] == scores[b]) == (reference[a] == reference[b])
+
+
+def code(rank, suit):
+    return (rank - 2) * 4 + suit
+
+
+@pytest.mark.parametrize("cards, category", [
+    ([code(14, 0), code(13, 0), code(12, 0), code(11, 0), code(10, 0), code(2, 1), code(3, 2)], HandRank.ROYAL_FLUSH),
+    ([code(14, 0), code(2, 0), code(3, 0), code(4, 0), code(5, 0), code(9, 1), code(9, 2)], HandRank.STRAIGHT_FLUSH),
+    ([code(14, 1), code(2, 0), code(3, 2), code(4, 0), code(5, 3), code(9, 1), code(9, 2)], HandRank.STRAIGHT),
+    ([code(9, 0), code(9, 1), code(9, 2), code(5, 0), code(5, 1), code(5, 2), code(2, 3)], HandRank.FULL_HOUSE),
+])
+def test_special_hands(cards, category):
+    assert score_category(evaluate_codes(np.array(cards))[0]) == category
+
+
+def test_wheel_loses_to_six_high_straight():
+    wheel = [code(14, 1), code(2, 0), code(3, 2), code(4, 0), code(5, 3)]
+    six_high = [code(6, 1), code(2, 0), code(3, 2), code(4, 0), code(5, 3)]
+    assert evaluate_codes(np.array(wheel))[0] < evaluate_codes(np.array(six_high))[0]
+
+
+def test_batch_matches_rows():
+    hands = random_hands(200, 7, seed=1)
+    board = hands[0, 2:]
+    holes = np.array([h for h in hands[:, :2] if not set(h) & set(board)])
+    rows = evaluate_codes(np.column_stack([holes, np.broadcast_to(board, (len(holes), 5))]))
+    assert np.array_equal(evaluate_batch(holes, board), rows)
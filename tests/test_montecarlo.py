@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from montecarlo import batch_win_rates, sample_win_rate
+
+SIMULATIONS = 200
+RUNS = 100
+
+SPOTS = {
+    # (hand, board, minimum variance ratio against independent sampling)
+    "preflop AKo": ([48, 45], [], 3.0),
+    "preflop 76s": ([20, 24], [], 2.5),
+    "flop": ([48, 44], [0, 21, 34], 5.0),
+    "flop draw": ([36, 40], [32, 44, 1], 5.0),
+    "turn": ([48, 44], [0, 21, 34, 9], 10.0),
+}
+
+
+def estimates(estimate, runs=RUNS):
+    return np.array([estimate(np.random.default_rng(seed)) for seed in range(runs)])
+
+
+@pytest.mark.parametrize("name", SPOTS)
+def test_stratified_sampling_beats_independent_sampling(name):
+    hand, board, minimum = SPOTS[name]
+    iid = estimates(lambda rng: batch_win_rates([hand], [board], SIMULATIONS, rng=rng)[0])
+    stratified = estimates(lambda rng: sample_win_rate(hand, board, SIMULATIONS, rng=rng))
+    assert iid.var() / stratified.var() >= minimum
+    # Same expectation: the difference is within a few standard errors of the independent mean
+    assert abs(stratified.mean() - iid.mean()) < 4 * iid.std() / np.sqrt(RUNS)
+
+
+def test_weighted_range_stays_unbiased():
+    hand, board = [48, 44], [0, 21, 34]
+    weights = np.zeros(1326)
+    weights[::3] = 1.0
+    truth = batch_win_rates([hand], [board], 200_000, opponent_ranges=[weights], rng=np.random.default_rng(0))[0]
+    stratified = estimates(lambda rng: sample_win_rate(hand, board, SIMULATIONS, opponent_range=weights, rng=rng), 50)
+    assert abs(stratified.mean() - truth) < 0.005
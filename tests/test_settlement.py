@@ -0,0 +1,55 @@
+from settlement import build_pots, settle
+
+
+def test_single_pot_goes_to_best_hand():
+    payouts, pots = settle([100, 100, 100], [False, False, False], [5, 9, 7])
+    assert payouts == [0, 300, 0]
+    assert len(pots) == 1 and pots[0].winners == [1]
+
+
+def test_side_pots_for_short_all_in():
+    # Seat 0 is all-in for 50 and has the best hand; seats 1 and 2 play for the rest
+    payouts, pots = settle([50, 200, 200], [False, False, False], [9, 5, 7])
+    assert [(p.amount, p.eligible) for p in pots] == [(150, [0, 1, 2]), (300, [1, 2])]
+    assert payouts == [150, 0, 300]
+
+
+def test_several_side_pots():
+    contributions = [30, 60, 100, 100]
+    payouts, pots = settle(contributions, [False] * 4, [9, 8, 1, 7])
+    assert [(p.amount, p.eligible) for p in pots] == [(120, [0, 1, 2, 3]), (90, [1, 2, 3]), (80, [2, 3])]
+    assert payouts == [120, 90, 0, 80]
+    assert sum(payouts) == sum(contributions)
+
+
+def test_folded_contributor_adds_to_pot_but_cannot_win():
+    # Seat 2 folds the best hand after putting in 80
+    payouts, pots = settle([100, 100, 80], [False, False, True], [5, 7, 9])
+    assert all(2 not in p.eligible for p in pots)
+    assert payouts == [0, 280, 0]
+
+
+def test_folded_overbet_goes_to_pot_below():
+    # Nobody still in matched seat 2's 150, so the extra 50 is not a pot of its own
+    pots = build_pots([100, 100, 150], [False, False, True])
+    assert [(p.amount, p.eligible) for p in pots] == [(350, [0, 1])]
+
+
+def test_odd_chip_goes_left_of_button():
+    # Seats 1 and 3 tie for 101 chips; with the button on seat 2, seat 3 is first to its left
+    contributions = [0, 50, 1, 50]
+    payouts, _ = settle(contributions, [True, False, True, False], [-1, 7, -1, 7], button=2)
+    assert payouts == [0, 50, 0, 51]
+    payouts, _ = settle(contributions, [True, False, True, False], [-1, 7, -1, 7], button=0)
+    assert payouts == [0, 51, 0, 50]
+
+
+def test_three_way_split_remainder():
+    payouts, _ = settle([33, 33, 33], [False] * 3, [4, 4, 4], button=0, dead_money=1)
+    assert payouts == [33, 34, 33]
+
+
+def test_dead_money_goes_to_main_pot():
+    payouts, pots = settle([50, 100], [False, False], [9, 1], dead_money=30)
+    assert pots[0].amount == 130
+    assert payouts == [130, 50]